@@ -255,6 +255,93 @@ class AttrDict(dict):
         combine(self, kwargs)
 
 
+class _LazyList(list):
+    """A list whose dicts have been converted by LazyAttrDict. Being of its
+    own type, it's returned as is on later reads."""
+
+
+class LazyAttrDict(AttrDict):
+    """
+        An AttrDict view of a plain dict (e.g. parsed JSON). Only the top
+        level is copied; nested dicts (and dicts in lists) are converted the
+        first time they're read, and the converted node replaces the raw one.
+        Writes go through the converted nodes, the raw data is never changed.
+        Copies (copy(), dict(), {**ad}) convert all the nested nodes first.
+
+        >>> ad = LazyAttrDict(json.loads('{"a": {"b": [{"c": 1}]}}'))
+        >>> ad.a.b[0].c
+        1
+    """
+
+    def __init__(self, default=None, **kwargs):
+        if type(default) in (dict, OrderedDict) and not kwargs:
+            dict.__init__(self, default)
+        else:
+            super(LazyAttrDict, self).__init__(default, **kwargs)
+
+    @staticmethod
+    def _wrap(value):
+        t = type(value)
+        if t is dict or t is OrderedDict:
+            return LazyAttrDict(value)
+        if t is list:
+            return _LazyList(LazyAttrDict(x) if type(x) in (dict, OrderedDict)
+                             else x for x in value)
+        return value
+
+    def _convert(self, key, value):
+        ret = self._wrap(value)
+        if ret is not value:
+            dict.__setitem__(self, key, ret)
+        return ret
+
+    def _convert_all(self):
+        for key, value in list(dict.items(self)):
+            self._convert(key, value)
+
+    def __getitem__(self, key):
+        return self._convert(key, dict.__getitem__(self, key))
+
+    def __iter__(self):
+        # Not inherited, so that dict() and ** go through keys() and
+        # __getitem__ instead of copying the raw nodes.
+        return dict.__iter__(self)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        dict.__setitem__(self, key, default)
+        return default
+
+    def pop(self, key, *args):
+        if key in self:
+            value = self[key]
+            dict.__delitem__(self, key)
+            return value
+        return dict.pop(self, key, *args)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        return key, self._wrap(value)
+
+    def values(self):
+        self._convert_all()
+        return dict.values(self)
+
+    def items(self):
+        self._convert_all()
+        return dict.items(self)
+
+    def copy(self):
+        self._convert_all()
+        return dict.copy(self)
+
+
 class OptionsStrict(AttrDict):
 
     def __getattr__(self, n):
@@ -271,6 +358,7 @@ try:
     from yaml.representer import Representer
     Representer.add_representer(AttrDict, Representer.represent_dict)
     Representer.add_representer(Options, Representer.represent_dict)
+    Representer.add_representer(LazyAttrDict, Representer.represent_dict)
 except ImportError:
     pass
 
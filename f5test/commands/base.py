@@ -5,9 +5,11 @@ A command cannot call other commands; macros can.
 """
 import hashlib
 from ..base import Aliasificator
+from ..utils import cache
 from ..utils.version import Version
 from ..utils.wait import CallableWait
 from ..interfaces.config import ConfigInterface
+from ..interfaces.facts import FACTS
 from ..interfaces.testcase import ContextHelper
 import logging
 import threading
@@ -78,10 +80,42 @@ class Command(threading.Thread, metaclass=Aliasificator):
         pass
 
 
+def get_command_cache():
+    """Returns the cache backend of CachedCommands. On first use it's made
+    from the optional command_cache config section:
+
+    command_cache:
+      size: 512    # entries kept in memory
+      ttl: 3600    # default seconds an entry is kept
+      shared: yes  # also share entries through the memcache servers
+      local_ttl: 5 # when shared, seconds an entry is kept in memory
+    """
+    if cache.CACHE is None:
+        config = ConfigInterface().open()
+        specs = config.get('command_cache') or {}
+        backend = cache.LruCache(specs.get('size', cache.DEFAULT_SIZE),
+                                 specs.get('ttl', cache.DEFAULT_TTL))
+        if specs.get('shared') and config.memcache:
+            try:
+                shared = cache.MemcacheCache(config.memcache.servers,
+                                             prefix='f5test_cmd_',
+                                             ttl=backend.ttl)
+                backend = cache.TieredCache(backend, shared,
+                                            specs.get('local_ttl',
+                                                      cache.LOCAL_TTL))
+            except ImportError as e:
+                LOG.warning('Shared command cache not available: %s', e)
+        cache.set_cache(backend)
+    return cache.CACHE
+
+
 class CachedCommand(Command):
     """Base class for cached Commands.
 
-    The result of a cached command will be retrieved from the cache.
+    The result of a cached command will be retrieved from the cache (see
+    L{get_command_cache}), tagged with the address of the device, so that a
+    reboot or an install can invalidate it. Subclasses can set ttl to keep
+    their results for more or less than the default.
     The optional flag '_no_cache' can be set to signal that the result cache
     for this command should be cleared.
 
@@ -89,6 +123,8 @@ class CachedCommand(Command):
                     the cache.
     @type _no_cache: bool
     """
+    ttl = None
+
     def __init__(self, _no_cache=False, *args, **kwargs):
         super(CachedCommand, self).__init__(*args, **kwargs)
         self._no_cache = _no_cache
@@ -97,25 +133,22 @@ class CachedCommand(Command):
 
         LOG.debug('CachedCommand KEY: %s', self)
         key = hashlib.md5(str(self).encode()).hexdigest()
-
-        config = ConfigInterface().open()
-
-        if not config._cache:
-            config._cache = {}
+        tag = getattr(getattr(self, 'ifc', None), 'address', None)
+        backend = get_command_cache()
 
         if self._no_cache:
-            config._cache.pop(key, None)
-            ret = None
+            backend.delete(key, tag=tag)
+            ret = cache.MISSING
         else:
-            ret = config._cache.get(key)
+            ret = backend.get(key, tag=tag)
 
-        if ret:
+        if ret is not cache.MISSING:
             LOG.debug("CachedCommand hit: %s", ret)
             return ret
         else:
             ret = super(CachedCommand, self).run(*args, **kwargs)
 
-            config._cache.update({key: ret})
+            backend.set(key, ret, ttl=self.ttl, tag=tag)
 
             # LOG.debug("cache miss :( (%s:%s)", self._key, ret)
             return ret
@@ -124,6 +157,35 @@ class CachedCommand(Command):
         raise NotImplementedError('Must implement _hash() in superclass')
 
 
+class FactCommand(Command):
+    """Base class for Commands that return a fact about a device.
+
+    The result is kept in L{FACTS} under the device address, so that it's
+    shared by all the interfaces to that device, until it expires or is
+    invalidated (see L{f5test.interfaces.facts}).
+
+    @param _no_cache: if set the fact will be fetched again
+    @type _no_cache: bool
+    """
+    fact = None
+
+    def __init__(self, _no_cache=False, *args, **kwargs):
+        super(FactCommand, self).__init__(*args, **kwargs)
+        self._no_cache = _no_cache
+
+    def _variant(self):
+        """Tells apart the results of the same fact with other arguments."""
+        return None
+
+    def run(self, *args, **kwargs):
+        variant = self._variant()
+        if self._no_cache:
+            FACTS.invalidate(self.ifc, self.fact)
+        return FACTS.get(self.ifc, self.fact,
+                         lambda: super(FactCommand, self).run(*args, **kwargs),
+                         variant=variant)
+
+
 class CommandWait(CallableWait):
 
     def __init__(self, command, *args, **kwargs):
@@ -158,6 +220,11 @@ class WaitableCommand(Command):
     @type interval: int
     @param stabilize: seconds to wait for the value to stabilize
     @type stabilize: int
+    @param backoff: how the interval changes between iterations (see
+                    L{f5test.utils.wait.BACKOFFS})
+    @type backoff: Backoff or str
+    @param wakeup: a channel name; utils.wait.notify(wakeup) wakes the waiter
+    @type wakeup: str
     """
 
     def run_wait(self, *args, **kwargs):
@@ -1,8 +1,9 @@
 from .base import IcontrolCommand
-from ..base import CachedCommand, WaitableCommand
+from ..base import FactCommand, WaitableCommand
 from ...utils import Version
 from ...utils.parsers.version_file import colon_pairs_dict
 from ...interfaces.config import ConfigInterface, KEYSET_LOCK, KEYSET_ALL
+from ...interfaces.facts import FACTS
 from ...interfaces.icontrol import IcontrolInterface, AuthFailed
 from ...interfaces.icontrol.driver import UnknownMethod, IControlFault
 import base64
@@ -31,8 +32,9 @@ class GetVersion(IcontrolCommand):
 
 
 get_platform = None
-class GetPlatform(CachedCommand, IcontrolCommand):
+class GetPlatform(FactCommand, IcontrolCommand):
     """Get the platform ID."""
+    fact = 'platform_id'
 
     def setup(self):
         ic = self.api
@@ -184,6 +186,7 @@ class Reboot(IcontrolCommand):
             LOG.debug('get_uptime() not available (probably a 9.3.1)')
             pass
         ic.System.Services.reboot_system(seconds_to_reboot=0)
+        FACTS.invalidate(self.ifc)
 
         LOG.debug('Reboot post sleep')
         time.sleep(self.post_sleep)
@@ -16,7 +16,8 @@ class SSHCommand(base.Command):
 
     If an already opened SSH interface is provided (through the interface
     param) the cleanup method will leave it open. This is useful when a SSH
-    channel is reused to run a batch of commands.
+    channel is reused to run a batch of commands. Otherwise the connection is
+    borrowed from the shared SSH connection pool and returned on cleanup.
 
     @param interface: L{SSHInterface} instance. Doesn't need to be connected.
     @type interface: SSHInterface
@@ -33,7 +34,7 @@ class SSHCommand(base.Command):
                  password=None, port=None, timeout=180, *args, **kwargs):
         if ifc is None:
             self.ifc = SSHInterface(device, address, username, password,
-                                    port=port, timeout=timeout)
+                                    port=port, timeout=timeout, pooled=True)
             self._keep_alive = False
         else:
             self.ifc = ifc
@@ -3,6 +3,7 @@
 from .base import SSHCommand, SSHCommandError
 from ..base import WaitableCommand
 from ...defaults import EM_MYSQL_USERNAME, EM_MYSQL_PASSWORD, F5EM_DB
+from ...interfaces.ssh.session import MysqlSession, SessionError
 from ...utils.parsers.xmlsql import parse_xmlsql, parse_xmlsql_row_dict
 
 import logging
@@ -32,24 +33,31 @@ class SQLProcedureError(SSHCommandError):
 
 query = None
 class Query(WaitableCommand, SSHCommand):
-    """Run a one-shot SQL query as a parameter to mysql.
+    """Run an SQL query through the device's mysql session, or as a parameter
+    to a new mysql process.
     
     >>> list(sql.query('SELECT 1 AS cool'))
     [{u'cool': u'1'}]
+    >>> sql.query(['SELECT 1 AS a', 'SELECT 2 AS b'])
+    [[{u'a': 1}], [{u'b': 2}]]
 
-    @param query: the SQL query
-    @type query: str
+    @param query: the SQL query, or a list of queries to run in one batch
+    @type query: str or list
     @param database: the database to run against
     @type database: str
     @param sql_username: mysql username
     @type sql_username: str
     @param sql_password: mysql password
     @type sql_password: str
+    @param session: run through a persistent mysql session, falling back to a
+                    new mysql process if it can't be spawned
+    @type session: bool
     """
     def __init__(self, query, database=F5EM_DB, sql_username=EM_MYSQL_USERNAME, 
-                 sql_password=EM_MYSQL_PASSWORD, *args, **kwargs):
+                 sql_password=EM_MYSQL_PASSWORD, session=True, *args, **kwargs):
         super(Query, self).__init__(*args, **kwargs)
         self.query = query
+        self.session = session
         self.database = database
         self.sql_username = sql_username
         self.sql_password = sql_password or self.ifc.device.specs.get('mysql password')
@@ -60,8 +68,33 @@ class Query(WaitableCommand, SSHCommand):
                "sql_username=%(sql_username)s sql_password=%(sql_password)s)" % self.__dict__
    
     def setup(self):
-        #LOG.info('querying `%s`...', self.query)
-        query = self.query.replace('"', r'\"')
+        batch = not isinstance(self.query, str)
+        queries = list(self.query) if batch else [self.query]
+
+        results = None
+        if self.session:
+            try:
+                session = MysqlSession.get(self.ifc, database=self.database,
+                                           sql_username=self.sql_username,
+                                           sql_password=self.sql_password)
+                results = session.run(queries, timeout=self.ifc.timeout)
+            except SessionError as e:
+                LOG.debug('%s, using a new mysql process.', e)
+
+        if results is None:
+            results = [self.run_query(x) for x in queries]
+        else:
+            for query, result in zip(queries, results):
+                if result.error:
+                    LOG.error(result.error)
+                    raise SQLCommandError(query, result.error)
+            results = [x.rows for x in results]
+        return results if batch else results[0]
+
+    def run_query(self, query):
+        """Runs a query in a new mysql process."""
+        #LOG.info('querying `%s`...', query)
+        query = query.replace('"', r'\"')
         query = query.replace('`', r'\`')
         args = []
         args.append('mysql')
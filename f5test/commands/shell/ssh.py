@@ -1,10 +1,12 @@
 """All commands that run over the SSH interface."""
 
 from .base import SSHCommand, CommandNotSupported, SSHCommandError
-from ..base import CachedCommand, WaitableCommand, CommandError, ContextManagerCommand
+from ..base import CachedCommand, FactCommand, WaitableCommand, CommandError, \
+    ContextManagerCommand
 from ...base import Options, AttrDict
 from ...defaults import ADMIN_PASSWORD
 from ...interfaces.subprocess import ShellInterface, CalledProcessError
+from ...interfaces.facts import FACTS
 from ...interfaces.ssh import SSHInterface
 from ...interfaces.testcase import LOGCOLLECT_CONTAINER
 from ...utils.parsers.version_file import colon_pairs_dict, equals_pairs_dict
@@ -223,12 +225,14 @@ class GetApicVersion(SSHCommand):  # @IgnorePep8
                 return Version("apic %(version)s" % device)
 
 get_platform = None
-class GetPlatform(CachedCommand, SSHCommand):  # @IgnorePep8
+class GetPlatform(FactCommand, SSHCommand):  # @IgnorePep8
     """Parses the /PLATFORM file and return a dictionary.
     For: bigip 9.3.1+, em 1.6.0+
 
     @rtype: dict
     """
+    fact = 'platform'
+
     def setup(self):
         return parse_keyvalue_file('/PLATFORM', mode=KV_EQUALS, ifc=self.ifc)
 
@@ -267,6 +271,7 @@ class License(SSHCommand):  # @IgnorePep8
 
         ret = self.api.run('SOAPLicenseClient --verbose --basekey %s %s' % \
                            (self.basekey, addkey_str))
+        FACTS.invalidate(self.ifc, 'license')
 
         if not ret.status:
             LOG.info('Licensing: Done.')
@@ -292,6 +297,7 @@ class Relicense(SSHCommand):  # @IgnorePep8
         ret = self.api.run('SOAPLicenseClient --basekey `grep '
                            '"Registration Key" /config/bigip.license|'
                            'cut -d: -f2`')
+        FACTS.invalidate(self.ifc, 'license')
         if not ret.status:
             LOG.info('relicensing: Done.')
             return True
@@ -301,12 +307,13 @@ class Relicense(SSHCommand):  # @IgnorePep8
 
 
 parse_license = None
-class ParseLicense(CachedCommand, SSHCommand):  # @IgnorePep8
+class ParseLicense(FactCommand, SSHCommand):  # @IgnorePep8
     """Parse the bigip.license file into a dictionary.
 
     @param tokens_only: filter out all non license flags
     @type tokens_only: bool
     """
+    fact = 'license'
 
     def __init__(self, tokens_only=False, *args, **kwargs):
         super(ParseLicense, self).__init__(*args, **kwargs)
@@ -319,6 +326,9 @@ class ParseLicense(CachedCommand, SSHCommand):  # @IgnorePep8
         opt['tokens_only'] = self.tokens_only
         return parent + "(tokens_only=%(tokens_only)s)" % opt
 
+    def _variant(self):
+        return self.tokens_only
+
     def setup(self):
         ret = self.api.run("grep -v '^\s*#' /config/bigip.license")
 
@@ -393,6 +403,7 @@ class Reboot(SSHCommand):  # @IgnorePep8
             pass
 
         ret = self.api.run('reboot')
+        FACTS.invalidate(self.ifc)
 
         if ret.status:
             LOG.error(ret)
@@ -529,79 +540,95 @@ class AuditSoftware(SSHCommand):  # @IgnorePep8
             raise SSHCommandError(ret)
 
 
+LOG_LINE_COUNT = 200
+APIC_LOG_LINE_COUNT = 400
+
+
+def get_log_files(version):
+    """Returns the log files (shell globs) worth collecting from a device,
+    with the number of lines to tail from each.
+
+    @param version: the device version
+    @type version: Version
+    @rtype: list of (str, int)
+    """
+    v = abs(version)
+    is_bigiq_or = (v.product.is_bigiq and v < 'bigiq 4.0') or v.product.is_iworkflow
+
+    files = [] if v.product.is_apic else ['/var/log/ltm', '/var/log/messages']
+
+    # httpd removed in bigiq 4.3
+    if not (v.product.is_bigiq and v > 'bigiq 4.2' or is_bigiq_or
+            or v.product.is_apic):
+        files.append('/var/log/httpd/httpd_errors')
+
+    # EM specific
+    if v.product.is_em:
+        files.append('/var/log/em')
+        files.append('/var/log/emrptschedd.log')
+
+    # UI
+    if v.product.is_bigip and v > 'bigip 10.0' \
+    or v.product.is_em and v > 'em 2.0' \
+    or v.product.is_bigiq or is_bigiq_or:
+        files.append('/var/log/liveinstall.log')
+        if not (v > 'bigiq 4.0' or is_bigiq_or):
+            files.append('/var/log/tomcat/catalina.out')
+            files.append('/var/log/webui.log')
+        if 'bigiq 4.2' <= v <= 'bigiq 6.0' or is_bigiq_or:
+            files.append('/var/log/guiserver.out')
+        if v >= 'bigiq 4.3' and v <= 'bigiq 4.4':
+            files.append('/var/log/nginx_errors.log')
+        if v >= 'bigiq 4.5' or is_bigiq_or:
+            files.append('/var/log/webd/errors.log{,.1}')
+    elif not v.product.is_apic:
+        files.append('/var/log/tomcat4/catalina.out')
+
+    # REST API
+    if v.product.is_bigip and v >= 'bigip 11.4' \
+    or v.product.is_em and v >= 'em 3.2' \
+    or v.product.is_bigiq or is_bigiq_or:
+        files.append('/var/log/restjavad.0.log')
+
+    # SELinux API
+    if v.product.is_bigip and v >= 'bigip 11.5' \
+    or v.product.is_bigiq or is_bigiq_or:
+        files.append('/var/log/auditd/audit.log')
+
+    # ASM
+    if v.product.is_bigip and v >= 'bigip 11.5':
+        files.append('/var/log/asm')
+
+    if v.product.is_bigiq and v >= 'bigiq 4.4' or is_bigiq_or:
+        files.append('/var/log/restjavad*.0.log')
+
+    if v.product.is_apic:
+        files.append('/data/devicescript/F5*/logs/apic.log')
+        files.append('/data/devicescript/F5*/logs/debug.log')
+        files.append('/data/devicescript/F5*/logs/periodic.log')
+        files.append('/data/devicescript/F5*/logs/stdout_stderr.log')
+
+    return [(x, APIC_LOG_LINE_COUNT if 'devicescript' in x else LOG_LINE_COUNT)
+            for x in files]
+
+
 collect_logs = None
 class CollectLogs(SSHCommand):  # @IgnorePep8
     """Collects tails from different log files.
 
+    See L{f5test.utils.logcollect} for collecting only what's new since the
+    last call, from many devices at once.
+
     @param last: how many lines to tail
     @type last: int
     """
-    LINE_COUNT = 200
-    APIC_LINE_COUNT = 400
+    LINE_COUNT = LOG_LINE_COUNT
+    APIC_LINE_COUNT = APIC_LOG_LINE_COUNT
 
     def setup(self):
-        # Common
         v = abs(self.version)
-        is_bigiq_or = (v.product.is_bigiq and v < 'bigiq 4.0') or v.product.is_iworkflow
-
-        files = [] if v.product.is_apic else ['/var/log/ltm', '/var/log/messages']
-
-        # httpd removed in bigiq 4.3
-        if not (v.product.is_bigiq and v > 'bigiq 4.2' or is_bigiq_or
-                or v.product.is_apic):
-            files.append('/var/log/httpd/httpd_errors')
-
-        # EM specific
-        if v.product.is_em:
-            files.append('/var/log/em')
-            files.append('/var/log/emrptschedd.log')
-
-        # UI
-        if v.product.is_bigip and v > 'bigip 10.0' \
-        or v.product.is_em and v > 'em 2.0' \
-        or v.product.is_bigiq or is_bigiq_or:
-            files.append('/var/log/liveinstall.log')
-            if not (v > 'bigiq 4.0' or is_bigiq_or):
-                files.append('/var/log/tomcat/catalina.out')
-                files.append('/var/log/webui.log')
-            if 'bigiq 4.2' <= v <= 'bigiq 6.0' or is_bigiq_or:
-                files.append('/var/log/guiserver.out')
-            if v >= 'bigiq 4.3' and v <= 'bigiq 4.4':
-                files.append('/var/log/nginx_errors.log')
-            if v >= 'bigiq 4.5' or is_bigiq_or:
-                files.append('/var/log/webd/errors.log{,.1}')
-        elif not v.product.is_apic:
-            files.append('/var/log/tomcat4/catalina.out')
-
-        # REST API
-        if v.product.is_bigip and v >= 'bigip 11.4' \
-        or v.product.is_em and v >= 'em 3.2' \
-        or v.product.is_bigiq or is_bigiq_or:
-            files.append('/var/log/restjavad.0.log')
-
-        # SELinux API
-        if v.product.is_bigip and v >= 'bigip 11.5' \
-        or v.product.is_bigiq or is_bigiq_or:
-            files.append('/var/log/auditd/audit.log')
-
-        # ASM
-        if v.product.is_bigip and v >= 'bigip 11.5':
-            files.append('/var/log/asm')
-
-        if v.product.is_bigiq and v >= 'bigiq 4.4' or is_bigiq_or:
-            files.append('/var/log/restjavad*.0.log')
-
-        if v.product.is_apic:
-            files.append('/data/devicescript/F5*/logs/apic.log')
-            files.append('/data/devicescript/F5*/logs/debug.log')
-            files.append('/data/devicescript/F5*/logs/periodic.log')
-            files.append('/data/devicescript/F5*/logs/stdout_stderr.log')
-
-        for filename in files:
-            if 'devicescript' in filename:
-                ret = self.api.run('tail -n %d %s' % (self.APIC_LINE_COUNT, filename))
-            else:
-                ret = self.api.run('tail -n %d %s' % (self.LINE_COUNT, filename))
+        for filename, lines in get_log_files(v):
+            ret = self.api.run('tail -n %d %s' % (lines, filename))
             local_file = os.path.basename(filename).replace('*', '_')
             yield local_file, ret.stdout
 
@@ -2,6 +2,7 @@ from .base import SSHCommand
 from .ssh import get_version
 from ..base import CachedCommand, WaitableCommand
 from ...base import Options
+from ...interfaces.ssh.session import TmshSession, SessionError
 from ...utils.parsers import tmsh
 import logging
 
@@ -32,24 +33,40 @@ class Run(WaitableCommand, SSHCommand):
     @type folder: str
     @param command: the tmsh command (list, show, modify, create, etc.)
     @type command: str
+    @param session: run through the device's persistent tmsh session, falling
+                    back to a new tmsh process if it can't be spawned or the
+                    command stops at a question (confirmation, pager)
+    @type session: bool
     """
     def __init__(self, arguments, recursive=False, folder=None, command='list',
-                 *args, **kwargs):
+                 session=True, *args, **kwargs):
 
         super(Run, self).__init__(*args, **kwargs)
-        self.command = "%s %s" % (command, arguments)
+        self.tmsh_command = "%s %s" % (command, arguments)
+        self.folder = folder
+        self.session = session
 
         if recursive:
-            self.command += ' recursive'
+            self.tmsh_command += ' recursive'
 
         if folder:
             # XXX: in this case the return status will always be 0 (success)!!
-            self.command = 'echo "cd %s; %s" | tmsh | cat' % (folder, self.command)
+            self.command = 'echo "cd %s; %s" | tmsh | cat' % (folder, self.tmsh_command)
         else:
-            self.command = 'tmsh %s' % self.command
+            self.command = 'tmsh %s' % self.tmsh_command
 
     def setup(self):
-        ret = self.api.run(self.command)
+        ret = None
+        if self.session:
+            try:
+                ret = TmshSession.get(self.ifc).run(self.tmsh_command,
+                                                    folder=self.folder,
+                                                    timeout=self.ifc.timeout)
+            except SessionError as e:
+                LOG.debug('%s, using a new tmsh process.', e)
+
+        if ret is None:
+            ret = self.api.run(self.command)
         if not ret.status:
             return tmsh.parser(ret.stdout)
         else:
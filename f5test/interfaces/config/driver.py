@@ -3,10 +3,14 @@ Created on Mar 16, 2013
 
 @author: jono
 '''
+import functools
+import hashlib
 import io
 import logging
 import os
+import pickle
 import sys
+import tempfile
 
 try:
     import yaml
@@ -14,6 +18,7 @@ except ImportError:
     raise Exception('unable to import YAML package. Can not continue.')
 
 from ...base import AttrDict
+from ...utils.cache import MISSING
 from ...utils.dicts import merge
 from ...utils.net import get_local_ip
 
@@ -22,6 +27,11 @@ LOG = logging.getLogger(__name__)
 CONFIG = AttrDict()
 EXTENDS_KEYWORD = '$extends'
 PEER_IP = '224.0.0.1'
+# Compiled configs are kept here; set to an empty string to disable.
+CONFIG_CACHE_DIR = os.environ.get('F5TEST_CONFIG_CACHE',
+                                  os.path.expanduser('~/.cache/f5test/config'))
+# The libyaml parser is much faster than the pure Python one.
+BaseLoader = getattr(yaml, 'CLoader', yaml.Loader)
 
 
 class Signals(object):
@@ -29,11 +39,13 @@ class Signals(object):
     on_before_load = Signal()
     on_before_extend = Signal()
     on_after_extend = Signal()
+    # Sent by interfaces.facts.FACTS when a device fact has a new value.
+    on_facts_changed = Signal()
 
 
-class YamlLoader(yaml.Loader):
+class YamlLoader(BaseLoader):
     """
-    yaml.Loader subclass handles "!include path/to/foo.yml" directives in config
+    YAML loader that handles "!include path/to/foo.yml" directives in config
     files.  When constructed with a file object, the root path for includes
     defaults to the directory containing the file, otherwise to the current
     working directory. In either case, the root path can be overridden by the
@@ -42,6 +54,9 @@ class YamlLoader(yaml.Loader):
     When an included file F contain its own !include directive, the path is
     relative to F's location.
 
+    It's based on the libyaml loader when available. The files read are
+    recorded in `files`, by path, along with the digests of their content.
+
     Example:
         YAML file /home/frodo/one-ring.yml:
             ---
@@ -64,23 +79,28 @@ class YamlLoader(yaml.Loader):
                 'invisibility'}], 'Name': 'The One Ring', 'Specials':
                 ['resize-to-wearer']}
     """
-    def __init__(self, *args, **kwargs):
-        super(YamlLoader, self).__init__(*args, **kwargs)
-        self.add_constructor('!include', self._include)
-        self.add_constructor('!append', self._append)
-        if 'root' in kwargs:
-            self.root = kwargs['root']
-        elif isinstance(self.stream, io.IOBase):
-            self.root = os.path.dirname(self.stream.name)
+    def __init__(self, stream, root=None):
+        super(YamlLoader, self).__init__(stream)
+        if root is not None:
+            self.root = root
+        elif isinstance(stream, io.IOBase):
+            self.root = os.path.dirname(stream.name)
         else:
             self.root = os.path.curdir
+        self.files = {}
+
+    def _open(self, filename):
+        self.files[os.path.abspath(filename)] = file_digest(filename)
+        return open(filename, 'r')
 
     def _load_node(self, node):
         filename = os.path.join(self.root, self.construct_scalar(node))
-        f = open(filename, 'r')
-        loader = yaml.Loader(f)
-        subnode = loader.get_single_node()
-        return subnode
+        with self._open(filename) as f:
+            loader = BaseLoader(f)
+            try:
+                return loader.get_single_node()
+            finally:
+                loader.dispose()
 
     def flatten_mapping(self, node):
         merge = []
@@ -121,17 +141,19 @@ class YamlLoader(yaml.Loader):
         if merge:
             node.value = merge + node.value
 
-    def _include(self, loader, node):
-        oldRoot = self.root
-        filename = os.path.join(self.root, loader.construct_scalar(node))
-        self.root = os.path.dirname(filename)
-        data = yaml.load(open(filename, 'r'))
-        self.root = oldRoot
-        return data
+    def _include(self, node):
+        filename = os.path.join(self.root, self.construct_scalar(node))
+        with self._open(filename) as f:
+            loader = YamlLoader(f, root=os.path.dirname(filename))
+            loader.files = self.files
+            try:
+                return loader.get_single_data()
+            finally:
+                loader.dispose()
 
-    def _append(self, loader, node):
-        # value = loader.construct_scalar(node)
-        value = loader.construct_yaml_int(node)
+    def _append(self, node):
+        # value = self.construct_scalar(node)
+        value = self.construct_yaml_int(node)
         return lambda x: x.append(value)
         # return lambda x: x.append(node)
 
@@ -163,26 +185,122 @@ class YamlLoader(yaml.Loader):
         return self._construct_mapping(node, deep=deep)
 
 
+YamlLoader.add_constructor('!include', YamlLoader._include)
+YamlLoader.add_constructor('!append', YamlLoader._append)
+
+
+def file_digest(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class ConfigCache(object):
+    """Compiled configs, pickled on disk. An entry is valid as long as none
+    of the files it was built from has changed, by content.
+
+    @param path: the cache directory
+    @type path: str
+    """
+    def __init__(self, path=CONFIG_CACHE_DIR):
+        self.path = path
+
+    def _filename(self, key):
+        return os.path.join(self.path, hashlib.sha1(key).hexdigest())
+
+    def get(self, key):
+        """Returns the value stored under key, or MISSING.
+
+        @type key: bytes
+        """
+        try:
+            with open(self._filename(key), 'rb') as f:
+                files, value = pickle.load(f)
+        except FileNotFoundError:
+            return MISSING
+        except Exception as e:
+            LOG.debug('Bad config cache entry: %s', e)
+            return MISSING
+
+        for filename, digest in files.items():
+            try:
+                if file_digest(filename) != digest:
+                    return MISSING
+            except OSError:
+                return MISSING
+        return value
+
+    def set(self, key, files, value):
+        """Stores value under key.
+
+        @param files: the digests of the files value was built from, by path
+        @type files: dict
+        """
+        tmp = None
+        try:
+            data = pickle.dumps((files, value), pickle.HIGHEST_PROTOCOL)
+            os.makedirs(self.path, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._filename(key))
+        except Exception as e:
+            LOG.debug('Config not cached: %s', e)
+            if tmp and os.path.exists(tmp):
+                os.unlink(tmp)
+
+
 class ConfigLoader(object):
+    """Loads a config file and the ones it extends.
 
-    def __init__(self, filename, fmt=None):
-        self.loaders = {'yaml': self.load_yaml,
+    The fully merged config is cached (see ConfigCache), keyed by the content
+    of the main config and checked against the digests of all the other files
+    involved, so unchanged configs aren't parsed and merged again.
+
+    @param cache: where compiled configs are kept, None to disable
+    @type cache: ConfigCache
+    """
+    def __init__(self, filename, fmt=None, cache=MISSING):
+        self.files = {}
+        self.loaders = {'yaml': functools.partial(self.load_yaml,
+                                                  files=self.files),
                         'json': self.load_json,
                         'ini': self.load_ini,
                         'py': self.load_python}
         self.filename = filename
         self.fmt = fmt
+        if cache is MISSING:
+            cache = ConfigCache() if CONFIG_CACHE_DIR else None
+        self.cache = cache
 
     def load(self):
         # Load the configuration file:
         Signals.on_before_load.send(self, filename=self.filename)
-        main_config = self.load_any(self.filename)
+        main_config = self.load_cached(self.filename)
 
         config_dir = os.path.dirname(self.filename)
         Signals.on_before_extend.send(self, config=main_config)
-        config = self.extend(config_dir, main_config)
-        # Substitute {0[..]} tokens. Works only with strings.
-        self.subst_variables(config)
+        config = MISSING
+        key = None
+        if self.cache is not None:
+            try:
+                # The key covers changes made by on_before_extend receivers.
+                key = b'extend:' + pickle.dumps((self.fmt,
+                                                 os.path.abspath(config_dir),
+                                                 main_config))
+            except Exception as e:
+                LOG.debug('Config not cacheable: %s', e)
+            else:
+                config = self.cache.get(key)
+
+        if config is MISSING:
+            self.files.clear()
+            config = self.extend(config_dir, main_config)
+            # Substitute {0[..]} tokens. Works only with strings.
+            self.subst_variables(config)
+            if key is not None:
+                self.cache.set(key, dict(self.files), config)
+        else:
+            LOG.debug('Config %s loaded from cache.', self.filename)
 
         config = AttrDict(config)
         config['_filename'] = self.filename
@@ -242,14 +360,35 @@ class ConfigLoader(object):
     def load_any(self, filename):
         fmt = self.fmt or os.path.splitext(filename)[1][1:]
         assert fmt in self.loaders, 'Unknown format: %s' % fmt
+        self.files[os.path.abspath(filename)] = file_digest(filename)
         return self.loaders[fmt](filename)
 
+    def load_cached(self, filename=None):
+        """Same as load_any(), but the result is cached until the file or one
+        of the files it includes changes."""
+        filename = filename or self.filename
+        if self.cache is None:
+            return self.load_any(filename)
+
+        key = ('load:%s:%s' % (self.fmt, os.path.abspath(filename))).encode()
+        data = self.cache.get(key)
+        if data is MISSING:
+            self.files.clear()
+            data = self.load_any(filename)
+            self.cache.set(key, dict(self.files), data)
+        return data
+
     @staticmethod
-    def load_yaml(filename):
+    def load_yaml(filename, files=None):
         """ Load the passed in yaml configuration file """
         with open(filename, 'r') as f:
-            return yaml.load(f, YamlLoader)
-            # return yaml.load(open(filename).read(), YamlLoader)
+            loader = YamlLoader(f)
+            try:
+                return loader.get_single_data()
+            finally:
+                loader.dispose()
+                if files is not None:
+                    files.update(loader.files)
 
     @staticmethod
     def load_ini(filename):
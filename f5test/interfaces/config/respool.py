@@ -4,7 +4,8 @@ Created on Feb 2, 2018
 @author: jono
 """
 from ...base import OptionsStrict
-from ...utils.respool import MemcachePool
+from ...utils.respool import MemcachePool, ShardedMemcachePool
+from ...utils.respool.range import get_indexed
 
 DEFAULT_TIMEOUT = 60
 
@@ -22,7 +23,9 @@ class RespoolFactory(object):
         return pool
 
     def get_range(self, name, klass, *args, **kwargs):
-        range_ = self.ranges[name] = list(klass(*args, **kwargs))
+        """Declares a range. Ranges support len(), indexing, slicing and
+        membership without being expanded; items are built on access."""
+        range_ = self.ranges[name] = get_indexed(klass, *args, **kwargs)
         return range_
 
     def get_memcached_pool(self, name, klass, *args, **kwargs):
@@ -34,3 +37,15 @@ class RespoolFactory(object):
                                                timeout=timeout,
                                                encode=True)
         return pool
+
+    def get_sharded_pool(self, name, klass, *args, **kwargs):
+        """Like get_memcached_pool(), but items are leased for timeout seconds
+        from sharded bitmaps (see ShardedMemcachePool)."""
+        timeout = kwargs.pop('timeout', DEFAULT_TIMEOUT)
+        if timeout is None:
+            timeout = self.memcache_specs.timeout
+        pool = self.pools[name] = ShardedMemcachePool(self.memcache_specs.servers,
+                                                      klass(*args, prefix=self.prefix, **kwargs),
+                                                      timeout=timeout,
+                                                      encode=True)
+        return pool
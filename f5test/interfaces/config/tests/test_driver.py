@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from f5test.interfaces.config.driver import (ConfigLoader, ConfigCache,
+                                             Signals)
+
+MAIN = """
+$extends: [base.yaml]
+devices:
+    bigip1:
+        address: 10.0.0.1
+"""
+BASE = """
+$extends: [common.yaml]
+defaults: !include defaults/values.yaml
+devices:
+    bigip1:
+        address: 1.1.1.1
+        ports: [22, 443]
+"""
+COMMON = """
+plugins:
+    email:
+        enabled: false
+"""
+VALUES = """
+timeout: 60
+retries: !include retries.yaml
+"""
+# Number of devices in the config used to time cached loads.
+CONFIG_DEVICES = int(os.environ.get('CONFIG_DEVICES', 2000))
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = ConfigCache(os.path.join(self.dir, 'cache'))
+        os.mkdir(os.path.join(self.dir, 'defaults'))
+        for name, content in (('main.yaml', MAIN), ('base.yaml', BASE),
+                              ('common.yaml', COMMON),
+                              ('defaults/values.yaml', VALUES),
+                              ('defaults/retries.yaml', '3')):
+            self.write(name, content)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, content):
+        with open(os.path.join(self.dir, name), 'w') as f:
+            f.write(content)
+
+    def load(self):
+        loader = ConfigLoader(os.path.join(self.dir, 'main.yaml'),
+                              cache=self.cache)
+        return loader.load(), loader
+
+    def test01_load(self):
+        """Test extends and nested includes"""
+        config, loader = self.load()
+        self.assertEqual(config.devices.bigip1.address, '10.0.0.1')
+        self.assertEqual(config.devices.bigip1.ports, [22, 443])
+        self.assertEqual(config.defaults, dict(timeout=60, retries=3))
+        self.assertFalse(config.plugins.email.enabled)
+        self.assertEqual(sorted(os.path.relpath(x, self.dir)
+                                for x in loader.files),
+                         ['base.yaml', 'common.yaml', 'defaults/retries.yaml',
+                          'defaults/values.yaml'])
+
+    def test02_cache(self):
+        """Test that cached configs are invalidated by any file change"""
+        self.assertEqual(self.load()[0].defaults.retries, 3)
+        config, loader = self.load()
+        self.assertEqual(config.defaults.retries, 3)
+        self.assertEqual(loader.files, {})
+
+        self.write('defaults/retries.yaml', '5')
+        self.assertEqual(self.load()[0].defaults.retries, 5)
+        self.write('main.yaml', MAIN.replace('10.0.0.1', '10.0.0.2'))
+        self.assertEqual(self.load()[0].devices.bigip1.address, '10.0.0.2')
+
+        # Changes made by signal receivers are part of the key.
+        def before_extend(sender, config):
+            config['extra'] = 1
+
+        with Signals.on_before_extend.connected_to(before_extend):
+            self.assertEqual(self.load()[0].extra, 1)
+        self.assertNotIn('extra', self.load()[0])
+
+    def test03_speed(self):
+        """Test the time it takes to load a large unchanged config"""
+        self.write('base.yaml', BASE + ''.join(
+            '    device%d:\n        address: 10.1.%d.%d\n'
+            '        ports: [22, 443]\n' % (i, i // 256, i % 256)
+            for i in range(CONFIG_DEVICES)))
+        times = []
+        for _ in range(2):
+            now = time.time()
+            config = self.load()[0]
+            times.append(time.time() - now)
+        self.assertEqual(len(config.devices), CONFIG_DEVICES + 1)
+        print("%d devices loaded in %.3fs, then %.3fs from cache\n" %
+              (CONFIG_DEVICES, times[0], times[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+'''
+Created on Oct 18, 2026
+
+Device facts (version, platform, license) cached per device.
+
+Facts are keyed by the device address, so a version looked up over SSH is
+reused by the REST and iControl interfaces of the same device. Each fact
+expires after its TTL; stages and commands that change a device (install,
+reboot, licensing, configuration) invalidate its facts explicitly.
+'''
+from collections import Counter
+import logging
+import threading
+import time
+
+from .config.driver import Signals
+from ..utils import cache
+
+LOG = logging.getLogger(__name__)
+DEFAULT_TTL = 300
+TTLS = {'version': 600,
+        'platform': 3600,
+        'platform_id': 3600,
+        'license': 600}
+
+
+def device_key(device):
+    """The key of a device: its address, whether given as a string, an
+    interface or a DeviceAccess."""
+    return getattr(device, 'address', device)
+
+
+class DeviceFacts(object):
+    """A cache of device facts with a TTL per fact.
+
+    When a fact is found to have a different value than the last time it was
+    looked up, L{Signals.on_facts_changed} is sent with the device address,
+    the fact name, and the old and new values.
+
+    @param ttls: seconds each fact is kept, by name
+    @type ttls: dict
+    @param default_ttl: seconds a fact not in ttls is kept
+    @type default_ttl: int
+    """
+    def __init__(self, ttls=None, default_ttl=DEFAULT_TTL):
+        self.ttls = dict(TTLS)
+        self.ttls.update(ttls or {})
+        self.default_ttl = default_ttl
+        self.stats = Counter()
+        self._facts = {}
+        self._last = {}
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+
+    def get(self, device, name, fetch, variant=None, ttl=None):
+        """Returns a fact, calling fetch() if it's not cached or expired.
+
+        Concurrent lookups of the same fact only fetch it once.
+
+        @param device: the device (address, interface or DeviceAccess)
+        @param name: the fact name (e.g. version)
+        @type name: str
+        @param fetch: called without arguments to get the fact
+        @type fetch: callable
+        @param variant: tells apart flavors of the same fact
+        @param ttl: seconds to keep it, overrides the fact's TTL
+        @type ttl: int
+        """
+        key = (device_key(device), name, variant)
+        entry = self._facts.get(key)
+        if entry is not None and entry[1] > time.time():
+            self.stats['hits'] += 1
+            return entry[0]
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:
+            entry = self._facts.get(key)
+            if entry is not None and entry[1] > time.time():
+                self.stats['hits'] += 1
+                return entry[0]
+            self.stats['misses'] += 1
+            value = fetch()
+            self.set(device, name, value, variant, ttl)
+        return value
+
+    def set(self, device, name, value, variant=None, ttl=None):
+        """Store a fact, e.g. one that a command learned along the way."""
+        address = device_key(device)
+        key = (address, name, variant)
+        if ttl is None:
+            ttl = self.ttls.get(name, self.default_ttl)
+        with self._lock:
+            self._facts[key] = (value, time.time() + ttl)
+            missing = object()
+            old = self._last.get(key, missing)
+            self._last[key] = value
+        if old is not missing and old != value:
+            LOG.debug('%s: %s changed from %s to %s', address, name, old, value)
+            Signals.on_facts_changed.send(self, device=address, name=name,
+                                          variant=variant, old=old, new=value)
+
+    def invalidate(self, device=None, *names):
+        """Forget the facts of a device (all of them unless names are given)
+        or, without a device, of all the devices."""
+        address = device_key(device) if device is not None else None
+        with self._lock:
+            for key in list(self._facts):
+                if (address is None or key[0] == address) and \
+                   (not names or key[1] in names):
+                    del self._facts[key]
+        if address is not None and not names:
+            # Cached command results for the device are just as stale.
+            cache.invalidate(address)
+        LOG.debug('Invalidated facts: %s %s', address or '*', names or '*')
+
+
+FACTS = DeviceFacts()
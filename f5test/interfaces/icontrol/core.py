@@ -1,4 +1,5 @@
 from ..config import ConfigInterface, DeviceAccess
+from ..facts import FACTS
 from .driver import Icontrol, ICONTROL_URL
 from ...base import Interface
 from ...defaults import ADMIN_USERNAME, ADMIN_PASSWORD, DEFAULT_PORTS
@@ -39,7 +40,7 @@ class IcontrolInterface(Interface):
     @property
     def version(self):
         from ...commands.icontrol.system import get_version
-        return get_version(ifc=self)
+        return FACTS.get(self, 'version', lambda: get_version(ifc=self))
 
     def set_session(self, session=None):
         v = self.version
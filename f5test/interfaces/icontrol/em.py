@@ -8,6 +8,7 @@ Created on Apr 21, 2011
 from ...base import Interface
 from ...defaults import ADMIN_USERNAME, ADMIN_PASSWORD, DEFAULT_PORTS
 from ..config import ConfigInterface, DeviceAccess
+from ..facts import FACTS
 from .core import IcontrolInterface
 
 
@@ -94,7 +95,7 @@ class EMInterface(Interface):
     @property
     def version(self):
         from ...commands.icontrol.system import get_version
-        return get_version(ifc=self.icifc)
+        return FACTS.get(self, 'version', lambda: get_version(ifc=self.icifc))
 
     def open(self):  # @ReservedAssignment
         if self.api:
@@ -5,6 +5,7 @@ Created on Mar 9, 2015
 '''
 from ..core import RestInterface, AUTH
 from ..driver import BaseRestResource, WrappedResponse
+from ..trace import RequestLogFilter, ResponseLogFilter
 from ...config import ADMIN_ROLE
 from f5test.interfaces.rest.apic.objects.system import (aaaLogin, aaaLogout,
                                                         aaaRefresh)
@@ -17,8 +18,6 @@ import datetime
 
 LOG = logging.getLogger(__name__)
 STDOUT = logging.getLogger('stdout')
-CURL_LOG = "curl -sk {credentials} {headers} -X {method} {payload} '{url}'"
-MAX_LINE_LENGTH = 65536
 
 
 class ApicResourceError(ResourceError):
@@ -112,40 +111,19 @@ class ApicInterface(RestInterface):
         def on_request(self, request):
             request.headers['Cookie'] = "APIC-Cookie=%s" % self.token
 
-    class OnRequestLogFilter(object):
+    class OnRequestLogFilter(RequestLogFilter):
         """ Simple filter to log requests as they are sent out"""
 
         def __init__(self):
-            self.log = STDOUT if ApicInterface.verbose else LOG
+            super(ApicInterface.OnRequestLogFilter, self).__init__(
+                STDOUT if ApicInterface.verbose else LOG)
 
-        def on_request(self, request):
-            # We won't log multi-part requests.
-            if isinstance(request.body, (type(None), str)):
-                payload = credentials = ''
-                if request.body:
-                    payload = "-d '{}'".format(request.body.replace("'", "\\'")[:MAX_LINE_LENGTH])
-                headers = []
-                for name, value in list(request.headers.items()):
-                    # curl calculates content-length automatically
-                    if name == 'Content-Length':
-                        pass
-                    else:
-                        headers.append('-H "{}: {}"'.format(name, value))
-                self.log.debug(CURL_LOG.format(method=request.method,
-                                               path=request.path,
-                                               url=request.url,
-                                               headers=' '.join(headers),
-                                               credentials=credentials,
-                                               payload=payload))
-
-    class OnResponseLogFilter(object):
+    class OnResponseLogFilter(ResponseLogFilter):
         """ Simple filter to log responses as they come in"""
 
         def __init__(self):
-            self.log = STDOUT if ApicInterface.verbose else LOG
-
-        def on_response(self, resp, request):
-            self.log.debug(resp._body.peek()[:MAX_LINE_LENGTH])
+            super(ApicInterface.OnResponseLogFilter, self).__init__(
+                STDOUT if ApicInterface.verbose else LOG)
 
     def __init__(self, device=None, address=None, username=None, password=None,
                  port=None, proto='https', timeout=90, url=None, token=None,
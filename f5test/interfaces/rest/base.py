@@ -1,4 +1,4 @@
-from ...base import AttrDict
+from ...base import AttrDict, LazyAttrDict
 from collections import OrderedDict
 import json
 import inspect
@@ -54,7 +54,7 @@ class BaseApiObject(AttrDict):
                     t = lambda x: x
                 d.setdefault(k, AttrDict())
 
-                if t in (dict, OrderedDict, AttrDict):
+                if t in (dict, OrderedDict, AttrDict, LazyAttrDict):
                     if not isinstance(d[k], dict):
                         d[k] = AttrDict()
                     combine(d[k], v)
@@ -4,6 +4,7 @@ Created on May 16, 2011
 @author: jono
 '''
 from ..config import ConfigInterface, DeviceAccess, DEFAULT_ROLE
+from ..facts import FACTS
 from ...base import Interface
 from ...defaults import DEFAULT_PORTS
 from .driver import RestResource
@@ -95,5 +96,6 @@ class RestInterface(Interface):
     @property
     def version(self):
         from ...commands.icontrol.system import get_version
-        return get_version(address=self.address, username=self.username,
-                           password=self.password, proto=self.proto, port=self.port)
+        return FACTS.get(self, 'version', lambda: get_version(
+            address=self.address, username=self.username,
+            password=self.password, proto=self.proto, port=self.port))
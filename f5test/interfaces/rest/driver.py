@@ -7,9 +7,12 @@ from restkit import Resource, ResourceError
 from restkit.filters import BasicAuth
 from restkit.datastructures import MultiDict
 import urllib.request, urllib.parse, urllib.error
-from ...base import AttrDict
+from ...base import AttrDict, LazyAttrDict
 from ..config import ConfigInterface
+from .metrics import METRICS
 import logging
+import queue
+import threading
 import time
 from f5test.utils.mixins.profiling import BasicProfiler, BasicProfilerState
 
@@ -23,6 +26,7 @@ except ImportError:
 
 RAW_MIMETYPE = 'application/do-not-parse-this-content'
 LOG = logging.getLogger(__name__)
+PAGE_SIZE = 100
 
 # HTTP Command String constants
 GET_STR = 'GET'
@@ -30,13 +34,6 @@ PUT_STR = 'PUT'
 POST_STR = 'POST'
 PATCH_STR = 'PATCH'
 DELETE_STR = 'DELETE'
-# Stores timing information for each REST call, by call type
-timing_info = {}
-timing_info[GET_STR] = []
-timing_info[PUT_STR] = []
-timing_info[POST_STR] = []
-timing_info[PATCH_STR] = []
-timing_info[DELETE_STR] = []
 
 
 # Monkey patch BasicAuth to handle encoded username and passwords containing
@@ -73,7 +70,11 @@ class WrappedResponse(object):
     def _parse_json(data):
         if not json:
             return data
-        return AttrDict(json.loads(data))
+        data = json.loads(data)
+        if isinstance(data, dict):
+            # Nested objects are converted as they're accessed.
+            return LazyAttrDict(data)
+        return AttrDict(data)
 
     @staticmethod
     def _parse_xml(data):
@@ -215,12 +216,54 @@ class BaseRestResource(Resource):
             if self.save_timings:
                 end_time = time.time()
                 total_time = end_time - start_time
-                timing_info[method].append(total_time)
+                METRICS.add(method, path, total_time)
                 if BasicProfiler.state == BasicProfilerState.enabled:
                     BasicProfiler.save_result(path, req_type=method, start_time=start_time, end_time=end_time)
 
         return wrapped_response
 
+    def iterate(self, path=None, page_size=PAGE_SIZE, prefetch=1,
+                params_dict=None, **params):
+        """Yield the items of a collection a page at a time, following the
+        nextLink of each page.
+
+        >>> for device in rest.iterate('/mgmt/cm/system/machineid-resolver'):
+        ...     print(device.address)
+
+        @param page_size: items per page ($top), None to let the server choose
+        @type page_size: int
+        @param prefetch: pages fetched ahead in the background while the
+                         current one is consumed (0 to fetch on demand)
+        @type prefetch: int
+        """
+        params_dict = dict(params_dict or {})
+        if page_size:
+            params_dict.setdefault('$top', page_size)
+        pages = self._pages(path, params_dict, params)
+        if prefetch:
+            pages = _prefetch(pages, prefetch)
+        try:
+            for page in pages:
+                for item in page.get('items') or []:
+                    yield item
+        finally:
+            pages.close()
+
+    def _pages(self, path, params_dict, params):
+        while True:
+            page = self.get(path, params_dict=params_dict, **params)
+            if isinstance(page, WrappedResponse):
+                page = page.data
+            yield page
+
+            next_link = page.get('nextLink')
+            if not next_link or not page.get('items'):
+                break
+            bits = urllib.parse.urlparse(next_link)
+            path = bits.path
+            params_dict = dict(urllib.parse.parse_qsl(bits.query))
+            params = {}
+
     def get_by_id(self, *args):
         slash = '/' if self.trailing_slash else ''
         if len(args) == 1:
@@ -232,6 +275,49 @@ class BaseRestResource(Resource):
         return self.get(params_dict=kwargs)
 
 
+def _prefetch(iterable, depth):
+    """Runs a generator on a background thread, up to depth items ahead of
+    the consumer."""
+    results = queue.Queue(depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                results.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    break
+            else:
+                put((done, None))
+        except Exception as e:
+            put((done, e))
+        finally:
+            iterable.close()
+
+    thread = threading.Thread(target=produce, name='rest-prefetch')
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item, error = results.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                break
+            yield item
+    finally:
+        stop.set()
+
+
 class RestResource(BaseRestResource):
     """All requests return a parsed response, based on content-type"""
 
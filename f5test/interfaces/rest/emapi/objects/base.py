@@ -1,10 +1,14 @@
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import json
+import logging
 
 from .....base import enum, AttrDict
 from ...base import BaseApiObject
-from .....utils.wait import wait
+from .....utils.wait import wait, WaitTimedOut
 from ...core import RestInterface
+from ..tasks import TaskWatcher, WATCH_GRACE
 
+LOG = logging.getLogger(__name__)
 DEFAULT_TIMEOUT = 30
 
 
@@ -53,6 +57,8 @@ class Task(BaseApiObject):
     PENDING_STATUSES = ('CREATED', 'STARTED', 'CANCEL_REQUESTED')
     FINAL_STATUSES = ('CANCELED', 'FAILED', 'FINISHED')
     FAIL_STATE = 'FAILED'
+    # Wait through the device's shared TaskWatcher instead of a poll loop.
+    watched = False
 
     @staticmethod
     def fail(message, resource):
@@ -65,15 +71,37 @@ class Task(BaseApiObject):
 
     @staticmethod
     def wait(rest, resource, loop=None, timeout=30, interval=1,
-             timeout_message=None):
+             timeout_message=None, watched=None):
+        """Wait for a task to finish.
+
+        @param watched: poll through the device's TaskWatcher, along with all
+                        the other tasks being waited on (default: Task.watched)
+        @type watched: bool
+        """
         def get_status():
             return rest.get(resource.selfLink)
-        if loop is None:
-            loop = get_status
-        ret = wait(loop, timeout=timeout, interval=interval,
-                   timeout_message=timeout_message,
-                   condition=lambda x: x.status not in Task.PENDING_STATUSES,
-                   progress_cb=lambda x: 'Status: {0.status}:{0.currentStep}'.format(x))
+        if watched is None:
+            watched = Task.watched
+        if loop is None and watched:
+            watcher = TaskWatcher.get(rest)
+            future = watcher.watch(rest, resource.selfLink, timeout=timeout,
+                                   interval=interval,
+                                   pending=Task.PENDING_STATUSES,
+                                   timeout_message=timeout_message)
+            try:
+                ret = future.result(timeout + WATCH_GRACE)
+            except FutureTimeoutError:
+                future.cancel()
+                raise WaitTimedOut('%s stopped polling %s' %
+                                   (watcher, resource.selfLink))
+            LOG.info('Status: {0.status}:{0.currentStep}'.format(ret))
+        else:
+            if loop is None:
+                loop = get_status
+            ret = wait(loop, timeout=timeout, interval=interval,
+                       timeout_message=timeout_message,
+                       condition=lambda x: x.status not in Task.PENDING_STATUSES,
+                       progress_cb=lambda x: 'Status: {0.status}:{0.currentStep}'.format(x))
         assert ret.status in Task.FINAL_STATUSES, "{0.status}:{0.error}".format(ret)
 
         if ret.status == Task.FAIL_STATE:
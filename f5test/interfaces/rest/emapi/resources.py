@@ -4,26 +4,23 @@ Created on Feb 26, 2012
 @author: jono
 '''
 from ..core import RestInterface, AUTH
-from .objects.system import AuthnLogin, AuthnExchange
+from .session import SESSIONS
 from .objects.shared import DeviceInfo
 from ..driver import BaseRestResource, WrappedResponse
+from ..trace import RequestLogFilter, ResponseLogFilter
 from ...config import ADMIN_ROLE
+from ...facts import FACTS
 from ....defaults import ADMIN_PASSWORD, ADMIN_USERNAME
 from ....utils.querydict import QueryDict
 from restkit import ResourceError, RequestError
 from f5test.utils.wait import wait, wait_args
-from threading import Event, Thread
 import urllib.parse
 import logging
 import urllib.request, urllib.parse, urllib.error
-import base64
-import datetime
 
 LOG = logging.getLogger(__name__)
 STDOUT = logging.getLogger('stdout')
 LOCALHOST_URL_PREFIX = 'http://localhost:8100'
-CURL_LOG = "curl -X {method} {payload} '{url}' -sk {credentials} {headers}"
-MAX_LINE_LENGTH = 65536
 
 
 def localize_uri(uri):
@@ -70,6 +67,7 @@ class EmapiResourceError(ResourceError):
 class EmapiRestResource(BaseRestResource):
     api_version = 1
     verbose = False
+    token_session = None
 
     def request(self, method, path=None, payload=None, headers=None,
                 params_dict=None, odata_dict=None, **params):
@@ -107,6 +105,9 @@ class EmapiRestResource(BaseRestResource):
 
         # Strip the schema and hostname part.
         path = urllib.parse.urlparse(path).path
+        if self.token_session is not None:
+            # The token may have been rejected or failed to refresh.
+            SESSIONS.renew(self.token_session)
         try:
             wrapped_response = super(EmapiRestResource, self).request(method, path=path,
                                                                       payload=payload,
@@ -116,6 +117,8 @@ class EmapiRestResource(BaseRestResource):
         except ResourceError as e:
             if e.status_int == 401 and FAILED_AUTHENTICATION in e.msg:
                 LOG.error("Authentication Token Expired! Was there a restart?")
+                if self.token_session is not None:
+                    SESSIONS.invalidate(self.token_session)
             raise EmapiResourceError(e)
 
         return wrapped_response.data
@@ -132,7 +135,8 @@ class EmapiInterface(RestInterface):
     EmapiResourceError = EmapiResourceError
 
     class TokenHeaderFilter(object):
-        """ Simple filter to manage iControl REST token authentication"""
+        """ Simple filter to manage iControl REST token authentication.
+        The token may be a shared TokenSession, which is refreshed in place."""
 
         def __init__(self, token):
             self.token = token
@@ -140,98 +144,19 @@ class EmapiInterface(RestInterface):
         def on_request(self, request):
             request.headers['X-F5-Auth-Token'] = self.token.token
 
-    class OnRequestLogFilter(object):
+    class OnRequestLogFilter(RequestLogFilter):
         """ Simple filter to log requests as they are sent out"""
 
         def __init__(self):
-            self.log = STDOUT if EmapiInterface.verbose else LOG
+            super(EmapiInterface.OnRequestLogFilter, self).__init__(
+                STDOUT if EmapiInterface.verbose else LOG)
 
-        def on_request(self, request):
-            # We won't log multi-part requests.
-            # We want to trim F5 Authentication headers to their begin/end
-            if isinstance(request.body, (type(None), str)):
-                payload = credentials = ''
-                if request.body:
-                    payload = "-d '{}'".format(request.body.replace("'", "\\'")[:MAX_LINE_LENGTH])
-                headers = []
-                for name, value in list(request.headers.items()):
-                    # Recover credentials from Basic auth header
-                    if name == 'Authorization':
-                        type_, auth = value.split()
-                        if type_ == 'Basic':
-                            credentials = "-u " + base64.b64decode(auth).decode()
-                    # curl calculates content-length automatically
-                    elif name == 'Content-Length':
-                        pass
-                    else:
-                        if 'X-F5-Auth-Token' in name and value and len(value) > 70:
-                            # trim the auth token to free logs
-                            value = "{}[...]{}".format(value[:25], value[-35:])
-                        headers.append('-H "{}: {}"'.format(name, value))
-                self.log.debug(CURL_LOG.format(method=request.method,
-                                               path=request.path,
-                                               url=request.url,
-                                               headers=' '.join(headers),
-                                               credentials=credentials,
-                                               payload=payload))
-
-    class OnResponseLogFilter(object):
+    class OnResponseLogFilter(ResponseLogFilter):
         """ Simple filter to log responses as they come in"""
 
         def __init__(self):
-            self.log = STDOUT if EmapiInterface.verbose else LOG
-
-        def on_response(self, resp, request):
-            self.log.debug(resp._body.peek()[:MAX_LINE_LENGTH])
-
-    class RestIfcRefresh(object):
-        '''
-        (BQ 5.0 and beyond only)
-        '''
-        PAUSE = 270  # check every 4'30"
-
-        def __init__(self, api=None, *args, **kwargs):
-            self.api = api
-            self.t_stop = None
-            self.token = None
-
-        def start(self, timeout_interval, refreshtoken):
-            LOG.debug("rstifc: Authn Token: starting new refresh thread...")
-            pause = self.PAUSE
-            interval = int(timeout_interval) - pause
-            if interval < 0:
-                interval = timeout_interval
-                pause = interval - 0.5
-
-            self.t_stop = Event()
-            LOG.debug("rstifc: Authn Token: retry at {0}s before every expiration, "
-                      "pausing: {1}s".format(interval, pause))
-            t = Thread(target=self.refresh, args=(interval, pause, self.t_stop, refreshtoken))
-            t.daemon = True
-            t.start()
-
-        def stop(self):
-            if self.t_stop:
-                LOG.debug("rstifc: Authn Token: Stopping refresh thread..")
-                self.t_stop.set()
-            return self.token
-
-        def refresh(self, interval, pause, stop_event, refreshtoken):
-            initial_time = datetime.datetime.now()
-            while not stop_event.is_set():
-                current_time = datetime.datetime.now()
-                if (current_time - initial_time) >= datetime.timedelta(seconds=interval):
-                    LOG.debug("rstifc: Authn Token: Refreshing token...")
-                    payload = AuthnExchange()
-                    payload.refreshToken.token = refreshtoken
-                    ret = self.api.post(AuthnExchange.URI, payload)
-                    self.token = ret.token
-                    # Update token in header
-                    LOG.debug("rstifc: Authn Token: Updating Token Now.")
-                    self.api.client.request_filters.append(EmapiInterface.TokenHeaderFilter(self.token))
-                    # Update time when token got updated
-                    initial_time = current_time
-                stop_event.wait(pause)
+            super(EmapiInterface.OnResponseLogFilter, self).__init__(
+                STDOUT if EmapiInterface.verbose else LOG)
 
     def __init__(self, device=None, address=None, username=None, password=None,
                  port=None, proto='https', timeout=90, auth=None, url=None,
@@ -242,38 +167,30 @@ class EmapiInterface(RestInterface):
                                              port, proto, timeout, auth, url)
         self.login_ref = login_ref
         self.token = token
-        self.refresh_token = None
         self.token_timeout = None
-        self.refresh = None
+        self.session = None
         self.auth = auth
 
     @property
     def version(self):
         from ....utils.version import Version
-        tmp = self.api.default_params
-        self.api.default_params = None
-        try:
-            ret = self.api.get(DeviceInfo.URI)
-        finally:
-            self.api.default_params = tmp
-        return Version("{0.product} {0.version} {0.build}".format(ret))
+
+        def fetch():
+            tmp = self.api.default_params
+            self.api.default_params = None
+            try:
+                ret = self.api.get(DeviceInfo.URI)
+            finally:
+                self.api.default_params = tmp
+            return Version("{0.product} {0.version} {0.build}".format(ret))
+        return FACTS.get(self, 'version', fetch)
 
     def open(self):  # @ReservedAssignment
         if self.is_opened():
             return self.api
 
         if self.auth is None:
-            self.auth = AUTH.BASIC
-            # Attempt to open a temporary interface with admin credentials
-            try:
-                with RestInterface(device=self.device, address=self.address) as ifc:
-                    v = ifc.version
-                    # Prefer TOKEN auth in 5.0+
-                    if v >= 'bigiq 5.0':
-                        self.auth = AUTH.TOKEN
-            except:  # hales
-                #self.auth = AUTH.TOKEN
-                pass
+            self.auth = SESSIONS.get_auth(self, self._probe_auth) or AUTH.BASIC
 
         if self.auth == AUTH.BASIC:
             super(EmapiInterface, self).open()
@@ -282,17 +199,17 @@ class EmapiInterface(RestInterface):
             url = "{0[proto]}://{0[username]}:{0[password]}@{0[address]}:{0[port]}".format(quoted)
             api = self.api_class(url, timeout=self.timeout)
             if not self.token:
-                payload = AuthnLogin()
-                payload.username = self.username
-                payload.password = self.password
-                payload.loginReference = self.login_ref
-                ret = api.post(AuthnLogin.URI, payload)
-                try:
-                    self.token = ret.token
-                    self.token_timeout = self.token.timeout
-                    self.refresh_token = ret.refreshToken and ret.refreshToken.token
-                except:
-                    raise
+                # Tokens are shared by all interfaces to the same device and
+                # user, and refreshed by the registry. It logs in through its
+                # own resource, which doesn't send the token.
+                session = SESSIONS.acquire(self, self.api_class(url,
+                                                                timeout=self.timeout))
+                if session.token:
+                    self.session = api.token_session = session
+                    self.token = session
+                    self.token_timeout = session.timeout
+                else:
+                    SESSIONS.release(session)
             if self.token:
                 api.client.request_filters.append(self.TokenHeaderFilter(self.token))
             else:  # default to basic auth in case token can't be retrieved
@@ -300,9 +217,6 @@ class EmapiInterface(RestInterface):
                             "Defaulting to Basic...".format(self.device))
                 super(EmapiInterface, self).open()
             self.api = api
-            if self.refresh_token:
-                self.refresh = EmapiInterface.RestIfcRefresh(self.api)
-                self.refresh.start(self.token_timeout, self.refresh_token)
         else:
             raise NotImplementedError(self.auth)
 
@@ -310,17 +224,29 @@ class EmapiInterface(RestInterface):
         self.api.client.response_filters.append(self.OnResponseLogFilter())
         return self.api
 
+    def _probe_auth(self):
+        # Attempt to open a temporary interface with admin credentials
+        try:
+            with RestInterface(device=self.device, address=self.address) as ifc:
+                v = ifc.version
+                # Prefer TOKEN auth in 5.0+
+                if v >= 'bigiq 5.0':
+                    return AUTH.TOKEN
+                return AUTH.BASIC
+        except:  # hales
+            #self.auth = AUTH.TOKEN
+            pass
+
     def close(self, *args, **kwargs):  # @ReservedAssignment
         try:
-            if self.refresh:
-                LOG.debug("rstifc: Attempt stopping refresh thread..")
-                self.token = self.refresh.stop()
-                LOG.debug("rstifc: Refresh thread Stopped...")
+            if self.session:
+                SESSIONS.release(self.session)
+                self.session = None
             # BZ650017 - no need to delete access token
             # if self.token:
             #     self.api.delete(self.token.selfLink)
         except (RequestError, EmapiResourceError) as e:
-            LOG.error('Failed to stop refresh token thread or delete token on rstifc close: %s', e)
+            LOG.error('Failed to release or delete token on rstifc close: %s', e)
         finally:
             self.token = None
             return super(EmapiInterface, self).close()
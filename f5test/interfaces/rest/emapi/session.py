@@ -0,0 +1,244 @@
+"""Process-wide registry of iControl REST auth tokens.
+
+Tokens are keyed by device, user and port and shared by all EmapiInterface
+instances, so a test run logs in once per user instead of once per command.
+A single daemon thread refreshes the tokens still in use before they expire.
+The auth mode probed for each device (basic vs. token) is cached as well.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from ....base import Options
+from .objects.system import AuthnLogin, AuthnExchange
+
+LOG = logging.getLogger(__name__)
+REFRESH_MARGIN = 270  # refresh 4'30" before the token expires
+MIN_VALIDITY = 30  # don't hand out tokens expiring sooner than this
+MAX_SLEEP = 60
+
+
+class TokenSession(object):
+    """An auth token (and its refresh token) for one user on one device.
+
+    Quacks like the token returned by AuthnLogin, so it can be passed to
+    L{EmapiInterface.TokenHeaderFilter} and always yield the latest token.
+    """
+    def __init__(self, key):
+        self.key = key
+        self.token = None
+        self.refresh_token = None
+        self.timeout = None
+        self.expires = 0
+        self.users = 0
+        self.api = None
+        self.credentials = None
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return "<{0}: {1[3]}@{1[1]}:{1[2]} users={2}>".format(name, self.key,
+                                                              self.users)
+
+    @property
+    def ttl(self):
+        return self.expires - time.time()
+
+    def is_valid(self):
+        return self.token is not None and self.ttl > MIN_VALIDITY
+
+    def update(self, token, refresh_token=None):
+        self.token = token.token
+        self.timeout = int(token.timeout)
+        self.expires = time.time() + self.timeout
+        if refresh_token is not None:
+            self.refresh_token = refresh_token
+
+    def invalidate(self):
+        self.token = None
+        self.expires = 0
+
+
+class SessionRegistry(object):
+    """Thread-safe registry of L{TokenSession} objects.
+
+    @param margin: seconds before expiration when tokens get refreshed
+    @type margin: int
+    """
+    def __init__(self, margin=REFRESH_MARGIN):
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._auth_modes = {}
+        self._counters = dict(logins=0, reused=0, refreshes=0, failures=0,
+                              probes=0, probes_avoided=0)
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return "<{0}: {1}>".format(name, self.get_stats())
+
+    @staticmethod
+    def key(ifc):
+        login_ref = ifc.login_ref.get('link') if ifc.login_ref else None
+        return (ifc.proto, ifc.address, ifc.port, ifc.username, ifc.password,
+                login_ref)
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def get_auth(self, ifc, probe):
+        """Return the auth mode of a device, calling probe() the first time.
+
+        Failed probes (returning None) are not cached.
+        """
+        key = (ifc.address, ifc.port)
+        with self._lock:
+            auth = self._auth_modes.get(key)
+        if auth is not None:
+            self._count('probes_avoided')
+            return auth
+
+        self._count('probes')
+        auth = probe()
+        if auth is not None:
+            with self._lock:
+                self._auth_modes[key] = auth
+        return auth
+
+    def acquire(self, ifc, api):
+        """Return a session with a valid token, logging in if needed.
+
+        @param ifc: the interface requesting the token
+        @type ifc: EmapiInterface
+        @param api: a resource carrying basic auth credentials, used only to
+                    log in and refresh the token
+        @type api: EmapiRestResource
+        """
+        key = self.key(ifc)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = TokenSession(key)
+
+        with session.lock:
+            fresh = not session.is_valid()
+            if fresh:
+                session.api = api
+                session.credentials = (ifc.username, ifc.password,
+                                       ifc.login_ref)
+                self._login(session)
+            else:
+                self._count('reused')
+            session.users += 1
+        self._start()
+        if fresh:
+            self._wakeup.set()
+        return session
+
+    def release(self, session):
+        with session.lock:
+            session.users -= 1
+
+    def invalidate(self, session):
+        """Forget a token rejected by the server (e.g. after a restart)."""
+        with session.lock:
+            session.invalidate()
+
+    def renew(self, session):
+        """Log in again if the token of a session was invalidated or is about
+        to expire. Called before each request made with the session."""
+        with session.lock:
+            if session.is_valid():
+                return
+            LOG.info('Token for %s is no longer valid, logging in again.',
+                     session)
+            self._login(session)
+        self._wakeup.set()
+
+    def _login(self, session):
+        username, password, login_ref = session.credentials
+        payload = AuthnLogin()
+        payload.username = username
+        payload.password = password
+        payload.loginReference = login_ref
+        try:
+            ret = session.api.post(AuthnLogin.URI, payload)
+        except:
+            self._count('failures')
+            raise
+        self._count('logins')
+        if ret.token:
+            session.update(ret.token, ret.refreshToken and
+                           ret.refreshToken.token)
+            LOG.debug('Logged in %s, token expires in %ds', session,
+                      session.timeout)
+
+    def _refresh(self, session):
+        payload = AuthnExchange()
+        payload.refreshToken.token = session.refresh_token
+        try:
+            ret = session.api.post(AuthnExchange.URI, payload)
+            session.update(ret.token)
+        except Exception as e:
+            LOG.warning('Failed to refresh token for %s: %s', session, e)
+            self._count('failures')
+            # The next request made with it will log in again.
+            session.invalidate()
+        else:
+            self._count('refreshes')
+            LOG.debug('Refreshed token for %s', session)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None or self._stopped:
+                return
+            self._thread = threading.Thread(target=self._run,
+                                            name='emapi-token-refresh')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.clear()
+            with self._lock:
+                sessions = list(self._sessions.values())
+
+            sleep = MAX_SLEEP
+            for session in sessions:
+                with session.lock:
+                    if not session.users or not session.refresh_token or \
+                       session.token is None:
+                        continue
+                    margin = min(self.margin, session.timeout / 2.0)
+                    if session.ttl <= margin:
+                        self._refresh(session)
+                    if session.token is not None:
+                        sleep = min(sleep, session.ttl - margin)
+            self._wakeup.wait(max(sleep, 1))
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._auth_modes.clear()
+
+    def get_stats(self):
+        """Counters for logins made and avoided (reused tokens, cached auth
+        mode probes), token refreshes and failures."""
+        with self._lock:
+            ret = Options(self._counters)
+            ret.sessions = len(self._sessions)
+            ret.active = sum(1 for x in self._sessions.values() if x.users)
+        return ret
+
+
+SESSIONS = SessionRegistry()
+atexit.register(SESSIONS.stop)
@@ -0,0 +1,239 @@
+"""Shared poller for asynchronous REST tasks.
+
+Each device gets one watcher thread, whatever the number of tasks being
+waited on. Outstanding tasks are grouped by collection: a collection with
+several of them is polled with one $select query, filtered on their ids, a
+lone task with a GET on its selfLink. Full task objects are only fetched once they're done. The poll
+interval starts short and backs off while nothing changes.
+"""
+from concurrent.futures import Future
+import logging
+import threading
+import time
+import urllib.parse
+
+from ....utils.wait import ExponentialBackoff, WaitTimedOut
+
+LOG = logging.getLogger(__name__)
+PENDING_STATUSES = ('CREATED', 'STARTED', 'CANCEL_REQUESTED')
+MAX_INTERVAL = 5
+MIN_BATCH = 2
+# Most task ids in one $filter, to keep the URIs short.
+MAX_BATCH = 50
+# How long waiters give a watcher past a task's timeout, e.g. for a slow poll.
+WATCH_GRACE = 60
+
+
+class TaskWatch(object):
+    """One task being waited on."""
+
+    def __init__(self, rest, link, timeout, interval, pending, timeout_message):
+        self.rest = rest
+        self.link = link
+        self.path = urllib.parse.urlparse(link).path
+        self.collection = self.path.rsplit('/', 1)[0]
+        self.deadline = time.time() + timeout
+        self.timeout = timeout
+        self.interval = interval
+        self.pending = pending
+        self.timeout_message = timeout_message or \
+            "Criteria not met after {0} seconds."
+        self.status = None
+        self.result = None
+        self.future = Future()
+
+    def __repr__(self):
+        return "<TaskWatch: %s %s>" % (self.path, self.status)
+
+
+class TaskWatcher(object):
+    """Polls the tasks of one device on a single thread.
+
+    @param name: the device (the REST base URI)
+    @type name: str
+    @param backoff: the poll interval policy
+    @type backoff: Backoff
+    """
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, name, backoff=None):
+        self.name = name
+        self.backoff = backoff or ExponentialBackoff(initial=0.5)
+        self._lock = threading.Lock()
+        self._watches = []
+        self._wakeup = threading.Event()
+        self._thread = None
+        # Collections that don't support $select queries.
+        self._no_batch = set()
+        self.stats = dict(watched=0, batch_polls=0, single_polls=0, fetches=0)
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return "<{0}: {1} watching {2}>".format(name, self.name,
+                                               len(self._watches))
+
+    @classmethod
+    def get(cls, rest):
+        """Return the watcher for the device behind a REST resource."""
+        key = getattr(rest, 'uri', None) or id(rest)
+        with cls._registry_lock:
+            watcher = cls._registry.get(key)
+            if watcher is None:
+                watcher = cls._registry[key] = cls(key)
+        return watcher
+
+    def watch(self, rest, link, timeout=30, interval=MAX_INTERVAL,
+              pending=PENDING_STATUSES, timeout_message=None):
+        """Start watching a task.
+
+        @param rest: the REST resource used to poll the task
+        @type rest: EmapiRestResource
+        @param link: the task's selfLink
+        @type link: str
+        @param interval: the longest time between two polls
+        @type interval: float
+        @param pending: the statuses of a task that's not done yet
+        @type pending: tuple
+        @return: a Future for the task once it's done
+        """
+        w = TaskWatch(rest, link, timeout, interval, pending, timeout_message)
+        with self._lock:
+            self._watches.append(w)
+            self.stats['watched'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name='task-watcher')
+                self._thread.daemon = True
+                self._thread.start()
+        self._wakeup.set()
+        return w.future
+
+    def _run(self):
+        try:
+            self._loop()
+        except Exception as e:
+            # Don't leave anyone waiting on a dead thread.
+            LOG.exception('%s failed', self)
+            with self._lock:
+                watches, self._watches = self._watches, []
+                self._thread = None
+            for w in watches:
+                if not w.future.done():
+                    self._set(w, exception=e)
+
+    def _loop(self):
+        delays = self.backoff.delays(MAX_INTERVAL)
+        while True:
+            with self._lock:
+                watches = list(self._watches)
+                if not watches:
+                    self._thread = None
+                    return
+
+            if self._wakeup.is_set():
+                self._wakeup.clear()
+                delays = self.backoff.delays(MAX_INTERVAL)
+            changed = self._poll(watches)
+
+            with self._lock:
+                self._watches = [x for x in self._watches if not x.future.done()]
+                if not self._watches:
+                    continue
+                interval = min(x.interval for x in self._watches)
+                deadline = min(x.deadline for x in self._watches)
+            if changed:
+                delays = self.backoff.delays(MAX_INTERVAL)
+            delay = min(next(delays), interval, max(deadline - time.time(), 0))
+            self._wakeup.wait(delay)
+
+    def _poll(self, watches):
+        """Poll all the watched tasks once. Returns True if any changed."""
+        by_collection = {}
+        for w in watches:
+            by_collection.setdefault(w.collection, []).append(w)
+
+        changed = False
+        for collection, group in by_collection.items():
+            if len(group) >= MIN_BATCH and collection not in self._no_batch:
+                summary = self._batch(collection, group)
+            else:
+                summary = {}
+
+            for w in group:
+                if w.future.done():
+                    # Cancelled by the caller.
+                    continue
+                try:
+                    status = summary.get(w.path)
+                    if status is None:
+                        status = self._single(w)
+                    elif status not in w.pending:
+                        self._fetch(w)
+                        status = w.result.status if w.result else status
+
+                    if status != w.status:
+                        LOG.debug('Task %s: %s', w.path, status)
+                        w.status = status
+                        changed = True
+                    self._resolve(w)
+                except Exception as e:
+                    # E.g. a malformed task. Only this one is affected.
+                    LOG.debug('Task %s: %s', w.path, e)
+                    self._set(w, exception=e)
+        return changed
+
+    def _batch(self, collection, group):
+        """Returns the status of the given tasks of a collection, by path."""
+        ret = {}
+        try:
+            for i in range(0, len(group), MAX_BATCH):
+                ids = (w.path.rsplit('/', 1)[1] for w in group[i:i + MAX_BATCH])
+                query = ' or '.join("id eq '%s'" % x for x in ids)
+                items = group[-1].rest.iterate(collection, page_size=None,
+                                               prefetch=0,
+                                               params_dict={'$select': 'selfLink,status',
+                                                            '$filter': query})
+                for x in items:
+                    if x.get('selfLink'):
+                        ret[urllib.parse.urlparse(x.selfLink).path] = x.status
+                self.stats['batch_polls'] += 1
+        except Exception as e:
+            LOG.debug('Polling %s failed (%s), polling tasks one by one.',
+                      collection, e)
+            self._no_batch.add(collection)
+            return {}
+        return ret
+
+    def _single(self, w):
+        try:
+            w.result = w.rest.get(w.link)
+            self.stats['single_polls'] += 1
+        except Exception as e:
+            LOG.debug('Polling %s failed: %s', w.path, e)
+            return w.status
+        return w.result.status
+
+    def _fetch(self, w):
+        try:
+            w.result = w.rest.get(w.link)
+            self.stats['fetches'] += 1
+        except Exception as e:
+            LOG.debug('Fetching %s failed: %s', w.path, e)
+
+    def _resolve(self, w):
+        if w.result is not None and w.result.status not in w.pending:
+            self._set(w, result=w.result)
+        elif time.time() >= w.deadline:
+            self._set(w, exception=WaitTimedOut(
+                w.timeout_message.format(w.timeout, w.result)))
+
+    @staticmethod
+    def _set(w, result=None, exception=None):
+        """Resolve a watch's future, unless it was cancelled meanwhile."""
+        if not w.future.set_running_or_notify_cancel():
+            return
+        if exception is not None:
+            w.future.set_exception(exception)
+        else:
+            w.future.set_result(result)
@@ -0,0 +1,150 @@
+'''
+Created on Oct 18, 2026
+
+Per endpoint latency statistics for REST requests.
+
+Requests are grouped by method, URI template (the path with its IDs
+collapsed) and test. Each group keeps a fixed size histogram instead of every
+duration, so memory doesn't grow with the number of requests.
+'''
+import functools
+import json
+import re
+import threading
+import urllib.parse
+
+from ...utils.palb.stats import Histogram
+
+PERCENTILES = (50, 95, 99)
+SIGNIFICANT_BITS = 8
+MAX_SERIES = 5000
+ID_PLACEHOLDER = '{id}'
+OTHER_TEMPLATE = '{other}'
+ID_RE = re.compile(r'''^(?:
+    \d+ |                                                   # numbers
+    [0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12} |  # uuids
+    [0-9a-f]{16,} |                                         # hashes
+    \d{1,3}(?:\.\d{1,3}){3}(?::\d+)? |                      # addresses
+    ~[^/]+                                                  # tmsh names
+)$''', re.I | re.X)
+
+
+@functools.lru_cache(maxsize=4096)
+def uri_template(uri):
+    """Returns the path of a URI with the IDs in it replaced by {id}.
+
+    >>> uri_template('/mgmt/cm/task/1d4b2c6e-1e5f-4f40-8f0a-6d2b2d5e0c11?a=1')
+    '/mgmt/cm/task/{id}'
+    """
+    path = urllib.parse.urlsplit(uri or '').path
+    return '/'.join(ID_PLACEHOLDER if ID_RE.match(x) else x
+                    for x in path.split('/'))
+
+
+class Series(object):
+    """The latencies of one group of requests."""
+    __slots__ = ('method', 'template', 'test', 'histogram', 'lock')
+
+    def __init__(self, method, template, test):
+        self.method = method
+        self.template = template
+        self.test = test
+        self.histogram = Histogram(significant_bits=SIGNIFICANT_BITS)
+        self.lock = threading.Lock()
+
+    def add(self, value):
+        with self.lock:
+            self.histogram.add(value)
+
+    def summary(self, percentiles=PERCENTILES):
+        with self.lock:
+            h = Histogram(significant_bits=SIGNIFICANT_BITS).merge(self.histogram)
+        ret = dict(method=self.method, template=self.template, test=self.test,
+                   count=h.count, min=h.min, max=h.max, mean=h.mean)
+        for p in percentiles:
+            ret['p%d' % p] = h.percentile(p)
+        return ret
+
+
+class RestMetrics(object):
+    """Registry of REST latency histograms.
+
+    Each group has its own lock; recording never takes a registry wide one.
+    Past half max_series groups, new groups are no longer split by test.
+    Past max_series groups, new URI templates are counted as {other}, for all
+    tests, so there's at most one more group per method.
+
+    @param max_series: the most groups to keep
+    @type max_series: int
+    """
+    def __init__(self, max_series=MAX_SERIES):
+        self.max_series = max_series
+        self.test = None
+        self._series = {}
+
+    def __len__(self):
+        return len(self._series)
+
+    def add(self, method, uri, duration):
+        """Record the duration (in seconds) of one request."""
+        template = uri_template(uri)
+        key = (method, template, self.test)
+        series = self._series.get(key)
+        if series is None:
+            if self.test is not None and \
+               len(self._series) >= self.max_series // 2:
+                # Keep the other half for the templates of later tests.
+                key = (method, template, None)
+                series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    key = (method, OTHER_TEMPLATE, None)
+                # setdefault is atomic, racing threads end up with the same one.
+                series = self._series.setdefault(key, Series(*key))
+        series.add(duration)
+
+    def clear(self):
+        self._series = {}
+
+    def snapshot(self, by_test=True):
+        """Returns a summary per group, sorted by method and template.
+
+        @param by_test: False to merge the groups of all tests
+        @type by_test: bool
+        """
+        series = list(self._series.values())
+        if not by_test:
+            merged = {}
+            for s in series:
+                key = (s.method, s.template)
+                if key not in merged:
+                    merged[key] = Series(s.method, s.template, None)
+                with s.lock:
+                    merged[key].histogram.merge(s.histogram)
+            series = list(merged.values())
+        ret = [x.summary() for x in series]
+        ret.sort(key=lambda x: (x['method'], x['template'], x['test'] or ''))
+        return ret
+
+    def dump(self, filename, by_test=True):
+        """Write the summaries as JSON."""
+        with open(filename, 'w') as f:
+            json.dump(self.snapshot(by_test), f, indent=1)
+
+    def points(self, measurement='rest_latency', tags=None, by_test=True):
+        """Returns the summaries as InfluxDB points."""
+        ret = []
+        for summary in self.snapshot(by_test):
+            point_tags = dict(tags or {})
+            point_tags.update(method=summary.pop('method'),
+                              template=summary.pop('template'))
+            test = summary.pop('test')
+            if test:
+                point_tags['test'] = test
+            ret.append({'measurement': measurement,
+                        'tags': point_tags,
+                        'fields': summary})
+        return ret
+
+
+METRICS = RestMetrics()
@@ -0,0 +1,79 @@
+import threading
+import unittest
+
+from f5test.interfaces.rest.metrics import RestMetrics, uri_template
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_templates(self):
+        """Test that IDs are collapsed out of the URIs"""
+        self.assertEqual(uri_template('https://10.1.1.1/mgmt/cm/task/'
+                                      '1d4b2c6e-1e5f-4f40-8f0a-6d2b2d5e0c11'
+                                      '?$top=1'),
+                         '/mgmt/cm/task/{id}')
+        self.assertEqual(uri_template('/mgmt/tm/ltm/pool/~Common~p1/members/'
+                                      '~Common~10.0.0.1:80'),
+                         '/mgmt/tm/ltm/pool/{id}/members/{id}')
+        self.assertEqual(uri_template('/mgmt/shared/index/config/42'),
+                         '/mgmt/shared/index/config/{id}')
+
+    def test02_percentiles(self):
+        """Test the percentiles, per test and across tests"""
+        metrics = RestMetrics()
+
+        def record(offset):
+            for i in range(1, 1001):
+                metrics.add('GET', '/mgmt/a/%d' % i, (i + offset) / 1000.0)
+
+        metrics.test = 't1'
+        threads = [threading.Thread(target=record, args=(0,)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        metrics.test = 't2'
+        record(1000)
+
+        t1, t2 = metrics.snapshot()
+        self.assertEqual((t1['test'], t1['template'], t1['count']),
+                         ('t1', '/mgmt/a/{id}', 4000))
+        self.assertAlmostEqual(t1['p50'], 0.5, delta=0.005)
+        self.assertAlmostEqual(t1['p99'], 0.99, delta=0.01)
+        self.assertAlmostEqual(t2['p95'], 1.95, delta=0.02)
+
+        merged, = metrics.snapshot(by_test=False)
+        self.assertEqual(merged['count'], 5000)
+        self.assertEqual(merged['max'], 2.0)
+
+        point = metrics.points(tags=dict(run='r'))[0]
+        self.assertEqual(point['tags'], dict(run='r', method='GET',
+                                             template='/mgmt/a/{id}', test='t1'))
+        self.assertEqual(point['fields']['count'], 4000)
+
+    def test03_bounded(self):
+        """Test that new templates past the limit are counted as other"""
+        metrics = RestMetrics(max_series=2)
+        for name in 'abc':
+            metrics.add('GET', '/' + name, 1)
+        self.assertEqual([x['template'] for x in metrics.snapshot()],
+                         ['/a', '/b', '{other}'])
+
+    def test04_bounded_tests(self):
+        """Test that tests past the limit are merged, not counted as other"""
+        metrics = RestMetrics(max_series=4)
+        for i in range(100):
+            metrics.test = 'test%d' % i
+            metrics.add('GET', '/a', 1)
+            metrics.add('GET', '/new%s' % chr(ord('a') + i % 26), 1)
+            metrics.add('GET', '/a', 1)
+        self.assertEqual(len(metrics), 5)
+        counts = dict(((x['template'], x['test']), x['count'])
+                      for x in metrics.snapshot())
+        self.assertEqual(counts, {('/a', 'test0'): 2, ('/newa', 'test0'): 1,
+                                  ('/a', None): 198, ('/newb', None): 4,
+                                  ('{other}', None): 95})
+
+
+if __name__ == '__main__':
+    unittest.main()
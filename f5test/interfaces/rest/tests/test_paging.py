@@ -0,0 +1,113 @@
+import threading
+import time
+import unittest
+
+from f5test.base import AttrDict
+from f5test.interfaces.rest.driver import BaseRestResource
+from f5test.utils.rest import FilterSearchForItem
+
+
+class FakeRest(object):
+    """A collection of numbered items, paged with $top/$skip and nextLink."""
+    iterate = BaseRestResource.iterate
+    _pages = BaseRestResource._pages
+
+    def __init__(self, total=10, fail_at=None, delay=0):
+        self.total = total
+        self.fail_at = fail_at
+        self.delay = delay
+        self.requests = []
+
+    def get(self, path, params_dict=None, **params):
+        params_dict = dict(params_dict or {})
+        self.requests.append((path, params_dict))
+        time.sleep(self.delay)
+        skip = int(params_dict.get('$skip', 0))
+        top = int(params_dict.get('$top', 5))
+        if self.fail_at is not None and skip >= self.fail_at:
+            raise ValueError('page at %d' % skip)
+        page = AttrDict(items=[AttrDict(id=i) for i in
+                               range(skip, min(skip + top, self.total))])
+        if skip + top < self.total:
+            page.nextLink = 'https://localhost%s?$top=%d&$skip=%d' % (
+                path, top, skip + top)
+        return page
+
+
+class FakeIfc(object):
+
+    def __init__(self, api):
+        self.api = api
+
+    def is_opened(self):
+        return True
+
+
+def prefetch_threads():
+    return [x for x in threading.enumerate() if x.name == 'rest-prefetch']
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_pages(self):
+        """Test that all pages are read by following nextLink"""
+        for prefetch in (0, 1, 3):
+            rest = FakeRest()
+            ids = [x.id for x in rest.iterate('/mgmt/x', page_size=3,
+                                              prefetch=prefetch,
+                                              params_dict={'$filter': 'a'})]
+            self.assertEqual(ids, list(range(10)))
+            self.assertEqual(rest.requests[0],
+                             ('/mgmt/x', {'$top': 3, '$filter': 'a'}))
+            self.assertEqual([x[1].get('$skip') for x in rest.requests],
+                             [None, '3', '6', '9'])
+
+        # The server picks the page size.
+        rest = FakeRest()
+        self.assertEqual(len(list(rest.iterate('/mgmt/x', page_size=None))),
+                         10)
+        self.assertNotIn('$top', rest.requests[0][1])
+
+    def test02_errors(self):
+        """Test that errors raised while prefetching reach the caller"""
+        for prefetch in (0, 2):
+            rest = FakeRest(fail_at=6)
+            ids = []
+            with self.assertRaises(ValueError):
+                for item in rest.iterate('/mgmt/x', page_size=3,
+                                         prefetch=prefetch):
+                    ids.append(item.id)
+            self.assertEqual(ids, list(range(6)))
+
+    def test03_close(self):
+        """Test that closing the iterator stops the prefetch thread"""
+        rest = FakeRest(total=10000, delay=0.01)
+        items = rest.iterate('/mgmt/x', page_size=1, prefetch=2)
+        self.assertEqual(next(items).id, 0)
+        self.assertTrue(prefetch_threads())
+        items.close()
+
+        for thread in prefetch_threads():
+            thread.join(5)
+        self.assertFalse(prefetch_threads())
+        self.assertLess(len(rest.requests), 10)
+
+    def test04_filter_search(self):
+        """Test that a search for the top result reads only the first page"""
+        rest = FakeRest()
+        search = FilterSearchForItem('/mgmt/x', 'name', 'a', page_size=3,
+                                     ifc=FakeIfc(rest))
+        self.assertEqual(search.run().id, 0)
+        self.assertEqual(len(rest.requests), 1)
+        self.assertEqual(rest.requests[0][1]['$filter'], "name eq 'a'")
+
+        rest = FakeRest()
+        search = FilterSearchForItem('/mgmt/x', 'name', 'a', page_size=3,
+                                     return_top_result=False,
+                                     ifc=FakeIfc(rest))
+        self.assertEqual(len(search.run()), 10)
+        self.assertEqual(len(rest.requests), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import re
+import unittest
+
+from f5test.base import AttrDict
+from f5test.interfaces.rest.emapi.tasks import TaskWatcher
+from f5test.utils.wait import ExponentialBackoff
+
+COLLECTION = '/mgmt/cm/task'
+
+
+class FakeRest(object):
+    """A task collection holding many finished tasks. Watched tasks finish
+    after a few polls; pages hold 2 items."""
+
+    def __init__(self, history=1000):
+        self.tasks = dict(('old%d' % i, 'FINISHED') for i in range(history))
+        self.polls = {}
+        self.queries = []
+        self.items_sent = 0
+
+    def add(self, id_):
+        self.tasks[id_] = 'STARTED'
+        return 'https://localhost%s/%s' % (COLLECTION, id_)
+
+    def _status(self, id_):
+        self.polls[id_] = self.polls.get(id_, 0) + 1
+        if self.polls[id_] >= 3:
+            self.tasks[id_] = 'FINISHED'
+        return self.tasks[id_]
+
+    def iterate(self, path, page_size=None, prefetch=1, params_dict=None):
+        query = params_dict['$filter']
+        self.queries.append(query)
+        ids = re.findall(r"id eq '([^']+)'", query)
+        for i in range(0, len(ids), 2):
+            for id_ in ids[i:i + 2]:
+                self.items_sent += 1
+                yield AttrDict(selfLink='https://localhost%s/%s' % (path, id_),
+                               status=self._status(id_))
+
+    def get(self, link):
+        id_ = link.rsplit('/', 1)[1]
+        if id_.startswith('bad'):
+            # No body.
+            return None
+        return AttrDict(selfLink=link, status=self._status(id_), id=id_)
+
+
+class TestCases(unittest.TestCase):
+
+    def assertStopped(self, watcher):
+        thread = watcher._thread
+        if thread is not None:
+            thread.join(10)
+        self.assertIsNone(watcher._thread)
+
+    def test01_filtered_batch(self):
+        """Test that batch polls only ask for the watched tasks, all pages"""
+        rest = FakeRest()
+        watcher = TaskWatcher('test', ExponentialBackoff(initial=0.01))
+        futures = [watcher.watch(rest, rest.add('t%d' % i), timeout=10)
+                   for i in range(5)]
+        for future in futures:
+            self.assertEqual(future.result(10).status, 'FINISHED')
+
+        self.assertTrue(rest.queries)
+        self.assertTrue(any("id eq 't4'" in x for x in rest.queries))
+        self.assertLessEqual(rest.items_sent, 5 * 3)
+
+    def test02_isolated(self):
+        """Test that cancelled and malformed tasks don't stop the watcher"""
+        rest = FakeRest()
+        watcher = TaskWatcher('test', ExponentialBackoff(initial=0.01))
+        cancelled = watcher.watch(rest, rest.add('t1'), timeout=10)
+        self.assertTrue(cancelled.cancel())
+        bad = watcher.watch(rest, rest.add('bad1'), timeout=10)
+        good = watcher.watch(rest, rest.add('t2'), timeout=10)
+
+        self.assertEqual(good.result(10).status, 'FINISHED')
+        self.assertRaises(AttributeError, bad.result, 10)
+        self.assertStopped(watcher)
+
+    def test03_crash(self):
+        """Test that waiters are told when the watcher thread dies"""
+        rest = FakeRest()
+        watcher = TaskWatcher('test', ExponentialBackoff(initial=0.01))
+        poll = watcher._poll
+        watcher._poll = lambda watches: 1 / 0
+        future = watcher.watch(rest, rest.add('t1'), timeout=10)
+        self.assertRaises(ZeroDivisionError, future.result, 10)
+        self.assertStopped(watcher)
+
+        # The next task gets a new thread.
+        watcher._poll = poll
+        future = watcher.watch(rest, rest.add('t2'), timeout=10)
+        self.assertEqual(future.result(10).status, 'FINISHED')
+
+
+if __name__ == '__main__':
+    unittest.main()
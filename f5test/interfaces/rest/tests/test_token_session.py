@@ -0,0 +1,58 @@
+import unittest
+
+from f5test.base import AttrDict
+from f5test.interfaces.rest.emapi.objects.system import AuthnLogin
+from f5test.interfaces.rest.emapi.session import SessionRegistry
+
+
+class FakeApi(object):
+    """Hands out token-1, token-2... on each login."""
+
+    def __init__(self):
+        self.logins = 0
+
+    def post(self, uri, payload):
+        assert uri == AuthnLogin.URI
+        self.logins += 1
+        return AttrDict(token=dict(token='token-%d' % self.logins,
+                                   timeout=1200),
+                        refreshToken=dict(token='refresh'))
+
+
+def make_ifc(username='admin'):
+    return AttrDict(proto='https', address='10.0.0.1', port=443,
+                    username=username, password='admin', login_ref=None)
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.sessions = SessionRegistry()
+        self.sessions._stopped = True
+
+    def test01_shared(self):
+        """Test that interfaces of the same user share one login"""
+        api = FakeApi()
+        s1 = self.sessions.acquire(make_ifc(), api)
+        s2 = self.sessions.acquire(make_ifc(), FakeApi())
+        self.assertIs(s1, s2)
+        self.assertEqual((s1.token, s1.users, api.logins), ('token-1', 2, 1))
+        self.assertIsNot(self.sessions.acquire(make_ifc('other'), api), s1)
+
+    def test02_renew(self):
+        """Test that an invalidated token is replaced before the next request"""
+        api = FakeApi()
+        session = self.sessions.acquire(make_ifc(), api)
+        self.sessions.renew(session)
+        self.assertEqual(api.logins, 1)
+
+        # E.g. a 401 after a restart, or a failed refresh.
+        self.sessions.invalidate(session)
+        self.assertIsNone(session.token)
+        self.sessions.renew(session)
+        self.assertEqual((session.token, api.logins), ('token-2', 2))
+        self.assertEqual(self.sessions.get_stats().logins, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
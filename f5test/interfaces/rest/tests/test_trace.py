@@ -0,0 +1,96 @@
+import base64
+import io
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from f5test.interfaces.rest.trace import (RequestLogFilter, ResponseLogFilter,
+                                          RequestTrace)
+
+
+class Request(object):
+
+    def __init__(self, url, body=None, headers=None):
+        self.method = 'POST' if body else 'GET'
+        self.url = url
+        self.body = body
+        self.headers = headers or {}
+
+
+class Response(object):
+    status_int = 200
+
+    def __init__(self, body):
+        self._body = io.BufferedReader(io.BytesIO(body))
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.log = logging.getLogger('test_trace')
+        self.log.propagate = False
+        self.stream = io.StringIO()
+        self.handler = logging.StreamHandler(self.stream)
+        self.log.addHandler(self.handler)
+        self.trace = RequestTrace(size=2, body=4)
+
+    def tearDown(self):
+        self.log.removeHandler(self.handler)
+
+    def send(self, request, body, sample=1):
+        RequestLogFilter(self.log, trace=self.trace).on_request(request)
+        ResponseLogFilter(self.log, max_body=8, sample=sample,
+                          trace=self.trace).on_response(Response(body), request)
+
+    def test01_disabled(self):
+        """Test that nothing is logged without DEBUG, but requests are traced"""
+        self.log.setLevel(logging.INFO)
+        self.send(Request('https://a/1'), b'{"a": 1}')
+        self.assertEqual(self.stream.getvalue(), '')
+        self.assertEqual(len(self.trace), 1)
+
+    def test02_curl(self):
+        """Test the curl command line and the capped response body"""
+        self.log.setLevel(logging.DEBUG)
+        auth = base64.b64encode(b'admin:admin').decode()
+        token = 'x' * 100
+        request = Request('https://a/1', "{'a': 1}",
+                          {'Authorization': 'Basic ' + auth,
+                           'Content-Length': '8',
+                           'X-F5-Auth-Token': token})
+        self.send(request, b'0123456789')
+        lines = self.stream.getvalue().splitlines()
+        self.assertEqual(lines[0], "curl -X POST -d '{\\'a\\': 1}' "
+                         "'https://a/1' -sk -u admin:admin "
+                         '-H "X-F5-Auth-Token: %s[...]%s"' %
+                         ('x' * 25, 'x' * 35))
+        self.assertEqual(lines[1], '01234567')
+
+        # Sampling everything out only skips the body.
+        self.stream.truncate(0)
+        self.send(Request('https://a/2'), b'body', sample=0)
+        self.assertEqual(self.stream.getvalue().count('\n'), 1)
+
+    def test03_dump(self):
+        """Test that the ring buffer keeps the last requests"""
+        for i in range(3):
+            self.send(Request('https://a/%d' % i), b'response')
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.assertEqual(self.trace.dump(filename), 2)
+            with open(filename) as f:
+                entries = [json.loads(x) for x in f]
+        finally:
+            os.remove(filename)
+        self.assertEqual([x['url'] for x in entries],
+                         ['https://a/1', 'https://a/2'])
+        self.assertEqual(entries[0]['status'], 200)
+        self.assertEqual(entries[0]['response'], 'resp')
+        self.assertEqual(len(self.trace), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
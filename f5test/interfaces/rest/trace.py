@@ -0,0 +1,179 @@
+'''
+Created on Oct 18, 2026
+
+Cheap logging and tracing of REST requests.
+
+Nothing is formatted unless the logger is enabled for DEBUG, and even then
+only when a handler actually emits the record. Logged bodies are capped and
+can be sampled. Every request also lands in a small ring buffer (TRACE),
+which is dumped as JSON lines when a test fails.
+'''
+import base64
+from collections import deque
+import json
+import logging
+import random
+import threading
+import time
+
+CURL_LOG = "curl -X {method} {payload} '{url}' -sk {credentials} {headers}"
+MAX_BODY = 65536
+TRACE_SIZE = 500
+TRACE_BODY = 512
+TRACE_FILE = 'rest_trace.jsonl'
+
+
+def _text(data, limit):
+    if isinstance(data, bytes):
+        return data[:limit].decode('utf-8', 'replace')
+    return data[:limit]
+
+
+class CurlMessage(object):
+    """A request, formatted as a curl command line."""
+    __slots__ = ('method', 'url', 'headers', 'body', 'max_body')
+
+    def __init__(self, request, max_body=MAX_BODY):
+        self.method = request.method
+        self.url = request.url
+        self.headers = list(request.headers.items())
+        self.body = request.body
+        self.max_body = max_body
+
+    def __str__(self):
+        payload = credentials = ''
+        if self.body:
+            payload = "-d '{}'".format(_text(self.body, self.max_body)
+                                       .replace("'", "\\'"))
+        headers = []
+        for name, value in self.headers:
+            # Recover credentials from Basic auth header
+            if name == 'Authorization':
+                type_, auth = value.split()
+                if type_ == 'Basic':
+                    credentials = "-u " + base64.b64decode(auth).decode()
+            # curl calculates content-length automatically
+            elif name == 'Content-Length':
+                pass
+            else:
+                if 'X-F5-Auth-Token' in name and value and len(value) > 70:
+                    # trim the auth token to free logs
+                    value = "{}[...]{}".format(value[:25], value[-35:])
+                headers.append('-H "{}: {}"'.format(name, value))
+        return CURL_LOG.format(method=self.method, url=self.url,
+                               headers=' '.join(headers),
+                               credentials=credentials, payload=payload)
+
+
+class BodyMessage(object):
+    """The beginning of a response body."""
+    __slots__ = ('body', 'max_body')
+
+    def __init__(self, body, max_body=MAX_BODY):
+        self.body = body
+        self.max_body = max_body
+
+    def __str__(self):
+        return _text(self.body, self.max_body)
+
+
+class RequestTrace(object):
+    """Ring buffer with the last requests and their responses.
+
+    @param size: how many requests to keep
+    @type size: int
+    @param body: how many bytes of each body to keep (0 for none)
+    @type body: int
+    """
+    def __init__(self, size=TRACE_SIZE, body=TRACE_BODY):
+        self.body = body
+        self.enabled = True
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def start(self, request):
+        if self.enabled:
+            request._trace_start = time.time()
+
+    def finish(self, response, request):
+        start = getattr(request, '_trace_start', None)
+        if start is None:
+            return
+        now = time.time()
+        request_body = response_body = None
+        if self.body:
+            if isinstance(request.body, (str, bytes)):
+                request_body = request.body[:self.body]
+            response_body = response._body.peek()[:self.body]
+        self._entries.append((start, now - start, request.method, request.url,
+                              getattr(response, 'status_int', None),
+                              request_body, response_body))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def dump(self, filename):
+        """Write the trace as JSON lines, oldest request first, then clear
+        it. Returns the number of requests written."""
+        with self._lock:
+            entries = list(self._entries)
+            self._entries.clear()
+        with open(filename, 'w') as f:
+            for start, duration, method, url, status, request_body, \
+                    response_body in entries:
+                f.write(json.dumps(dict(
+                    time=start, duration=round(duration, 6), method=method,
+                    url=url, status=status,
+                    request=_text(request_body, self.body) if request_body else None,
+                    response=_text(response_body, self.body) if response_body else None)))
+                f.write('\n')
+        return len(entries)
+
+
+TRACE = RequestTrace()
+
+
+class RequestLogFilter(object):
+    """restkit request filter that logs requests as curl commands.
+
+    @param log: the logger
+    @type log: logging.Logger
+    @param max_body: the most characters of a body to log
+    @type max_body: int
+    """
+    def __init__(self, log, max_body=MAX_BODY, trace=TRACE):
+        self.log = log
+        self.max_body = max_body
+        self.trace = trace
+
+    def on_request(self, request):
+        if self.trace is not None:
+            self.trace.start(request)
+        # We won't log multi-part requests.
+        if self.log.isEnabledFor(logging.DEBUG) and \
+           isinstance(request.body, (type(None), str)):
+            self.log.debug('%s', CurlMessage(request, self.max_body))
+
+
+class ResponseLogFilter(object):
+    """restkit response filter that logs the beginning of response bodies.
+
+    @param sample: the fraction of responses to log (0 to 1)
+    @type sample: float
+    """
+    def __init__(self, log, max_body=MAX_BODY, sample=1, trace=TRACE):
+        self.log = log
+        self.max_body = max_body
+        self.sample = sample
+        self.trace = trace
+
+    def on_response(self, resp, request):
+        if self.trace is not None:
+            self.trace.finish(resp, request)
+        if self.log.isEnabledFor(logging.DEBUG) and \
+           (self.sample >= 1 or random.random() < self.sample):
+            self.log.debug('%s', BodyMessage(resp._body.peek(), self.max_body))
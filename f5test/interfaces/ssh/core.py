@@ -1,10 +1,10 @@
 """Friendly Python SSH2 interface."""
 
-from .driver import Connection
+from .pool import POOL
 from ..config import ConfigInterface, DeviceAccess
+from ..facts import FACTS
 from ...base import Interface
 from ...defaults import ROOT_USERNAME, ROOT_PASSWORD, DEFAULT_PORTS
-from ...utils.decorators import synchronized
 import logging
 
 LOG = logging.getLogger(__name__)
@@ -17,7 +17,8 @@ class SSHInterfaceError(Exception):
 class SSHInterface(Interface):
 
     def __init__(self, device=None, address=None, username=None, password=None,
-                 port=None, timeout=180, key_filename=None, *args, **kwargs):
+                 port=None, timeout=180, key_filename=None, pooled=False,
+                 *args, **kwargs):
         super(SSHInterface, self).__init__()
 
         self.device = device if isinstance(device, DeviceAccess) \
@@ -40,6 +41,7 @@ class SSHInterface(Interface):
         self.port = port or DEFAULT_PORTS['ssh']
         self.timeout = timeout
         self.key_filename = key_filename
+        self.pooled = pooled
 
     def __call__(self, command):
         if not self.is_opened():
@@ -56,9 +58,12 @@ class SSHInterface(Interface):
     @property
     def version(self):
         from ...commands.shell.ssh import get_version
-        if self.api.exists('/VERSION'):
-            return get_version(ifc=self)
-        raise NotImplementedError('Version not available')
+
+        def fetch():
+            if self.api.exists('/VERSION'):
+                return get_version(ifc=self)
+            raise NotImplementedError('Version not available')
+        return FACTS.get(self, 'version', fetch)
 
     @property
     def project(self):
@@ -67,25 +72,24 @@ class SSHInterface(Interface):
             return parse_version_file(ifc=self).get('project')
         raise NotImplementedError('Project not available')
 
-    # paramiko has some concurrency issues when connecting in different
-    # threads at the same time.
-    @synchronized
     def open(self):  # @ReservedAssignment
+        """Connect to the device. Pooled interfaces lease a connection from
+        the shared pool instead of doing a new handshake every time."""
         if self.is_opened():
             return self.api
-        address = self.address
-        username = self.username
-        password = self.password
-
-        api = Connection(address, username, password, port=self.port,
-                         timeout=self.timeout, look_for_keys=True,
-                         key_filename=self.key_filename)
-        api.connect()
-        self.api = api
-        LOG.debug(api._transport)
-        return api
+        if self.api and self.pooled:
+            POOL.release(self.api)
+
+        connect = POOL.acquire if self.pooled else POOL.connect
+        self.api = connect(self.address, self.username, self.password,
+                           port=self.port, timeout=self.timeout,
+                           key_filename=self.key_filename)
+        return self.api
 
     def close(self, *args, **kwargs):
-        if self.is_opened():
-            self.api.close()
+        if self.api:
+            if self.pooled:
+                POOL.release(self.api)
+            elif self.api.is_connected():
+                self.api.close()
         super(SSHInterface, self).close()
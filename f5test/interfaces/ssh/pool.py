@@ -0,0 +1,167 @@
+"""Per-device pool of SSH connections.
+
+Handshakes to different devices run concurrently. Handshakes to the same
+device are serialized, which keeps sshd's MaxStartups throttling at bay.
+"""
+import atexit
+from collections import defaultdict
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+from .driver import Connection
+from ...base import Options
+
+LOG = logging.getLogger(__name__)
+MAX_IDLE = 4
+IDLE_TIMEOUT = 300
+
+
+class ConnectionPool(object):
+    """A thread-safe pool of leased L{Connection} objects, keyed by device.
+
+    A connection is leased to exactly one borrower at a time. Released
+    connections are kept around (up to max_idle per device) and handed out
+    again after a quick health check.
+
+    @param max_idle: maximum number of idle connections kept per device
+    @type max_idle: int
+    @param idle_timeout: seconds after which an idle connection is closed
+    @type idle_timeout: int
+    """
+    def __init__(self, max_idle=MAX_IDLE, idle_timeout=IDLE_TIMEOUT):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle = defaultdict(list)
+        self._leased = {}
+        self._closing = set()
+        self._connect_locks = defaultdict(threading.Lock)
+        self._counters = dict(hits=0, misses=0, evictions=0)
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return "<{0}: {1}>".format(name, self.get_stats())
+
+    @staticmethod
+    def key(address, port, username, password, key_filename=None):
+        return (address, port, username, password, key_filename)
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def _is_healthy(self, conn):
+        if not conn.is_connected():
+            return False
+        try:
+            conn.get_transport().send_ignore()
+        except Exception:
+            return False
+        return True
+
+    def connect(self, address, username, password, port=22, timeout=180,
+                key_filename=None):
+        """Open a new connection that is not tracked by the pool."""
+        key = self.key(address, port, username, password, key_filename)
+        with self._lock:
+            connect_lock = self._connect_locks[key]
+
+        conn = Connection(address, username, password, port=port,
+                          timeout=timeout, look_for_keys=True,
+                          key_filename=key_filename)
+        with connect_lock:
+            conn.connect()
+        LOG.debug(conn._transport)
+        return conn
+
+    def acquire(self, address, username, password, port=22, timeout=180,
+                key_filename=None):
+        """Lease a connection to a device, opening a new one if no healthy
+        idle connection is available."""
+        key = self.key(address, port, username, password, key_filename)
+        self.evict_idle()
+
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                conn = idle.pop()[0] if idle else None
+            if conn is None:
+                break
+            if self._is_healthy(conn):
+                self._count('hits')
+                conn.timeout = timeout
+                with self._lock:
+                    self._leased[id(conn)] = key
+                return conn
+            LOG.debug('Dropping stale SSH connection %s', conn)
+            self._count('evictions')
+            conn.close()
+
+        self._count('misses')
+        conn = self.connect(address, username, password, port=port,
+                            timeout=timeout, key_filename=key_filename)
+        with self._lock:
+            self._leased[id(conn)] = key
+        return conn
+
+    def release(self, conn):
+        """Return a leased connection to the pool."""
+        with self._lock:
+            key = self._leased.pop(id(conn), None)
+            closing = id(conn) in self._closing
+            self._closing.discard(id(conn))
+            keep = key is not None and not closing and \
+                conn.is_connected() and len(self._idle[key]) < self.max_idle
+            if keep:
+                self._idle[key].append((conn, time.time()))
+
+        if not keep:
+            conn.close()
+
+    @contextmanager
+    def lease(self, *args, **kwargs):
+        conn = self.acquire(*args, **kwargs)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def evict_idle(self, max_age=None):
+        """Close idle connections that haven't been used in a while."""
+        if max_age is None:
+            max_age = self.idle_timeout
+        deadline = time.time() - max_age
+        expired = []
+        with self._lock:
+            for key, idle in list(self._idle.items()):
+                fresh = [x for x in idle if x[1] > deadline]
+                expired += [x[0] for x in idle if x[1] <= deadline]
+                if fresh:
+                    self._idle[key] = fresh
+                else:
+                    del self._idle[key]
+            self._counters['evictions'] += len(expired)
+
+        for conn in expired:
+            LOG.debug('Evicting idle SSH connection %s', conn)
+            conn.close()
+
+    def close_all(self):
+        """Close all idle connections. Those leased right now are closed on
+        release instead of going back to the pool."""
+        with self._lock:
+            self._closing.update(self._leased)
+        self.evict_idle(max_age=-1)
+
+    def get_stats(self):
+        with self._lock:
+            ret = Options(self._counters)
+            ret.idle = sum(len(x) for x in self._idle.values())
+            ret.leased = len(self._leased)
+        return ret
+
+
+POOL = ConnectionPool()
+atexit.register(POOL.close_all)
@@ -0,0 +1,353 @@
+"""Long-lived interactive programs (tmsh, mysql, etc.) driven over SSH.
+
+A session owns one SSH connection and one channel running the program. Output
+is framed by the program's prompt. Requests from any number of threads are
+queued and served in order by a single worker thread. If the program exits or
+a request times out, the channel is torn down and respawned on the next
+request.
+"""
+import atexit
+import codecs
+from concurrent.futures import Future
+import logging
+import queue
+import re
+import shlex
+import socket
+import threading
+import time
+
+from .driver import SSHResult, SSHTimeoutError
+from .pool import POOL
+from ...base import Options
+from ...utils.parsers.xmlsql import XmlsqlStream
+
+LOG = logging.getLogger(__name__)
+RESPAWN_BACKOFF = 30
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+
+
+class SessionError(Exception):
+    """The session could not be spawned. Nothing was sent to the device, so
+    it's safe to retry the request some other way."""
+    pass
+
+
+class SessionPromptError(SessionError):
+    """The request stopped at a question (a confirmation, a pager), which was
+    declined. Nothing was changed on the device, so it's safe to retry the
+    request some other way."""
+    pass
+
+
+class SessionClosedError(Exception):
+    """The remote program exited while serving a request."""
+    pass
+
+
+class InteractiveSession(object):
+    """Base class for a remote interactive program.
+
+    Subclasses set the remote command and a regex matching the prompt at the
+    end of each response, and may override on_spawn() and parse_response().
+    Requests that stop at one of the questions (regex, answer) are answered
+    and fail with SessionPromptError.
+    Programs that run without a terminal (pty = False) have no prompt and
+    must frame their responses in their own _execute().
+
+    @param address: the server to connect to
+    @type address: str
+    @param timeout: default timeout (in seconds) for each request
+    @type timeout: int
+    """
+    command = None
+    prompt = None
+    questions = ()
+    pty = True
+    width = 4096
+    height = 24
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, address, username, password, port=22, timeout=180,
+                 key_filename=None):
+        self.address = address
+        self.username = username
+        self.password = password
+        self.port = port
+        self.timeout = timeout
+        self.key_filename = key_filename
+        self._conn = None
+        self._chan = None
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._failed_at = None
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return "<{0}: {1.username}@{1.address}:{1.port}>".format(name, self)
+
+    @classmethod
+    def get(cls, ifc, **kwargs):
+        """Return the shared session for the device behind an SSH interface.
+        Extra arguments are passed to the constructor and are part of the key.
+        """
+        key = (cls, ifc.address, ifc.port, ifc.username, ifc.password,
+               ifc.key_filename, tuple(sorted(kwargs.items())))
+        with cls._registry_lock:
+            session = cls._registry.get(key)
+            if session is None:
+                session = cls(ifc.address, ifc.username, ifc.password,
+                              port=ifc.port, timeout=ifc.timeout,
+                              key_filename=ifc.key_filename, **kwargs)
+                cls._registry[key] = session
+        return session
+
+    @classmethod
+    def close_all(cls):
+        with cls._registry_lock:
+            sessions = list(cls._registry.values())
+            cls._registry.clear()
+        for session in sessions:
+            session.close()
+
+    def is_alive(self):
+        return self._chan is not None and not self._chan.closed and \
+            not self._chan.exit_status_ready()
+
+    def spawn(self):
+        if self._failed_at and time.time() - self._failed_at < RESPAWN_BACKOFF:
+            raise SessionError('%s failed to spawn recently' % self)
+        try:
+            if self._conn is None or not self._conn.is_connected():
+                self._conn = POOL.connect(self.address, self.username,
+                                          self.password, port=self.port,
+                                          timeout=self.timeout,
+                                          key_filename=self.key_filename)
+            chan = self._conn.get_transport().open_session()
+            chan.settimeout(self.timeout)
+            if self.pty:
+                chan.get_pty(term='dumb', width=self.width,
+                             height=self.height)
+            chan.exec_command(self.command)
+            self._chan = chan
+            if self.prompt:
+                self._read_until_prompt()
+            self.on_spawn()
+        except Exception as e:
+            self._failed_at = time.time()
+            self.kill()
+            raise SessionError('Unable to spawn %s: %s' % (self, e))
+        self._failed_at = None
+        LOG.debug('Spawned %s', self)
+
+    def on_spawn(self):
+        """Called once the first prompt is seen (or right after the program
+        is started, if there's no prompt)."""
+        pass
+
+    def kill(self):
+        if self._chan is not None:
+            self._chan.close()
+            self._chan = None
+
+    def close(self):
+        with self._lock:
+            if self._worker is not None:
+                self._queue.put(None)
+                self._worker = None
+        self.kill()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _read_until_prompt(self):
+        chunks = []
+        tail = ''
+        while True:
+            try:
+                chunk = self._chan.recv(65536)
+            except socket.timeout:
+                raise SSHTimeoutError("Socket Timeout waiting for %s" % self)
+            if not chunk:
+                raise SessionClosedError('%s exited' % self)
+            chunk = chunk.decode(errors='replace')
+            chunks.append(chunk)
+            tail = (tail + chunk)[-512:]
+            for question, answer in self.questions:
+                if question.search(tail):
+                    LOG.debug('session: declining %r on %s', tail[-80:], self)
+                    self._chan.sendall(answer.encode())
+                    self._read_until_prompt()
+                    raise SessionPromptError('%s asked a question' % self)
+            match = self.prompt.search(tail)
+            if match:
+                output = ''.join(chunks)
+                output = output[:len(output) - len(tail) + match.start()]
+                return ANSI_ESCAPE.sub('', output).replace('\r', '')
+
+    def _execute(self, line, timeout=None):
+        self._chan.settimeout(timeout or self.timeout)
+        LOG.debug('session: %s on %s...', line, self)
+        self._chan.sendall((line + '\n').encode())
+        output = self._read_until_prompt()
+        # Drop the echoed command line.
+        if output.startswith(line):
+            output = output[len(line):].lstrip('\n')
+        return self.parse_response(line, output)
+
+    def parse_response(self, line, output):
+        return SSHResult(0, output, '', line)
+
+    def _serve(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            line, kwargs, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if not self.is_alive():
+                    self.spawn()
+                ret = self._execute(line, **kwargs)
+            except Exception as e:
+                if not isinstance(e, SessionError):
+                    self.kill()
+                future.set_exception(e)
+            else:
+                future.set_result(ret)
+
+    def submit(self, line, **kwargs):
+        """Queue a request and return a Future for its SSHResult."""
+        future = Future()
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._serve,
+                                                name=repr(self))
+                self._worker.daemon = True
+                self._worker.start()
+            self._queue.put((line, kwargs, future))
+        return future
+
+    def run(self, line, **kwargs):
+        return self.submit(line, **kwargs).result()
+
+
+class TmshSession(InteractiveSession):
+    """An interactive tmsh shell.
+
+    Errors are detected by their message prefix, since tmsh doesn't report an
+    exit status per command. Requests may pass a folder to cd into first.
+
+    The user's cli preferences are left alone. The terminal is tall enough
+    that output isn't paged; if it is anyway, or tmsh asks for a
+    confirmation (e.g. "Display all N items?"), the request fails and
+    callers fall back to a new tmsh process.
+    """
+    command = 'tmsh'
+    prompt = re.compile(r'[^\n]*\(tmos[\w.-]*\)# $')
+    questions = ((re.compile(r'\((y/n|yes/no)\)\s*:?\s*$', re.I), 'n\n'),
+                 (re.compile(r'---\(less \d+%\)---\S*\s*$'), 'q'))
+    errors = re.compile(r'^(Syntax Error|Data Input Error|[0-9a-f]{8}:\d+:)',
+                        re.M)
+    height = 65535
+    default_folder = '/Common'
+
+    def on_spawn(self):
+        self.folder = self.default_folder
+
+    def _execute(self, line, timeout=None, folder=None):
+        folder = folder or self.default_folder
+        if folder != self.folder:
+            ret = super(TmshSession, self)._execute('cd %s' % folder, timeout)
+            if ret.status:
+                return ret
+            self.folder = folder
+        return super(TmshSession, self)._execute(line, timeout)
+
+    def parse_response(self, line, output):
+        if self.errors.search(output):
+            return SSHResult(1, '', output, line)
+        return SSHResult(0, output, '', line)
+
+
+class MysqlSession(InteractiveSession):
+    """A mysql client in batch mode, for one database and mysql user.
+
+    Requests are lists of statements, sent down the channel in one go. Each
+    statement is followed by SHOW ERRORS and a marker SELECT, so the output
+    can be split per statement while it's parsed as a stream. Errors don't
+    end the session (--force). Returns an Options(rows, error) per statement.
+    """
+    pty = False
+    eos_field = 'f5test_eos'
+
+    def __init__(self, *args, **kwargs):
+        self.database = kwargs.pop('database', None)
+        self.sql_username = kwargs.pop('sql_username', None)
+        self.sql_password = kwargs.pop('sql_password', None)
+        super(MysqlSession, self).__init__(*args, **kwargs)
+        self._serial = 0
+
+        args = ['mysql', '-u%s' % shlex.quote(self.sql_username)]
+        if self.sql_password:
+            args.append('-p%s' % shlex.quote(self.sql_password))
+        if self.database:
+            args.append('-D %s' % shlex.quote(self.database))
+        # Batch, XML output, flush after each statement, keep going on errors.
+        args += ['-B', '-X', '-n', '-f', '2>/dev/null']
+        self.command = ' '.join(args)
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return "<{0}: {1.sql_username}@{1.address}/{1.database}>".format(name,
+                                                                       self)
+
+    def on_spawn(self):
+        # Fail here if mysql can't log in, so callers can fall back.
+        self._execute(['SELECT 1'])
+
+    def _recv(self):
+        try:
+            chunk = self._chan.recv(65536)
+        except socket.timeout:
+            raise SSHTimeoutError("Socket Timeout waiting for %s" % self)
+        if not chunk:
+            raise SessionClosedError('%s exited' % self)
+        return self._decoder.decode(chunk)
+
+    def _execute(self, statements, timeout=None):
+        self._chan.settimeout(timeout or self.timeout)
+        self._serial += 1
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        markers = []
+        lines = []
+        for i, statement in enumerate(statements):
+            markers.append('%d:%d' % (self._serial, i))
+            # A lone ; in case the statement ends with a -- comment.
+            lines += [statement.strip().rstrip(';'), ';', 'SHOW ERRORS;',
+                      "SELECT '%s' AS %s;" % (markers[-1], self.eos_field)]
+        LOG.debug('session: %s on %s...', statements, self)
+        self._chan.sendall(('\n'.join(lines) + '\n').encode())
+
+        stream = XmlsqlStream()
+        results = []
+        rows, errors, target = [], [], None
+        while len(results) < len(statements):
+            for event, value in stream.feed(self._recv()):
+                if event == 'resultset':
+                    target = errors if value == 'SHOW ERRORS' else rows
+                elif value.get(self.eos_field) == markers[len(results)]:
+                    error = '\n'.join('ERROR %(Code)s: %(Message)s' % x
+                                      for x in errors)
+                    results.append(Options(rows=rows, error=error or None))
+                    rows, errors, target = [], [], None
+                elif target is not None:
+                    target.append(value)
+        return results
+
+
+atexit.register(InteractiveSession.close_all)
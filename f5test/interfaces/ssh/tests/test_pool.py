@@ -0,0 +1,132 @@
+import threading
+import time
+import unittest
+
+from f5test.interfaces.ssh import pool
+from f5test.interfaces.ssh.pool import ConnectionPool
+
+
+class FakeConnection(object):
+    """Takes a while to connect, and counts the handshakes in progress per
+    device."""
+    lock = threading.Lock()
+    connecting = {}
+    peak = {}
+
+    def __init__(self, address, username, password, port=22, timeout=180,
+                 look_for_keys=True, key_filename=None):
+        self.address = address
+        self.timeout = timeout
+        self.closed = False
+        self.healthy = True
+        self._transport = None
+
+    def connect(self):
+        cls = FakeConnection
+        with cls.lock:
+            cls.connecting[self.address] = cls.connecting.get(self.address, 0) + 1
+            cls.peak[self.address] = max(cls.peak.get(self.address, 0),
+                                         cls.connecting[self.address])
+        time.sleep(0.05)
+        with cls.lock:
+            cls.connecting[self.address] -= 1
+
+    def is_connected(self):
+        return not self.closed
+
+    def get_transport(self):
+        return self
+
+    def send_ignore(self):
+        if not self.healthy:
+            raise EOFError()
+
+    def close(self):
+        self.closed = True
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.connection_class = pool.Connection
+        pool.Connection = FakeConnection
+        FakeConnection.connecting.clear()
+        FakeConnection.peak.clear()
+        self.pool = ConnectionPool(max_idle=2)
+
+    def tearDown(self):
+        pool.Connection = self.connection_class
+
+    def acquire(self, address='10.0.0.1'):
+        return self.pool.acquire(address, 'root', 'default')
+
+    def test01_reuse(self):
+        """Test that released connections are leased again"""
+        conn = self.acquire()
+        self.pool.release(conn)
+        self.assertIs(self.acquire(), conn)
+        self.assertIsNot(self.acquire(), conn)
+        self.assertIsNot(self.acquire('10.0.0.2'), conn)
+        stats = self.pool.get_stats()
+        self.assertEqual((stats.hits, stats.misses, stats.leased), (1, 3, 3))
+
+    def test02_max_idle(self):
+        """Test that at most max_idle connections are kept per device"""
+        conns = [self.acquire() for _ in range(3)]
+        for conn in conns:
+            self.pool.release(conn)
+        self.assertEqual([x.closed for x in conns], [False, False, True])
+        self.assertEqual(self.pool.get_stats().idle, 2)
+
+    def test03_evict(self):
+        """Test that dead and old idle connections are dropped"""
+        dead, old = self.acquire(), self.acquire()
+        self.pool.release(dead)
+        dead.healthy = False
+        conn = self.acquire()
+        self.assertIsNot(conn, dead)
+        self.assertTrue(dead.closed)
+        self.assertEqual(self.pool.get_stats().evictions, 1)
+
+        # Closed while leased: not kept.
+        conn.close()
+        self.pool.release(conn)
+        self.pool.release(old)
+        self.assertEqual(self.pool.get_stats().idle, 1)
+        self.pool.evict_idle(max_age=-1)
+        self.assertTrue(old.closed)
+        self.assertEqual(self.pool.get_stats().idle, 0)
+
+    def test04_connect_lock(self):
+        """Test that handshakes are serialized per device only"""
+        threads = [threading.Thread(target=self.acquire, args=(address,))
+                   for address in ['10.0.0.1'] * 3 + ['10.0.0.2'] * 3]
+        now = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(FakeConnection.peak, {'10.0.0.1': 1, '10.0.0.2': 1})
+        # Both devices at the same time.
+        self.assertLess(time.time() - now, 6 * 0.05)
+        self.assertEqual(self.pool.get_stats().leased, 6)
+
+    def test05_close_all(self):
+        """Test that connections leased during close_all aren't pooled"""
+        idle, leased = self.acquire(), self.acquire()
+        self.pool.release(idle)
+        self.pool.close_all()
+        self.assertTrue(idle.closed)
+        self.assertFalse(leased.closed)
+
+        self.pool.release(leased)
+        self.assertTrue(leased.closed)
+        # Later leases are pooled as usual.
+        conn = self.acquire()
+        self.pool.release(conn)
+        self.assertFalse(conn.closed)
+        self.assertEqual(self.pool.get_stats().idle, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import queue
+import unittest
+
+from f5test.interfaces.ssh.session import TmshSession, SessionPromptError
+
+PROMPT = 'root@(bigip1)(cfg-sync Standalone)(Active)(/Common)(tmos)# '
+
+
+class FakeTmsh(object):
+    """A channel running tmsh. Long lists are paged on short terminals."""
+
+    def __init__(self, device):
+        self.device = device
+        self.closed = False
+        self.pending = None
+        self.height = None
+        self.output = queue.Queue()
+        self.output.put(PROMPT.encode())
+
+    def settimeout(self, timeout):
+        pass
+
+    def get_pty(self, height=24, **kwargs):
+        self.height = height
+
+    def exec_command(self, command):
+        assert command == 'tmsh'
+
+    def exit_status_ready(self):
+        return False
+
+    def close(self):
+        self.closed = True
+
+    def recv(self, size):
+        return self.output.get(timeout=5)
+
+    def sendall(self, data):
+        line = data.decode().rstrip('\n')
+        self.device.commands.append(line)
+        if self.pending == 'pager':
+            self.pending = None
+            self.output.put(('\n' + PROMPT).encode())
+            return
+        if self.pending:
+            output = '%s\n' % line
+            if line == 'y':
+                self.device.objects.discard(self.pending)
+            self.pending = None
+        elif line.startswith('list ltm virtual'):
+            lines = ['ltm virtual v%d { }' % i for i in range(100)]
+            output = '%s\n%s\n' % (line, '\n'.join(lines))
+            if self.height < len(lines):
+                self.pending = 'pager'
+                output = '%s\n%s' % (line, '\n'.join(lines[:self.height - 1] +
+                                                      ['---(less 20%)---']))
+                self.output.put(output.encode())
+                return
+        elif line.startswith('delete '):
+            self.pending = line.split()[-1]
+            self.output.put(('%s\nDelete %s? (y/n) ' % (line, self.pending)).encode())
+            return
+        else:
+            output = '%s\nltm pool p1 { }\n' % line
+        self.output.put((output + PROMPT).encode())
+
+
+class FakeDevice(object):
+
+    def __init__(self):
+        self.objects = set(['p1'])
+        self.commands = []
+
+    def is_connected(self):
+        return True
+
+    def get_transport(self):
+        return self
+
+    def open_session(self):
+        return FakeTmsh(self)
+
+    def close(self):
+        pass
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeDevice()
+        self.session = TmshSession('bigip1', 'admin', 'admin', timeout=5)
+        self.session._conn = self.device
+
+    def test01_pager(self):
+        """Test that output isn't paged, without changing cli preferences"""
+        ret = self.session.run('list ltm pool')
+        self.assertEqual((ret.status, ret.stdout), (0, 'ltm pool p1 { }\n'))
+        ret = self.session.run('list ltm virtual')
+        self.assertEqual(len(ret.stdout.splitlines()), 100)
+        self.assertFalse([x for x in self.device.commands if 'cli' in x])
+
+        # Paged anyway on a short terminal: fail and keep the session usable.
+        self.session.kill()
+        self.session.height = 24
+        self.assertRaises(SessionPromptError, self.session.run,
+                          'list ltm virtual')
+        self.assertEqual(self.session.run('list ltm pool').status, 0)
+        self.session.close()
+
+    def test02_prompt(self):
+        """Test that commands asking for a confirmation fail right away"""
+        future = self.session.submit('delete ltm pool p1')
+        self.assertRaises(SessionPromptError, future.result, 5)
+        self.assertEqual(self.device.objects, set(['p1']))
+
+        # The session is still usable.
+        self.assertEqual(self.session.run('list ltm pool').status, 0)
+        self.session.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import threading
+import time
+import unittest
+
+from f5test.base import Options
+from f5test.interfaces.config.driver import Signals
+from f5test.interfaces.facts import DeviceFacts
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.facts = DeviceFacts(ttls=dict(version=60, provision=0.05))
+        self.calls = 0
+
+    def fetch(self, value='bigip 15.1.0'):
+        def fetch():
+            self.calls += 1
+            return value
+        return fetch
+
+    def test01_shared(self):
+        """Test that facts are shared by all the interfaces of a device"""
+        ssh = Options(address='10.0.0.1', port=22)
+        rest = Options(address='10.0.0.1', port=443)
+        self.assertEqual(self.facts.get(ssh, 'version', self.fetch()),
+                         'bigip 15.1.0')
+        self.assertEqual(self.facts.get(rest, 'version', self.fetch()),
+                         'bigip 15.1.0')
+        self.facts.get('10.0.0.2', 'version', self.fetch())
+        self.assertEqual(self.calls, 2)
+
+        self.facts.get(ssh, 'license', self.fetch({}), variant=True)
+        self.facts.get(ssh, 'license', self.fetch({}), variant=False)
+        self.facts.get(ssh, 'license', self.fetch({}), variant=True)
+        self.assertEqual(self.calls, 4)
+
+    def test02_expire(self):
+        """Test TTLs and invalidation"""
+        self.facts.get('a', 'provision', self.fetch())
+        self.facts.get('a', 'version', self.fetch())
+        self.facts.get('a', 'provision', self.fetch())
+        self.assertEqual(self.calls, 2)
+        time.sleep(0.1)
+        self.facts.get('a', 'provision', self.fetch())
+        self.facts.get('a', 'version', self.fetch())
+        self.assertEqual(self.calls, 3)
+
+        self.facts.invalidate('a')
+        self.facts.get('a', 'version', self.fetch())
+        self.assertEqual(self.calls, 4)
+
+    def test03_changed(self):
+        """Test the signal sent when a fact changes"""
+        changes = []
+
+        def on_changed(sender, **kwargs):
+            changes.append((kwargs['device'], kwargs['name'], kwargs['old'],
+                            kwargs['new']))
+
+        with Signals.on_facts_changed.connected_to(on_changed):
+            self.facts.get('a', 'version', self.fetch('bigip 15.1.0'))
+            self.facts.invalidate('a', 'version')
+            self.facts.get('a', 'version', self.fetch('bigip 15.1.0'))
+            self.facts.invalidate('a', 'version')
+            self.facts.get('a', 'version', self.fetch('bigip 16.1.0'))
+        self.assertEqual(changes, [('a', 'version', 'bigip 15.1.0',
+                                    'bigip 16.1.0')])
+
+    def test04_concurrent(self):
+        """Test that concurrent lookups of a fact only fetch it once"""
+        def slow():
+            self.calls += 1
+            time.sleep(0.05)
+            return 'x'
+
+        threads = [threading.Thread(target=self.facts.get,
+                                    args=('a', 'version', slow))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 from f5test.macros.base import Macro, MacroError
 from f5test.base import Options
 from f5test.interfaces.config import ConfigInterface
+from f5test.interfaces.facts import FACTS
 from f5test.interfaces.icontrol import IcontrolInterface, EMInterface
 from f5test.interfaces.ssh import SSHInterface
 from f5test.interfaces.rest import RestInterface
@@ -689,6 +690,7 @@ class InstallSoftware(Macro):
         else:
             raise VersionNotSupported('%s is not supported' % iso_version)
 
+        FACTS.invalidate(self.address)
         LOG.debug('done')
         return ret
 
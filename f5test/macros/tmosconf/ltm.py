@@ -11,6 +11,7 @@ from ...utils.parsers.tmsh import RawEOL
 from ...utils.net import IPNetworkRd
 from collections import OrderedDict
 from ...base import AttrDict
+from ...utils.version import VersionSwitch
 
 
 class Node(Stamp):
@@ -433,13 +434,18 @@ class Pool2(PropertiesStamp):
     }
     """
 
+    # Properties that older versions don't know about.
+    UNSUPPORTED = VersionSwitch(default=())
+    UNSUPPORTED.register(('autoscale-group-id',),
+                         (None, 'bigip 11.6.2'))  # failed on 11.5, 11.6
+
     def tmsh(self, obj):
         ctx = self.folder.context
         v = ctx.version
         values = list(obj.values())[0]
         if v.product.is_bigip:
-            if v < 'bigip 11.6.2':  # failed on 11.5, 11.6
-                values.pop('autoscale-group-id')
+            for name in self.UNSUPPORTED.resolve(v):
+                values.pop(name)
             return self.get_full_path(), obj
 
 class HttpMonitor(PropertiesStamp):
@@ -540,19 +546,23 @@ class VirtualServer2(PropertiesStamp):
     }
     """
 
+    # Properties that older versions don't know about.
+    UNSUPPORTED = VersionSwitch(default=())
+    UNSUPPORTED.register(('address-status', 'flow-eviction-policy',
+                          'per-flow-request-access-policy',
+                          'urldb-feed-policy',
+                          'service-down-immediate-action', 'service-policy'),
+                         (None, 'bigip 11.6'))  # failed on 11.5
+    UNSUPPORTED.register(('service-down-immediate-action', 'service-policy'),
+                         (None, 'bigip 12.0'))  # failed on 11.6, 11.6.1, 11.6.3
+
     def tmsh(self, obj):
         ctx = self.folder.context
         v = ctx.version
         values = list(obj.values())[0]
         if v.product.is_bigip:
-            if v < 'bigip 11.6':  # failed on 11.5
-                values.pop('address-status')
-                values.pop('flow-eviction-policy')
-                values.pop('per-flow-request-access-policy')
-                values.pop('urldb-feed-policy')
-            if v < 'bigip 12.0':  # failed on 11.6, 11.6.1, 11.6.3
-                values.pop('service-down-immediate-action')
-                values.pop('service-policy')
+            for name in self.UNSUPPORTED.resolve(v):
+                values.pop(name)
             return self.get_full_path(), obj
 
 
@@ -594,18 +604,20 @@ class LsnPool(PropertiesStamp):
     }
     """
 
+    # Properties that older versions don't know about.
+    UNSUPPORTED = VersionSwitch(default=())
+    UNSUPPORTED.register(('inbound_connections', 'port_block_allocation',
+                          'pcp', 'log_publisher', 'log_profile'),
+                         (None, 'bigip 11.6'))  # failed on 11.4.1, 11.5
+
     def tmsh(self, obj):
         ctx = self.folder.context
         v = ctx.version
         if v.product.is_bigip:
             def pop(k, d):
                 return d.pop(k)
-            if v < 'bigip 11.6':  # failed on 11.4.1, 11.5
-                self.properties.inbound_connections = pop
-                self.properties.port_block_allocation = pop
-                self.properties.pcp = pop
-                self.properties.log_publisher = pop
-                self.properties.log_profile = pop
+            for name in self.UNSUPPORTED.resolve(v):
+                self.properties[name] = pop
             return self.get_full_path(), obj
 
 
@@ -3,7 +3,7 @@ Created on Apr 12, 2013
 
 @author: jono
 '''
-from .scaffolding import Stamp
+from .scaffolding import Stamp, can_tmsh
 from ...utils.parsers.tmsh import RawDict, RawEOL
 from ...utils.net import IPNetworkRd
 from netaddr import IPNetwork
@@ -11,11 +11,6 @@ from .scaffolding import PropertiesStamp
 import numbers
 
 
-can_tmsh = lambda v: (v.product.is_bigip and v >= 'bigip 11.0.0' or
-                      v.product.is_em and v >= 'em 2.0.0' or
-                      v.product.is_bigiq or v.product.is_iworkflow)
-
-
 class SelfIP(Stamp):
     TMSH = """
         net self %(key)s {
@@ -8,6 +8,7 @@ Created on Apr 17, 2013
 from f5test.macros.base import Macro
 from f5test.interfaces.ssh import SSHInterface
 from f5test.interfaces.config import ConfigInterface
+from f5test.interfaces.facts import FACTS
 from f5test.interfaces.rest.irack import IrackInterface
 from f5test.interfaces.rest.emapi import EmapiInterface
 from f5test.interfaces.rest.emapi.objects import EasySetup
@@ -18,7 +19,7 @@ from f5test.interfaces.rest.emapi.objects import NetworkDiscover, DeviceResolver
 from f5test.interfaces.rest.core import AUTH
 
 from f5test.macros.tmosconf.scaffolding import Partition, Mirror, enumerate_stamps,\
-    FileStamp
+    FileStamp, can_tmsh
 from f5test.macros.tmosconf.base import (SystemConfig, NetworkConfig)
 from f5test.macros.tmosconf.canned.ltm import LTMConfig
 from f5test.macros.tmosconf.net import SelfIP
@@ -54,6 +55,9 @@ DEFAULT_PARTITIONS = 0
 DEFAULT_ROOT_USERNAME = ROOT_USERNAME
 DEFAULT_ROOT_PASSWORD = ROOT_PASSWORD
 DEFAULT_TIMEOUT = 180
+# Configs with at least this many nodes, pool members and vips are rendered
+# in parallel, unless told otherwise.
+PARALLEL_RENDER_SIZE = 1000
 DEFAULT_SELF_PREFIX = 16
 SCF_FILENAME = '/tmp/config.scf'
 DNS_SERVERS = ['172.27.1.1']
@@ -110,11 +114,6 @@ class ConfigPlacer(Macro):
         # can.* shortcuts to check for certain features based on the version
         self.can = O()
 
-        def can_tmsh(v):
-            return (v.product.is_bigip and v >= 'bigip 11.0.0' or
-                    v.product.is_em and v >= 'em 2.0.0' or
-                    v.product.is_bigiq or
-                    v.product.is_iworkflow)
         self.can.tmsh = can_tmsh
 
         def can_provision(v):
@@ -487,17 +486,30 @@ class ConfigPlacer(Macro):
 #                     if ret.status:
 #                         LOG.warning(ret)
 
+    def get_render_processes(self):
+        """Number of processes used to render the config: the render_processes
+        option, or one per CPU for large configs."""
+        processes = self.options.get('render_processes')
+        if processes is None:
+            size = int(self.options.node_count) + int(self.options.vip_count) + \
+                int(self.options.pool_count) * int(self.options.pool_members)
+            if size >= PARALLEL_RENDER_SIZE:
+                processes = os.cpu_count()
+        return processes
+
     def dump(self, tree, ctx, func=None):
         f = sys.stdout  # @UndefinedVariable
         LOG.info('Rendering configuration file...')
         f.write(HEADER)
-        tree.render(stream=f, func=func)
+        tree.render(stream=f, func=func,
+                    processes=self.get_render_processes())
 
     def load(self, tree, ctx, func=None):
         with self.sshifc.api.sftp().open(SCF_FILENAME, 'w') as f:
             LOG.info('Rendering configuration file...')
             f.write(HEADER)
-            tree.render(stream=f, func=func)
+            tree.render(stream=f, func=func,
+                        processes=self.get_render_processes())
 
         for stamp in enumerate_stamps(tree, FileStamp, include_common=False):
             self.sshifc('mkdir -p %s' % os.path.dirname(stamp.remote_path))
@@ -516,6 +528,8 @@ class ConfigPlacer(Macro):
         else:
             LOG.info('Loading configuration...')
             SCMD.ssh.generic('b import  %s' % SCF_FILENAME, ifc=self.sshifc)
+        # Licensing may have changed.
+        FACTS.invalidate(self.sshifc, 'license')
 
     def save(self, ctx):
         LOG.info('Saving configuration...')
@@ -1136,6 +1150,9 @@ def main(*args, **kwargs):
         p.add_option("", "--timeout",
                      default=DEFAULT_TIMEOUT, type="int",
                      help="The SSH timeout. (default: %d)" % DEFAULT_TIMEOUT)
+        p.add_option("", "--render-processes", metavar="NUMBER", type="int",
+                     help="How many processes render the configuration file. "
+                     "(default: one per CPU for %d+ objects)" % PARALLEL_RENDER_SIZE)
         p.add_option("", "--verbose",
                      action="store_true",
                      help="Debug messages")
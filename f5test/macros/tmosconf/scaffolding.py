@@ -7,15 +7,29 @@ import copy
 import io
 import logging
 import itertools
+import multiprocessing
+import pickle
 from ...utils.dicts import merge, replace
 from ...utils.parsers import tmsh
+from ...utils.version import VersionSwitch, versioned
 from ...base import AttrDict
 import collections
 import yaml
 
 
 PARTITION_COMMON = 'Common'
+RENDER_BATCH = 256
 LOG = logging.getLogger(__name__)
+# Versions configured with tmsh rather than bigpipe.
+TMSH_VERSIONS = ('bigip 11.0.0', 'em 2.0.0', 'bigiq', 'iworkflow')
+# Versions with administrative partitions backed by folders.
+FOLDER_VERSIONS = ('bigip 11.0.0', 'em', 'bigiq', 'iworkflow')
+TMSH_SYNTAX = VersionSwitch(default=False)
+TMSH_SYNTAX.register(True, *TMSH_VERSIONS)
+
+
+def can_tmsh(v):
+    return TMSH_SYNTAX.resolve(v)
 
 
 def make_partitions(name='Partition{0}', count=0, context=None):
@@ -55,6 +69,117 @@ def enumerate_stamps(folder, klass=None, pred=None, include_common=True, cycle=F
                 yield stamp
 
 
+def _is_mutable(value):
+    return isinstance(value, (dict, list, set)) or \
+        isinstance(value, tuple) and any(_is_mutable(x) for x in value)
+
+
+def _fork(value):
+    """Take ownership of a container that is shared with a template."""
+    if isinstance(value, tmsh.GlobDict):
+        return TemplateView(value)
+    if type(value) in (list, tuple):
+        return type(value)(_fork(x) for x in value)
+    if _is_mutable(value):
+        return copy.deepcopy(value)
+    return value
+
+
+class TemplateView(tmsh.GlobDict):
+    """A copy-on-write copy of a parsed template.
+
+    Only the top level is copied. Nested containers are shared with the
+    template until they are accessed through the view, when they're replaced
+    by views (or copies) of their own, so the template is never modified.
+    """
+    def __init__(self, *args, **kwargs):
+        self._shared = set()
+        if args and isinstance(args[0], collections.OrderedDict):
+            args = (collections.OrderedDict.items(args[0]),) + args[1:]
+        super(TemplateView, self).__init__(*args, **kwargs)
+        self._shared.update(k for k, v in collections.OrderedDict.items(self)
+                            if _is_mutable(v))
+
+    def _thaw(self, key):
+        if key in self._shared:
+            self._shared.discard(key)
+            value = collections.OrderedDict.__getitem__(self, key)
+            collections.OrderedDict.__setitem__(self, key, _fork(value))
+
+    def _thaw_all(self):
+        for key in list(self._shared):
+            self._thaw(key)
+
+    def __getitem__(self, key):
+        self._thaw(key)
+        return super(TemplateView, self).__getitem__(key)
+
+    def __setitem__(self, key, value):
+        self._shared.discard(key)
+        super(TemplateView, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._shared.discard(key)
+        super(TemplateView, self).__delitem__(key)
+
+    def __reduce_ex__(self, protocol):
+        return (TemplateView, (list(collections.OrderedDict.items(self)),))
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def pop(self, key, *default):
+        self._thaw(key)
+        self._shared.discard(key)
+        return super(TemplateView, self).pop(key, *default)
+
+    def popitem(self, last=True):
+        self._thaw_all()
+        return super(TemplateView, self).popitem(last)
+
+    def clear(self):
+        self._shared.clear()
+        super(TemplateView, self).clear()
+
+    def items(self):
+        self._thaw_all()
+        return super(TemplateView, self).items()
+
+    def values(self):
+        self._thaw_all()
+        return super(TemplateView, self).values()
+
+
+class StampPickler(pickle.Pickler):
+    """Pickles compiled stamps for the render workers. Stamps referenced
+    by other stamps are sent as their full path, which is how they'd be
+    encoded anyway."""
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Stamp):
+            return str(obj)
+        return None
+
+
+class StampUnpickler(pickle.Unpickler):
+
+    def persistent_load(self, pid):
+        return pid
+
+
+def _dump_batch(data):
+    """Render worker: encode a pickled batch of compiled stamps."""
+    return ''.join(tmsh.dumps(x) for x in StampUnpickler(io.BytesIO(data)).load())
+
+
 class Folder(dict):
     SEPARATOR = '/'
 
@@ -126,18 +251,57 @@ class Folder(dict):
                 else:
                     yield x
 
-    def render(self, recursive=True, stream=None, func=None):
-        if stream is None:
-            stream = io.StringIO()
+    def compile(self, recursive=True, func=None):
+        """Yield the compiled stamps of each folder, in batches of at most
+        RENDER_BATCH stamps."""
         if func is None:
             func = lambda x: True
 
         for folder in self.enumerate(recursive):
+            batch = []
             for stamp in folder.content:
                 if not stamp.built_in and func(stamp):
                     pair = stamp.compile()
                     if pair and pair[1]:
-                        stream.write(tmsh.dumps(pair[1]))
+                        batch.append(pair[1])
+                        if len(batch) >= RENDER_BATCH:
+                            yield batch
+                            batch = []
+            if batch:
+                yield batch
+
+    def render(self, recursive=True, stream=None, func=None, processes=None):
+        """Write the config of all stamps to a stream.
+
+        Stamps are compiled in this process. With processes > 1 they're
+        encoded in a pool of worker processes, while the next batches are
+        compiled, and the output is written in order as it comes back.
+
+        @param processes: number of encoder processes (default: none)
+        @type processes: int
+        """
+        if stream is None:
+            stream = io.StringIO()
+
+        batches = self.compile(recursive, func)
+        if not processes or processes < 2:
+            for batch in batches:
+                for obj in batch:
+                    stream.write(tmsh.dumps(obj))
+            return stream
+
+        def pickled(batches):
+            for batch in batches:
+                f = io.BytesIO()
+                StampPickler(f, pickle.HIGHEST_PROTOCOL).dump(batch)
+                yield f.getvalue()
+
+        pool = multiprocessing.Pool(processes)
+        try:
+            for chunk in pool.imap(_dump_batch, pickled(batches)):
+                stream.write(chunk)
+        finally:
+            pool.terminate()
         return stream
 
 
@@ -166,7 +330,7 @@ class Stamp(object):
         return template
 
     def from_template(self, name):
-        return copy.deepcopy(self.template(name))
+        return TemplateView(self.template(name))
 
     def compile(self):
         # Shortcut for unattached stamps. TMSH is fine.
@@ -178,15 +342,17 @@ class Stamp(object):
                 LOG.error('Unable to compile stamp: %s', self)
                 raise
 
-        v = self.folder.context.version
-        if (v.product.is_bigip and v >= 'bigip 11.0.0' or
-            v.product.is_em and v >= 'em 2.0.0' or
-            v.product.is_bigiq or v.product.is_iworkflow):
-            obj = self.from_template('TMSH')
-            return self.tmsh(obj)
-        else:
-            obj = self.from_template('BIGPIPE')
-            return self.bigpipe(obj)
+        return self.compile_for(self.folder.context.version)
+
+    @versioned
+    def compile_for(self, v):
+        obj = self.from_template('BIGPIPE')
+        return self.bigpipe(obj)
+
+    @compile_for.when(*TMSH_VERSIONS)
+    def compile_for(self, v):
+        obj = self.from_template('TMSH')
+        return self.tmsh(obj)
 
     def tmsh(self, obj):
         return None, None
@@ -308,23 +474,29 @@ class Partition(Stamp):
         super(Partition, self).__init__()
 
     def compile(self):
-        v = self.folder.context.version
+        return self.compile_for(self.folder.context.version)
+
+    @versioned
+    def compile_for(self, v):
         name = self.folder.partition().name
         index = self.folder.partition().index
-        if (v.product.is_bigip and v >= 'bigip 11.0.0' or
-            v.product.is_em or v.product.is_bigiq or v.product.is_iworkflow):
-            obj = self.from_template('TMSH')
-            value = obj.rename_key('auth partition %(name)s', name=name)
-            value['description'] = self.description.format(index)
-            key = self.folder.key()
-            obj.rename_key('sys folder %(key)s', key=key)
-            value = obj['cli admin-partitions']
-            value['update-partition'] = name
-        else:
-            obj = self.from_template('BIGPIPE')
-            value = obj.rename_key('partition %(name)s', name=name)
-            value['description'] = self.description.format(index)
-            value = obj.rename_key('shell write partition %(name)s', name=name)
+        obj = self.from_template('BIGPIPE')
+        value = obj.rename_key('partition %(name)s', name=name)
+        value['description'] = self.description.format(index)
+        value = obj.rename_key('shell write partition %(name)s', name=name)
+        return name, obj
+
+    @compile_for.when(*FOLDER_VERSIONS)
+    def compile_for(self, v):
+        name = self.folder.partition().name
+        index = self.folder.partition().index
+        obj = self.from_template('TMSH')
+        value = obj.rename_key('auth partition %(name)s', name=name)
+        value['description'] = self.description.format(index)
+        key = self.folder.key()
+        obj.rename_key('sys folder %(key)s', key=key)
+        value = obj['cli admin-partitions']
+        value['update-partition'] = name
         return name, obj
 
 
@@ -343,15 +515,18 @@ class FolderStamp(Stamp):
         super(FolderStamp, self).__init__()
 
     def compile(self):
-        v = self.folder.context.version
-        if (v.product.is_bigip and v >= 'bigip 11.0.0' or
-            v.product.is_em or v.product.is_bigiq or v.product.is_iworkflow):
-            key = self.folder.key()
-            obj = self.from_template('TMSH')
-            obj.rename_key('sys folder %(key)s', key=key)
-        else:
-            LOG.debug('Folders not supported')
-            key = obj = None
+        return self.compile_for(self.folder.context.version)
+
+    @versioned
+    def compile_for(self, v):
+        LOG.debug('Folders not supported')
+        return None, None
+
+    @compile_for.when(*FOLDER_VERSIONS)
+    def compile_for(self, v):
+        key = self.folder.key()
+        obj = self.from_template('TMSH')
+        obj.rename_key('sys folder %(key)s', key=key)
         return key, obj
 
 
@@ -0,0 +1,112 @@
+import copy
+import os
+import time
+import unittest
+
+from f5test.base import AttrDict
+from f5test.macros.tmosconf.canned.ltm import LTMConfig
+from f5test.macros.tmosconf.ltm import HttpMonitor, VirtualServer2
+from f5test.macros.tmosconf.scaffolding import make_partitions, TemplateView
+from f5test.utils.parsers import tmsh
+from f5test.utils.version import Version
+
+# Size of the LTM config to benchmark with (number of nodes, pools and vips).
+LTM_SIZE = int(os.environ.get('LTM_SIZE', 2000))
+TEMPLATE = """
+ltm virtual %(key)s {
+    destination 1.1.1.1:80
+    profiles {
+        /Common/http { }
+        /Common/tcp {
+            context all
+        }
+    }
+    vlans { internal external }
+}
+"""
+
+
+def make_tree(size, partitions=0):
+    context = AttrDict(version=Version('bigip 12.1.0'),
+                       provision=AttrDict(ltm='nominal'))
+    tree = make_partitions(count=partitions, context=context)
+    return LTMConfig(context=context, nodes=size, pools=size, members=3,
+                     vips=size, tree=tree).run()
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_template_view(self):
+        """Test that changes to a view don't leak into the template"""
+        template = tmsh.parser(TEMPLATE)
+        expected = copy.deepcopy(template)
+        view = TemplateView(template)
+        self.assertEqual(view, template)
+
+        value = view.rename_key('ltm virtual %(key)s', key='/Common/vs1')
+        value['profiles']['/Common/tcp']['context'] = 'clientside'
+        value['vlans'] += ('vlan3',)
+        del value['destination']
+        self.assertEqual(template, expected)
+        self.assertIn('vlan3', tmsh.dumps(view))
+        self.assertEqual(tmsh.dumps(TemplateView(template)),
+                         tmsh.dumps(expected))
+        self.assertEqual(copy.deepcopy(view), view)
+
+    def test02_render_parallel(self):
+        """Test that parallel rendering yields the same output"""
+        tree = make_tree(50, partitions=2)
+        serial = tree.render().getvalue()
+        self.assertEqual(tree.render(processes=2).getvalue(), serial)
+
+    def test03_versions(self):
+        """Test that stamps compile for the version of their context"""
+        for version, supported in (('bigip 10.2.4', False),
+                                   ('bigip 11.5.0', True),
+                                   ('bigiq 5.0', True)):
+            context = AttrDict(version=Version(version))
+            tree = make_partitions(count=1, context=context)
+            if supported:
+                key, obj = tree['Partition1'].content[0].compile()
+                self.assertEqual(key, 'Partition1')
+                self.assertIn('auth partition Partition1', obj)
+            key, obj = tree['Common'].add('f1').content[0].compile()
+            self.assertEqual(key, '/Common/f1' if supported else None)
+
+        for version, present in (('bigip 11.5.0', False),
+                                 ('bigip 11.6.0', False),
+                                 ('bigip 12.1.0', True)):
+            tree = make_partitions(context=AttrDict(version=Version(version)))
+            stamp = VirtualServer2('vs1')
+            tree['Common'].hook(stamp)
+            _, obj = stamp.compile()
+            values = list(obj.values())[0]
+            self.assertEqual('service-policy' in values, present)
+            self.assertEqual('address-status' in values, version != 'bigip 11.5.0')
+
+    def test04_scale(self):
+        """Test the time it takes to render a large LTM config"""
+        stamp = HttpMonitor('m1')
+        template = stamp.template('TMSH')
+        now = time.time()
+        for _ in range(10000):
+            copy.deepcopy(template)
+        deep = time.time() - now
+        now = time.time()
+        for _ in range(10000):
+            stamp.from_template('TMSH')
+        view = time.time() - now
+        print("10k templates in %.2fs (deepcopy: %.2fs)\n" % (view, deep))
+
+        now = time.time()
+        tree = make_tree(LTM_SIZE)
+        print("%d vips built in %.2fs\n" % (LTM_SIZE, time.time() - now))
+        for processes in (None, os.cpu_count()):
+            now = time.time()
+            tree.render(processes=processes)
+            print("%d vips rendered in %.2fs (%s processes)\n" %
+                  (LTM_SIZE, time.time() - now, processes or 'no'))
+
+
+if __name__ == '__main__':
+    unittest.main()
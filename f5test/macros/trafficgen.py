@@ -25,9 +25,11 @@ class TrafficGen(Macro):
     def setup(self):
         o = self.options
         m = LoadManager(self.urls, concurrency=o.concurrency, 
-                        requests=o.requests, rate=o.rate)
+                        requests=o.requests, rate=o.rate, mode=o.mode or 'curl')
         m.set_timeout(o.timeout)
         m.set_results(o.stats)
+        if o.stats and o.interval:
+            m.set_interval(o.interval)
         
         # XXX: Balancing doesn't work! Should be reworked to use queue 
         # priorities.
@@ -53,6 +55,8 @@ class TrafficGen(Macro):
                     time.sleep(1)
                     countdown -= 1
                     LOG.info('Running...')
+                    if o.stats:
+                        m.get_stats_so_far()
                     if m.producer.done:
                         break
                 else:
@@ -103,10 +107,10 @@ class TrafficGen(Macro):
             print()
             print('Max Concurrency Level:    %d' % (max_concurrency,))
             print('Time taken for tests: %.3f seconds' % (stats.total_wall_time,))
-            print('Complete requests:    %d' % (len(stats.results),))
+            print('Complete requests:    %d' % (stats.count,))
             print('Failed requests:      %d' % (stats.failed_requests,))
             print('Total transferred:    %d bytes' % (stats.total_req_length,))
-            print('Requests per second:  %.2f [#/sec] (mean)' % (len(stats.results) /
+            print('Requests per second:  %.2f [#/sec] (mean)' % (stats.count /
                                                                 stats.total_wall_time,))
             print('Time per request:     %.3f [ms] (mean)' % (stats.avg_req_time * 1000,))
             print('Time per request:     %.3f [ms] (mean,'\
@@ -155,6 +159,10 @@ def main():
                  help="[Threads delta:Sleep]... (default: 1:300:-1:300)")
     p.add_option("-t", "--timeout", metavar="SECONDS", type="int", default=10,
                  help="Timeout (default: 10)")
+    p.add_option("-i", "--interval", metavar="SECONDS", type="int", default=0,
+                 help="Report statistics every N seconds (default: 0/never)")
+    p.add_option("-m", "--mode", metavar="STRING", type="string", default='curl',
+                 help="URL getter: curl, curlmulti, urllib or dns (default: curl)")
 
     options, args = p.parse_args()
 
@@ -19,6 +19,7 @@ from f5test.interfaces.rest.emapi.objects.system import SnmpInbound,\
     SnmpV1V2cAccessRecords
 from influxdb.client import InfluxDBClient
 from f5test.interfaces.rest.emapi.objects.shared import DeviceInfo
+from f5test.interfaces.rest.metrics import METRICS
 
 
 LOG = logging.getLogger(__name__)
@@ -150,6 +151,9 @@ class Grafana(ExtendedPlugin):
                     },
                 }
                 series.append(point)
+        # REST latency percentiles, when the rest_api_stats plugin is enabled.
+        series += METRICS.points(tags={"harness": session.get_harness_id(),
+                                       "run": session.session})
         self.client.write_points(series)
 
     def begin(self):
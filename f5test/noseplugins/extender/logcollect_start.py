@@ -30,6 +30,7 @@ from nose.suite import ContextSuite
 import yaml
 
 from . import ExtendedPlugin
+from ...interfaces.rest.trace import TRACE, TRACE_FILE
 
 LOG = logging.getLogger(__name__)
 STDOUT = logging.getLogger('stdout')
@@ -190,10 +191,12 @@ class LogCollect(ExtendedPlugin):
         Configure plugin. Skip plugin is enabled by default.
         """
         from ...interfaces.testcase import ContextHelper
+        from ...utils.logcollect import LogCollector
         import f5test.commands.ui as UI
         import f5test.commands.shell.ssh as SSH
         self.UI = UI
         self.SSH = SSH
+        self.collector = LogCollector()
 
         if not self.can_configure:
             return
@@ -435,6 +438,10 @@ class LogCollect(ExtendedPlugin):
         filename = os.path.join(test_root, TEST_HTML)
         self.handler_html.commit(filename)
 
+        # Save the last REST requests leading up to the failure.
+        if len(TRACE):
+            TRACE.dump(os.path.join(test_root, TRACE_FILE))
+
         # Sort interfaces by priority.
         interfaces.sort(key=lambda x: x._priority if hasattr(x, '_priority')
                         else 0)
@@ -503,7 +510,8 @@ class LogCollect(ExtendedPlugin):
                                 LOG.error('Screenshot faied: %s', e)
 
                             if credentials.device:
-                                sshifcs.append(SSHInterface(device=credentials.device))
+                                sshifcs.append(SSHInterface(device=credentials.device,
+                                                            pooled=True))
                 except:
                     err = sys.exc_info()
                     tb = ''.join(traceback.format_exception(*err))
@@ -519,34 +527,25 @@ class LogCollect(ExtendedPlugin):
                                             address=interface.address,
                                             username=interface.username,
                                             password=interface.password,
-                                            key_filename=interface.key_filename))
+                                            key_filename=interface.key_filename,
+                                            pooled=True))
 
             elif isinstance(interface, (IcontrolInterface, EMInterface,
                                         RestInterface)):
                 if interface.device and interface.device.address == interface.address:
-                    sshifcs.append(SSHInterface(device=interface.device))
+                    sshifcs.append(SSHInterface(device=interface.device,
+                                                pooled=True))
 
             else:
                 LOG.debug('Skip collection from interface: %s', interface)
 
+            # Collected in the background, all devices at once.
             for sshifc in sshifcs:
-                try:
-                    with sshifc:
-                        address = sshifc.address
-                        if address not in visited['ssh']:
-                            log_root, _ = self._get_or_create_dirs(address, test_root)
-                            LOG.debug('Collecting logs from %s', address)
-                            try:
-                                version = self.SSH.get_version(ifc=sshifc)
-                                self.SSH.collect_logs(log_root, ifc=sshifc,
-                                                      version=version)
-                            except Exception as e:
-                                LOG.error('Collecting logs failed: %s', e)
-                            visited['ssh'].add(address)
-                except:
-                    err = sys.exc_info()
-                    tb = ''.join(traceback.format_exception(*err))
-                    LOG.debug('Error collecting logs. (%s)', tb)
+                address = sshifc.address
+                if address not in visited['ssh']:
+                    log_root, _ = self._get_or_create_dirs(address, test_root)
+                    self.collector.submit(sshifc, log_root)
+                    visited['ssh'].add(address)
 
         del interfaces[:]
 
@@ -575,6 +574,7 @@ class LogCollect(ExtendedPlugin):
         sys.stdout.flush()
         sys.stderr.flush()
         self.handler_html.truncate()
+        TRACE.clear()
 
     def _logging_leak_check(self, root_logger):
         LOG.debug("Logger leak check...ugh!")
@@ -587,4 +587,5 @@ class LogCollect(ExtendedPlugin):
                     LOG.debug(" %s", handler)
 
     def finalize(self, result):
+        self.collector.shutdown()
         self.context.teardown()
@@ -5,23 +5,24 @@ Created on Nov 11, 2015
 '''
 
 import logging
+import os
 from . import ExtendedPlugin, PLUGIN_NAME
 from ...interfaces.testcase import ContextHelper
 from ...interfaces.config import ConfigInterface
-from ...interfaces.rest.driver import timing_info, DELETE_STR, GET_STR,\
-    PATCH_STR, POST_STR, PUT_STR
+from ...interfaces.rest.metrics import METRICS
 LOG = logging.getLogger(__name__)
+STATS_FILE = 'rest_api_stats.json'
 
 
 class RestAPIStats(ExtendedPlugin):
     """
-    Report on all REST API call times.
+    Report on all REST API call times, per method and URI template.
     These can be enabled/disabled by editing rest_api_stats.yaml.
+    The latency percentiles of each test are saved in the session directory.
     """
     enabled = False
     score = 470  # Right after Email executes
     name = "rest_api_stats"
-    timing_info = []
     config = {}
 
     def configure(self, options, noseconfig):
@@ -40,78 +41,30 @@ class RestAPIStats(ExtendedPlugin):
         # Only for testing
         # self.finalize(self.enabled)
 
+    def startTest(self, test, blocking_context=None):
+        METRICS.test = test.id()
+
+    def stopTest(self, test):
+        METRICS.test = None
+
     def report(self):
         """ Report the saved timing information to the log file, if that
-            feature is enabled.
+            feature is enabled, and save it per test as JSON.
         """
         if self.enabled:
             LOG.info("REST API timing info:")
-
-            def minvalue(elements):
-                """ Determine the minimum timing value from the given list of
-                    values. Input list is in seconds.
-
-                    @param elements: List of timing values.
-                    @return: The minimum value from the given list, in
-                    milliseconds.
-                """
-                # Just some value that the first saved value will be less than
-                minvalue = 900000000
-                for element in elements:
-                    if element < minvalue:
-                        minvalue = element
-                return minvalue * 100.0
-
-            def maxvalue(elements):
-                """ Determine the maximum timing value from the given list of
-                    values. Input list is in seconds.
-
-                    @param elements: List of timing values.
-                    @return: The maximum value from the given list, in
-                    milliseconds.
-                """
-                # Just some value that the first saved value will be greater than
-                maxvalue = -900000000
-                for element in elements:
-                    if element > maxvalue:
-                        maxvalue = element
-                return maxvalue * 100.0
-
-            def avgvalue(elements):
-                """ Determine the average timing value from the given list of
-                    values. Input list is in seconds.
-
-                    @param elements: List of timing values.
-                    @return: The average value from the given list, in
-                    milliseconds.
-                """
-                total = 0
-                for element in elements:
-                    total += element
-                return (total / len(elements)) * 100.0
-
-            def output(method):
-                """ Output the summary timing information for the given HTTP
-                    method to the log file, using the data from timing_info.
-
-                    @param method: The HTTP method to report on.
-                """
-                if len(timing_info[method]) == 0:
-                    LOG.info(" " + method + ": No data")
-                else:
-                    LOG.info(" " + method +
-                             ": count=%d, min=%0.fms, max=%0.fms, avg=%0.fms",
-                             len(timing_info[method]),
-                             minvalue(timing_info[method]),
-                             maxvalue(timing_info[method]),
-                             avgvalue(timing_info[method]))
-
-            # Output all the information to the log file for each HTTP method
-            output(GET_STR)
-            output(PUT_STR)
-            output(POST_STR)
-            output(PATCH_STR)
-            output(DELETE_STR)
+            stats = METRICS.snapshot(by_test=False)
+            if not stats:
+                LOG.info(" No data")
+            for x in stats:
+                LOG.info(" %s %s: count=%d, p50=%.0fms, p95=%.0fms, "
+                         "p99=%.0fms, max=%.0fms", x['method'], x['template'],
+                         x['count'], x['p50'] * 1000, x['p95'] * 1000,
+                         x['p99'] * 1000, x['max'] * 1000)
+
+            session = self.cfgifc.get_session()
+            if stats and session.path and os.path.isdir(session.path):
+                METRICS.dump(os.path.join(session.path, STATS_FILE))
 
     def finalize(self, result):
         """ If enabled, run the REST API stats reporting processes.
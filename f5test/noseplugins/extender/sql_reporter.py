@@ -7,7 +7,7 @@ from datetime import datetime
 import json
 import logging
 import mysql.connector
-from mysql.connector.errors import OperationalError
+from mysql.connector.errors import OperationalError, InterfaceError
 import time
 import traceback
 
@@ -15,6 +15,7 @@ from . import ExtendedPlugin, PLUGIN_NAME
 from .report import nose_selector
 from .logcollect_start import get_test_meta
 from ...base import AttrDict
+from ...utils.sql import BatchWriter
 from nose.plugins.skip import SkipTest
 from functools import wraps
 
@@ -25,6 +26,8 @@ ERROR = 'ERROR'
 PASSED = 'PASSED'
 SKIP = 'SKIP'
 INCLUDE_ATTR = ['module', 'uimode', 'hamode', 'scenario', 'doc']
+TESTS_TABLE = 'tests'
+TRACEBACK_COLUMNS = ('run_id', 'name', 'status', 'traceback', 'author', 'start')
 
 
 class SqlReporter(ExtendedPlugin):
@@ -38,6 +41,9 @@ class SqlReporter(ExtendedPlugin):
         - status (Passed/Fail etc)
         - size on disk
         - name, author, test attributes, etc.
+
+    Test results are queued and written in batches by a background thread,
+    so a slow server doesn't slow down the tests.
     """
     enabled = False
     name = "sql_reporter"
@@ -62,42 +68,39 @@ class SqlReporter(ExtendedPlugin):
         self.rerun_id = None
         self.resume_id = int(noseconfig.options.sqlreport_resume or 0)
         self.duts_ids = []
-        self.cursor = None
+        self.writer = None
+
+    def _connect(self):
+        o = self.options
+        return mysql.connector.connect(user=o.user, password=o.password,
+                                       host=o.host, port=o.port,
+                                       database=o.db)
 
     def connect_db(self):
         o = self.options
-        self.cnx = mysql.connector.connect(user=o.user, password=o.password,
-                                           host=o.host, port=o.port,
-                                           database=o.db)
-        self.cursor = self.cnx.cursor(buffered=True)
+        self.writer = BatchWriter(self._connect,
+                                  transient=(OperationalError, InterfaceError),
+                                  batch_size=o.get('batch_size', 100),
+                                  flush_interval=o.get('flush_interval', 5))
 
     def close_db(self):
-        if self.cursor:
-            self.cursor.close()
-            self.cursor = None
-        if self.cnx:
-            self.cnx.close()
-            self.cnx = None
+        if self.writer:
+            self.writer.close()
+            LOG.debug('SQL writer stats: %s', self.writer.stats)
+            self.writer = None
 
     def commit(self, *args, **kwargs):
-        retry = 2
-        while True:
-            try:
-                if not (self.cursor or self.cnx):
-                    LOG.warning("No active DB connection. Attempt to connect..")
-                    self.connect_db()
-                self.cursor.execute(*args, **kwargs)
-                break
-            except OperationalError as e:
-                if retry > 0:
-                    LOG.warning('DB error: {}. Retry...'.format(e))
-                    self.close_db()
-                    retry = retry - 1
-                else:
-                    LOG.warning("DB error: {}. No more retry.".format(e))
-                    break
+        """Run a statement after all queued results are written and return
+        the last row id."""
+        try:
+            return self.writer.execute(*args, **kwargs)
+        except (OperationalError, InterfaceError) as e:
+            LOG.warning("DB error: {}. No more retry.".format(e))
 
-        self.cnx.commit()
+    def insert(self, values, columns=('run_id', 'name', 'status', 'author',
+                                      'start')):
+        """Queue a test result row."""
+        self.writer.insert(TESTS_TABLE, columns, values)
 
     def begin(self):
         """Set the testrun start time.
@@ -110,25 +113,25 @@ class SqlReporter(ExtendedPlugin):
         if self.resume_id:
             query = "INSERT INTO reruns (runner, url, name, start, meta, type, harness, owner, description, run_id) \
                             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
-            self.commit(query, (d.test_runner_ip,
-                                d.session_url,
-                                session.name,
-                                d.time.start,
-                                json.dumps(d.config.testrun),
-                                tr.type, tr.harness, tr.owner, tr.description,
-                                self.resume_id))
+            self.rerun_id = self.commit(query, (d.test_runner_ip,
+                                                d.session_url,
+                                                session.name,
+                                                d.time.start,
+                                                json.dumps(d.config.testrun),
+                                                tr.type, tr.harness, tr.owner,
+                                                tr.description,
+                                                self.resume_id))
             self.run_id = self.resume_id
-            self.rerun_id = self.cursor.lastrowid
         else:
             query = "INSERT INTO runs (runner, url, name, start, meta, type, harness, owner, description) \
                             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
-            self.commit(query, (d.test_runner_ip,
-                                d.session_url,
-                                session.name,
-                                d.time.start,
-                                json.dumps(d.config.testrun),
-                                tr.type, tr.harness, tr.owner, tr.description))
-            self.run_id = self.cursor.lastrowid
+            self.run_id = self.commit(query, (d.test_runner_ip,
+                                              d.session_url,
+                                              session.name,
+                                              d.time.start,
+                                              json.dumps(d.config.testrun),
+                                              tr.type, tr.harness, tr.owner,
+                                              tr.description))
         LOG.info('SQL Run ID: %d', self.run_id)
 
     def startTest(self, test, blocking_context=None):
@@ -139,7 +142,7 @@ class SqlReporter(ExtendedPlugin):
                 query = "INSERT INTO duts (run_id, address, alias, platform, \
                                            version, build, product, project, has_cored) \
                                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
-                self.commit(query, (self.run_id,
+                self.duts_ids.append(self.commit(query, (self.run_id,
                                     dut.device.address,
                                     dut.device.alias,
                                     dut.platform,
@@ -148,22 +151,19 @@ class SqlReporter(ExtendedPlugin):
                                     dut.version.product.to_tmos,
                                     dut.project,
                                     int(dut.cores.data.get(dut.device.alias, False)
-                                        if self.data.cores.data else False)))
-                self.duts_ids.append(self.cursor.lastrowid)
+                                        if self.data.cores.data else False))))
         if blocking_context:
             return
 
     def addSuccess(self, test):
         test_meta = get_test_meta(test, as_dict=True)
 
-        query = "INSERT INTO tests (run_id, name, status, author, start) \
-                        VALUES (%s, %s, %s, %s, %s)"
-        self.commit(query, (self.run_id,
-                            nose_selector(test),
-                            'PASS',
-                            test_meta['author'],
-                            datetime.fromtimestamp(test._start)
-                            ))
+        self.insert((self.run_id,
+                     nose_selector(test),
+                     'PASS',
+                     test_meta['author'],
+                     datetime.fromtimestamp(test._start)
+                     ))
 
     def addError(self, test, err):
         test_meta = get_test_meta(test, as_dict=True)
@@ -173,40 +173,34 @@ class SqlReporter(ExtendedPlugin):
         else:
             status = 'ERROR'
 
-        query = "INSERT INTO tests (run_id, name, status, traceback, author, start) \
-                        VALUES (%s, %s, %s, %s, %s, %s)"
-        self.commit(query, (self.run_id,
-                            nose_selector(test),
-                            status,
-                            ''.join(traceback.format_exception(*err)),
-                            test_meta['author'],
-                            datetime.fromtimestamp(test._start)
-                            ))
+        self.insert((self.run_id,
+                     nose_selector(test),
+                     status,
+                     ''.join(traceback.format_exception(*err)),
+                     test_meta['author'],
+                     datetime.fromtimestamp(test._start)
+                     ), TRACEBACK_COLUMNS)
 
     def addFailure(self, test, err):
         test_meta = get_test_meta(test, as_dict=True)
 
-        query = "INSERT INTO tests (run_id, name, status, traceback, author, start) \
-                        VALUES (%s, %s, %s, %s, %s, %s)"
-        self.commit(query, (self.run_id,
-                            nose_selector(test),
-                            'FAIL',
-                            ''.join(traceback.format_exception(*err)),
-                            test_meta['author'],
-                            datetime.fromtimestamp(test._start)
-                            ))
+        self.insert((self.run_id,
+                     nose_selector(test),
+                     'FAIL',
+                     ''.join(traceback.format_exception(*err)),
+                     test_meta['author'],
+                     datetime.fromtimestamp(test._start)
+                     ), TRACEBACK_COLUMNS)
 
     def addBlocked(self, test, err):
         test_meta = get_test_meta(test, as_dict=True)
 
-        query = "INSERT INTO tests (run_id, name, status, author, start) \
-                        VALUES (%s, %s, %s, %s, %s)"
-        self.commit(query, (self.run_id,
-                            nose_selector(test),
-                            'BLOCK',
-                            test_meta['author'],
-                            datetime.fromtimestamp(test._start) if hasattr(test, '_start') else None
-                            ))
+        self.insert((self.run_id,
+                     nose_selector(test),
+                     'BLOCK',
+                     test_meta['author'],
+                     datetime.fromtimestamp(test._start) if hasattr(test, '_start') else None
+                     ))
 
     def finalize(self, result):
         try:
@@ -260,9 +254,8 @@ def sql_log_result():
                     sql_plugin = plugin
                     break
 
-            insert = "INSERT INTO tests (run_id, name, status, author, start, \
-                        stop, traceback) \
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)"
+            columns = ('run_id', 'name', 'status', 'author', 'start', 'stop',
+                       'traceback')
             data = (run_id,
                     method_name,
                     status,
@@ -271,7 +264,7 @@ def sql_log_result():
                     datetime.fromtimestamp(stop_time),
                     tb
                     )
-            sql_plugin.commit(insert, data)
+            sql_plugin.insert(data, columns)
 
         return wraps(f)(addResult_mysql)
     return _my_decorator
@@ -13,11 +13,12 @@ from ..interfaces.selenium import SeleniumInterface
 from ..interfaces.ssh import SSHInterface
 from ..interfaces.icontrol.em import EMInterface
 from ..interfaces.rest import RestInterface
+from ..interfaces.rest.trace import TRACE, TRACE_FILE
 from ..interfaces.icontrol import IcontrolInterface
 from ..interfaces.config import ConfigInterface
 from ..base import Interface
+from ..utils.logcollect import LogCollector
 import f5test.commands.ui as UI
-import f5test.commands.shell.ssh as SSH
 
 
 LOG = logging.getLogger(__name__)
@@ -60,6 +61,8 @@ class Plugin(object):
         self.visited_ssh = set()
         self.visited_selenium = set()
         self.visited_fixtures = set()
+        self.collector = LogCollector()
+        self.pending = {}
 
     def try_screenshots(self, item, interface):
         if isinstance(interface, SeleniumInterface):
@@ -146,55 +149,78 @@ class Plugin(object):
                     address = credentials.address or window
 
                 if credentials.device and address not in self.visited_ssh:
-                    sshifcs.append(SSHInterface(device=credentials.device))
+                    sshifcs.append(SSHInterface(device=credentials.device,
+                                                pooled=True))
         elif isinstance(interface, SSHInterface):
             # Clone the SSH interface, rather than reusing it.
             sshifcs.append(SSHInterface(device=interface.device,
                                         address=interface.address,
                                         username=interface.username,
                                         password=interface.password,
-                                        key_filename=interface.key_filename))
+                                        key_filename=interface.key_filename,
+                                        pooled=True))
         elif isinstance(interface, (IcontrolInterface, EMInterface, RestInterface)):
             if interface.device and interface.device.address == interface.address:
-                sshifcs.append(SSHInterface(device=interface.device))
+                sshifcs.append(SSHInterface(device=interface.device,
+                                            pooled=True))
         else:
             LOG.debug('Skip collection from interface: %s', interface)
             return collected
 
         test_root = self.create_item_dir(item)
-        logger = rp_logger(item)
 
+        # Devices are collected in parallel. The logs are attached by the
+        # test's own pytest_runtest_logfinish, as ReportPortal attaches them
+        # to whatever test is current.
+        _, pending = self.pending.setdefault(item.nodeid, (item, []))
         for sshifc in sshifcs:
             address = sshifc.address
             if address in self.visited_ssh:
                 continue
 
-            with sshifc:
-                log_root, _ = self._get_or_create_dirs(address, test_root)
-                LOG.debug('Collecting logs from %s', address)
-                try:
-                    version = SSH.get_version(ifc=sshifc)
-                    for filename, content in SSH.collect_logs(ifc=sshifc,
-                                                              version=version):
-                        logger.info("Log: %s > %s" % (sshifc.address, filename),
-                                    attachment={
-                                        "name": filename,
-                                        "data": content,
-                                        "mime": "text/plain",
-                        })
-
-                    collected += 1
-                except Exception as e:
-                    LOG.error('Collecting logs failed: %s', e)
-                self.visited_ssh.add(address)
+            log_root, _ = self._get_or_create_dirs(address, test_root)
+            pending.append((address, self.collector.submit(sshifc, log_root)))
+            collected += 1
+            self.visited_ssh.add(address)
 
         return collected
 
+    def attach_logs(self, item, pending):
+        logger = rp_logger(item)
+        for address, future in pending:
+            try:
+                files = future.result()
+            except Exception:
+                # Already logged by the collector.
+                continue
+            for filename, path in files:
+                with open(path, 'rb') as f:
+                    content = f.read()
+                logger.info("Log: %s > %s" % (address, filename),
+                            attachment={
+                                "name": filename,
+                                "data": content,
+                                "mime": "text/plain",
+                })
+
     def pytest_sessionstart(self, session):
         config = self.context.get_config().api
         if config.testrun and session.config.pluginmanager.has_plugin('pytest_reportportal'):
             session.config.addinivalue_line('rp_launch_tags', 'harness:%s' % config.testrun.harness)
 
+    def pytest_runtest_logstart(self, nodeid, location):
+        TRACE.clear()
+
+    def pytest_runtest_logfinish(self, nodeid, location):
+        if nodeid in self.pending:
+            self.attach_logs(*self.pending.pop(nodeid))
+
+    def pytest_sessionfinish(self, session):
+        for item, pending in self.pending.values():
+            self.attach_logs(item, pending)
+        self.pending.clear()
+        self.collector.shutdown()
+
     def pytest_report_header(self, config):
         return ["sessiondir: %s" % self.session.path,
                 "sessionurl: %s" % self.session.get_url()]
@@ -231,6 +257,10 @@ class Plugin(object):
                     self.try_screenshots(item, interface)
                     collected += self.try_collect(item, interface)
 
+            # Save the last REST requests leading up to the failure.
+            if len(TRACE):
+                TRACE.dump(os.path.join(self.create_item_dir(item), TRACE_FILE))
+
             #if collected > 0:
             #    test_name = sanitize_test_name(item)
             #    url = self.session.get_url() + '/' + test_name
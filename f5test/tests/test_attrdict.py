@@ -0,0 +1,128 @@
+import copy
+import json
+import os
+import pickle
+import time
+import unittest
+
+from f5test.base import AttrDict, LazyAttrDict
+
+# Space separated list of captured REST responses (JSON) to benchmark with.
+JSON_FILES = os.environ.get('JSON_FILES', '').split()
+# Number of items in the generated inventory, when no files are given.
+INVENTORY_SIZE = int(os.environ.get('INVENTORY_SIZE', 5000))
+
+
+def make_inventory(size):
+    items = []
+    for i in range(size):
+        items.append({
+            'uuid': 'uuid-%d' % i,
+            'address': '10.0.%d.%d' % (i // 256, i % 256),
+            'version': '13.1.0',
+            'properties': {'cm:gui:module': ['adc_core', 'asm'],
+                           'dmz': {'enabled': False, 'port': 443}},
+            'selfLink': 'https://localhost/mgmt/shared/resolver/device-groups/'
+                        'cm-bigip-allDevices/devices/uuid-%d' % i,
+        })
+    return json.dumps({'items': items, 'totalItems': size,
+                       'kind': 'shared:resolver:device-groups:devicescollectionstate'})
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_lazy_reads(self):
+        """Test that the lazy view reads like an AttrDict"""
+        raw = json.loads(make_inventory(3))
+        eager = AttrDict(raw)
+        lazy = LazyAttrDict(json.loads(make_inventory(3)))
+
+        self.assertEqual(lazy, eager)
+        self.assertEqual(lazy['items'][1].properties.dmz.port, 443)
+        self.assertIsInstance(lazy['items'][0], AttrDict)
+        self.assertIsNone(lazy.missing)
+        self.assertEqual(lazy.get('missing', 1), 1)
+        self.assertEqual(json.dumps(lazy, sort_keys=True),
+                         json.dumps(eager, sort_keys=True))
+        self.assertEqual(pickle.loads(pickle.dumps(lazy)), eager)
+        self.assertEqual(copy.deepcopy(lazy), eager)
+        for key, value in lazy.items():
+            self.assertEqual(type(value) is dict, False, key)
+
+    def test02_lazy_writes(self):
+        """Test that writes go through converted nodes only"""
+        raw = json.loads(make_inventory(2))
+        lazy = LazyAttrDict(raw)
+        lazy['items'][0].properties.dmz.enabled = True
+        lazy.update({'extra': {'a': 1}})
+        lazy.setdefault('kind', 'x')
+        self.assertTrue(lazy['items'][0]['properties']['dmz']['enabled'])
+        self.assertFalse(raw['items'][0]['properties']['dmz']['enabled'])
+        self.assertEqual(lazy.extra.a, 1)
+        self.assertEqual(lazy.pop('totalItems'), 2)
+        self.assertNotIn('totalItems', lazy)
+
+    def test03_lists(self):
+        """Test that lists are converted once and keep their identity"""
+        lazy = LazyAttrDict(json.loads(make_inventory(20000)))
+        items = lazy['items']
+        self.assertIs(lazy['items'], items)
+        self.assertIs(lazy.get('items'), items)
+        self.assertIs(lazy['items'][5], items[5])
+        items.append('x')
+        self.assertEqual(lazy['items'][-1], 'x')
+
+        now = time.time()
+        for i in range(2000):
+            lazy['items'][i].uuid
+        self.assertLess(time.time() - now, 0.5)
+
+        self.assertEqual(pickle.loads(pickle.dumps(lazy))['items'], items)
+        self.assertEqual(copy.deepcopy(lazy)['items'][-1], 'x')
+
+    def test05_copies(self):
+        """Test that shallow copies hold converted nodes, like AttrDict's"""
+        copies = (lambda x: x.copy(), dict, lambda x: {**x}, copy.copy)
+        for make in copies:
+            eager = make(AttrDict(json.loads(make_inventory(2))))
+            lazy = make(LazyAttrDict(json.loads(make_inventory(2))))
+            self.assertEqual(lazy, eager)
+            self.assertEqual(type(lazy) is dict, type(eager) is dict)
+            item = lazy['items'][1]
+            self.assertIsInstance(item, AttrDict)
+            self.assertEqual(item.properties.dmz.port, 443)
+
+    def test04_benchmark(self):
+        """Test the time it takes to parse and read large responses"""
+        payloads = []
+        for filename in JSON_FILES:
+            with open(filename) as f:
+                payloads.append((filename, f.read()))
+        if not payloads:
+            payloads.append(('%d devices' % INVENTORY_SIZE,
+                             make_inventory(INVENTORY_SIZE)))
+
+        for name, payload in payloads:
+            now = time.time()
+            json.loads(payload)
+            parse = time.time() - now
+            now = time.time()
+            eager = AttrDict(json.loads(payload))
+            eager_time = time.time() - now
+            now = time.time()
+            lazy = LazyAttrDict(json.loads(payload))
+            lazy_time = time.time() - now
+            now = time.time()
+            for item in lazy.get('items') or []:
+                getattr(item, 'selfLink')
+            for i in range(len(lazy.get('items') or [])):
+                lazy['items'][i].selfLink
+            scan = time.time() - now
+            self.assertEqual(lazy, eager)
+            print("%s: json %.3fs, AttrDict %.3fs, lazy %.3fs "
+                  "(+%.3fs to read every item twice)\n" %
+                  (name, parse, eager_time, lazy_time, scan))
+
+
+if __name__ == '__main__':
+    unittest.main()
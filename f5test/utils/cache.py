@@ -0,0 +1,244 @@
+'''
+Created on Oct 18, 2026
+
+Cache backends for the results of CachedCommands.
+
+Entries are tagged with the device they came from so that everything known
+about a device can be dropped at once, e.g. after a reboot. The local LRU
+cache is bounded in size; the memcached tier lets parallel workers share
+expensive results.
+'''
+from collections import Counter, OrderedDict
+import hashlib
+import logging
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+MISSING = object()
+DEFAULT_SIZE = 512
+DEFAULT_TTL = 3600
+# Longest a TieredCache serves an entry from its local tier, so that devices
+# invalidated by other workers aren't seen stale for long.
+LOCAL_TTL = 5
+CACHE = None
+
+
+class CacheStats(Counter):
+    """Counts hits, misses, expirations and evictions."""
+
+    @property
+    def hit_rate(self):
+        lookups = self['hits'] + self['misses']
+        return self['hits'] / lookups if lookups else 0.0
+
+
+class LruCache(object):
+    """An in-process cache that evicts the least recently used entries.
+
+    @param maxsize: the most entries kept
+    @type maxsize: int
+    @param ttl: the default seconds an entry is kept (0 for ever)
+    @type ttl: int
+    """
+    def __init__(self, maxsize=DEFAULT_SIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=MISSING, tag=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires, _ = entry
+                if not expires or expires > time.time():
+                    self._data.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return value
+                del self._data[key]
+                self.stats['expired'] += 1
+            self.stats['misses'] += 1
+        return default
+
+    def set(self, key, value, ttl=None, tag=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires = time.time() + ttl if ttl else 0
+        with self._lock:
+            self._data[key] = (value, expires, tag)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def delete(self, key, tag=None):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self, tag):
+        """Drop all the entries of a device."""
+        with self._lock:
+            for key in [k for k, v in self._data.items() if v[2] == tag]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class MemcacheCache(object):
+    """A cache shared through memcached.
+
+    Invalidating a device bumps its generation number, which is part of the
+    keys of its entries, so old entries are simply never read again. Entries
+    are stored along with their expiration time, so that other tiers can keep
+    them for no longer than memcached does.
+
+    @param servers: memcached addresses
+    @type servers: list
+    @param prefix: prepended to all the keys
+    @type prefix: str
+    """
+    def __init__(self, servers, prefix='f5test_', ttl=DEFAULT_TTL):
+        import pylibmc
+        self.mc = pylibmc.Client(servers, binary=True,
+                                 behaviors={"tcp_nodelay": True,
+                                            "ketama": True})
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    def _key(self, key, tag):
+        generation = 0
+        if tag is not None:
+            generation = self.mc.get(self._tag_key(tag)) or 0
+        return '%s%s_%d' % (self.prefix, key, generation)
+
+    def _tag_key(self, tag):
+        return '%sgen_%s' % (self.prefix,
+                             hashlib.md5(str(tag).encode()).hexdigest())
+
+    def get_entry(self, key, tag=None):
+        """Returns a (value, expires) tuple, expires being 0 for entries kept
+        for ever. The value is MISSING if there's no such entry."""
+        entry = self.mc.get(self._key(key, tag))
+        if entry is None:
+            self.stats['misses'] += 1
+            return MISSING, 0
+        self.stats['hits'] += 1
+        return entry
+
+    def get(self, key, default=MISSING, tag=None):
+        value, _ = self.get_entry(key, tag)
+        return default if value is MISSING else value
+
+    def set(self, key, value, ttl=None, tag=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires = time.time() + ttl if ttl else 0
+        self.mc.set(self._key(key, tag), (value, expires), int(ttl))
+
+    def delete(self, key, tag=None):
+        self.mc.delete(self._key(key, tag))
+
+    def invalidate(self, tag):
+        tag_key = self._tag_key(tag)
+        if not self.mc.add(tag_key, 1):
+            self.mc.incr(tag_key)
+
+    def clear(self):
+        pass
+
+
+class TieredCache(object):
+    """A local cache backed by a shared one.
+
+    Only the shared tier knows when another worker invalidated a device, so
+    entries are kept locally for local_ttl seconds at most.
+
+    @type local: LruCache
+    @type shared: MemcacheCache
+    @param local_ttl: the most seconds an entry is kept locally
+    @type local_ttl: float
+    """
+    def __init__(self, local, shared, local_ttl=LOCAL_TTL):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+
+    def _local_ttl(self, ttl):
+        if ttl is None:
+            ttl = self.local.ttl
+        return min(ttl, self.local_ttl) if ttl else self.local_ttl
+
+    @property
+    def stats(self):
+        return CacheStats(self.local.stats + self.shared.stats)
+
+    def get(self, key, default=MISSING, tag=None):
+        value = self.local.get(key)
+        if value is MISSING:
+            try:
+                value, expires = self.shared.get_entry(key, tag=tag)
+            except Exception as e:
+                LOG.debug('Shared cache unavailable: %s', e)
+            if value is MISSING:
+                return default
+            # Keep it locally for what's left of its own TTL, if shorter.
+            if expires:
+                ttl = expires - time.time()
+                if ttl <= 0:
+                    return default
+            else:
+                ttl = 0
+            self.local.set(key, value, self._local_ttl(ttl), tag)
+        return value
+
+    def set(self, key, value, ttl=None, tag=None):
+        self.local.set(key, value, self._local_ttl(ttl), tag)
+        try:
+            self.shared.set(key, value, ttl, tag)
+        except Exception as e:
+            LOG.debug('Shared cache unavailable: %s', e)
+
+    def delete(self, key, tag=None):
+        self.local.delete(key)
+        try:
+            self.shared.delete(key, tag)
+        except Exception as e:
+            LOG.debug('Shared cache unavailable: %s', e)
+
+    def invalidate(self, tag):
+        self.local.invalidate(tag)
+        try:
+            self.shared.invalidate(tag)
+        except Exception as e:
+            LOG.debug('Shared cache unavailable: %s', e)
+
+    def clear(self):
+        self.local.clear()
+
+
+def get_cache():
+    """Returns the current cache backend, an LruCache unless set_cache() was
+    called."""
+    global CACHE
+    if CACHE is None:
+        CACHE = LruCache()
+    return CACHE
+
+
+def set_cache(cache):
+    global CACHE
+    CACHE = cache
+
+
+def invalidate(tag):
+    """Drop all the cached entries of a device."""
+    if CACHE is not None:
+        CACHE.invalidate(tag)
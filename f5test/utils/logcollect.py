@@ -0,0 +1,171 @@
+'''
+Created on Oct 18, 2026
+
+Collects log files from many devices at once, in the background.
+
+Each device takes one round trip to stat its log files and one gzipped tar
+stream to fetch them all. Byte offsets are remembered per file, so later
+collections only pull what was logged since the previous one.
+'''
+from collections import defaultdict
+import concurrent.futures
+import logging
+import os
+import shlex
+import shutil
+import tarfile
+import threading
+
+from ..commands.shell.ssh import get_log_files, get_version
+
+LOG = logging.getLogger(__name__)
+MAX_WORKERS = 8
+MAX_BYTES = 4 * 1024 * 1024
+TAR_SCRIPT = 'D=$(mktemp -d /var/tmp/logcollect.XXXXXX) && cd "$D" && ' \
+             '{ %s; tar czf - .; cd /; rm -rf "$D"; }'
+
+
+class LogCollectError(Exception):
+    pass
+
+
+class LogCollector(object):
+    """Pulls log files from devices on a pool of worker threads.
+
+    The first time a file is seen its last lines are collected (like
+    L{f5test.commands.shell.ssh.CollectLogs} does). After that, only the bytes
+    appended since are. Rotated or truncated files start over.
+
+    @param max_workers: how many devices to collect from at the same time
+    @type max_workers: int
+    @param max_bytes: the most bytes pulled from one file in one collection
+    @type max_bytes: int
+    """
+    def __init__(self, max_workers=MAX_WORKERS, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix='logcollect')
+        self._lock = threading.Lock()
+        self._device_locks = defaultdict(threading.Lock)
+        self._offsets = {}
+        self._pending = set()
+
+    def submit(self, sshifc, log_root, files=None):
+        """Collect logs in the background.
+
+        @param sshifc: a closed SSH interface, opened by the worker
+        @type sshifc: SSHInterface
+        @param log_root: local directory to write the logs to
+        @type log_root: str
+        @param files: (shell glob, line count) pairs, default per version
+        @type files: list
+        @return: a Future for the list of (name, local path) written
+        """
+        future = self._executor.submit(self.collect, sshifc, log_root, files)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        if not future.cancelled() and future.exception():
+            LOG.error('Collecting logs failed: %s', future.exception())
+
+    def wait(self, timeout=None):
+        """Wait for all pending collections."""
+        with self._lock:
+            pending = list(self._pending)
+        concurrent.futures.wait(pending, timeout)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def collect(self, sshifc, log_root, files=None):
+        """Collect logs from one device, in the calling thread."""
+        key = (sshifc.address, sshifc.port)
+        with self._lock:
+            device_lock = self._device_locks[key]
+
+        with device_lock, sshifc:
+            LOG.debug('Collecting logs from %s', sshifc.address)
+            if files is None:
+                files = get_log_files(get_version(ifc=sshifc))
+            commands, offsets = self._plan(key, self._stat(sshifc, files))
+            if not commands:
+                return []
+            ret = self._fetch(sshifc, commands, log_root)
+            with self._lock:
+                self._offsets.update(offsets)
+            return ret
+
+    def _stat(self, sshifc, files):
+        """Returns (inode, size, path, lines) for each existing file."""
+        script = []
+        for pattern, lines in files:
+            script.append('echo "# %d"; stat -Lc "%%i %%s %%n" %s 2>/dev/null' %
+                          (lines, pattern))
+        ret = sshifc.api.run('; '.join(script))
+
+        stats = []
+        lines = 0
+        for line in ret.stdout.splitlines():
+            if line.startswith('# '):
+                lines = int(line[2:])
+            elif line:
+                inode, size, path = line.split(' ', 2)
+                stats.append((int(inode), int(size), path, lines))
+        return stats
+
+    def _plan(self, key, stats):
+        """Returns the shell commands that copy what's new in each file, and
+        the offsets to remember once they're fetched."""
+        commands = []
+        offsets = {}
+        names = set()
+        for inode, size, path, lines in stats:
+            with self._lock:
+                previous = self._offsets.get(key + (path,))
+            quoted = shlex.quote(path)
+            if previous and previous[0] == inode and previous[1] <= size:
+                if previous[1] == size:
+                    continue
+                start = max(previous[1], size - self.max_bytes)
+                command = 'tail -c +%d %s | head -c %d' % (start + 1, quoted,
+                                                           size - start)
+            else:
+                command = 'tail -n %d %s | tail -c %d' % (lines, quoted,
+                                                          self.max_bytes)
+
+            name = os.path.basename(path)
+            if name in names:
+                name = path.strip('/').replace('/', '_')
+            names.add(name)
+            commands.append('%s > %s' % (command, shlex.quote(name)))
+            offsets[key + (path,)] = (inode, size)
+        return commands, offsets
+
+    def _fetch(self, sshifc, commands, log_root):
+        """Runs the commands in a temporary directory and unpacks the tar
+        stream of their output into log_root, as it comes in."""
+        chan = sshifc.api.get_transport().open_session()
+        chan.settimeout(sshifc.timeout)
+        chan.exec_command(TAR_SCRIPT % '; '.join(commands))
+
+        ret = []
+        try:
+            with tarfile.open(fileobj=chan.makefile('rb'), mode='r|gz') as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    name = os.path.basename(member.name)
+                    path = os.path.join(log_root, name)
+                    with open(path, 'wb') as f:
+                        shutil.copyfileobj(tar.extractfile(member), f)
+                    ret.append((name, path))
+        except tarfile.TarError as e:
+            raise LogCollectError('%s: %s' % (sshifc.address, e))
+        finally:
+            chan.close()
+        return ret
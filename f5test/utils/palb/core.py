@@ -1,5 +1,6 @@
 
 from .stats import ResultStats
+from collections import deque
 import queue
 import itertools
 import logging
@@ -38,6 +39,8 @@ class Result(object):
 
 
 class URLGetter(threading.Thread):
+    # How many concurrent requests one getter can handle.
+    max_slots = 1
 
     def __init__(self, signup_list, result_queue):
         threading.Thread.__init__(self)
@@ -47,6 +50,12 @@ class URLGetter(threading.Thread):
         self.results_enabled = True
         self.manager = None
         self.done = False
+        self.slots = 1
+
+    def set_slots(self, n):
+        self.slots = n
+        if not n:
+            self.done = True
 
     def run(self):
         mng = self.manager
@@ -73,7 +82,7 @@ class URLGetter(threading.Thread):
                 self.result_queue.put(result)
         self.signup_list.remove(self)
         #LOG.debug("xxx: %s", self.signup_list)
-        LOG.debug('%s done' % self._Thread__name)
+        LOG.debug('%s done', self)
 
     def get_url(self, url):
         return NotImplementedError
@@ -97,26 +106,42 @@ class URLGetterPool(object):
         self.result_queue = queue.Queue()
         self.getters = []
         self.ratios = {}
+        # URLs over their share, held back by non-blocking requests.
+        self.deferred = deque()
         
         if mode == 'curl':
             from .getter.curl import url_getter #@UnusedImport
+        elif mode == 'curlmulti':
+            from .getter.curlmulti import url_getter #@UnusedImport @Reimport
         elif mode == 'urllib':
             from .getter.urllib import url_getter #@UnusedImport @Reimport
         elif mode == 'dns':
             from .getter.dns import url_getter #@Reimport
         else:
-            raise NotImplementedError('Mode %s unknown. Only curl, urllib and dns allowed.' % mode)
+            raise NotImplementedError('Mode %s unknown. Only curl, curlmulti, urllib and dns allowed.' % mode)
         self.getter = url_getter
 
-    def job_request(self):
+    def job_request(self, block=True):
+        """Returns the next URL to get, or None.
+
+        @param block: when balancing, wait for a URL that is under its share.
+                      Otherwise, URLs over their share are held back for
+                      later calls and None is returned once they've all been
+                      tried, so event-loop getters never sleep.
+        @type block: bool
+        """
         secs = 0
+        attempts = len(self.deferred) + 1
         
         url = None
         while True:
             try:
-                url = self.url_queue.get_nowait()
-            except queue.Empty:
-                return
+                url = self.deferred.popleft()
+            except IndexError:
+                try:
+                    url = self.url_queue.get_nowait()
+                except queue.Empty:
+                    return
 
             # Die when a None URL is gotten.
             if not url:
@@ -125,6 +150,12 @@ class URLGetterPool(object):
             # Balance requests equally for all workers.
             if self.balancing_enabled and \
                self.ratios.get(url, 0) >= self.size / self.urls_len:
+                if not block:
+                    self.deferred.append(url)
+                    attempts -= 1
+                    if not attempts:
+                        return
+                    continue
                 time.sleep(secs)
                 secs += self.balance_delay
             else:
@@ -154,8 +185,10 @@ class URLGetterPool(object):
         self.add(self.size)
 
     def add(self, n):
-        for _ in range(n):
+        while n > 0:
             t = self.getter(self.getters, self.result_queue)
+            t.set_slots(min(n, t.max_slots))
+            n -= t.slots
             t.manager = self
             if self.limit_rate > 0:
                 t.set_rate_limit(self.limit_rate)
@@ -166,16 +199,22 @@ class URLGetterPool(object):
             if self.dns:
                 t.set_dns(self.dns)
             t.start()
-        self.size = len(self.getters)
+        self.size = sum(x.slots for x in self.getters if not x.done)
 
     def remove(self, n):
-        for getter in self.getters[:n]:
-            LOG.debug('stopping %s', getter)
-            getter.done = True
-        self.size -= n
+        for getter in self.getters[:]:
+            if n <= 0:
+                break
+            if getter.done:
+                continue
+            k = min(n, getter.slots)
+            LOG.debug('stopping %d slots of %s', k, getter)
+            getter.set_slots(getter.slots - k)
+            n -= k
+        self.size = sum(x.slots for x in self.getters if not x.done)
 
     def stop(self):
-        self.remove(len(self.getters))
+        self.remove(self.size)
         while len(self.getters) > 0:
             LOG.debug('Wait for %d more workers to finish' % len(self.getters))
             time.sleep(1)
@@ -261,14 +300,26 @@ class LoadManager(object):
 
     def set_results(self, enabled=True):
         """
-        Enable statistics. WARNING: This will significantly slow down the
-        traffic generator and increase the memory footprint over time.
+        Enable statistics. WARNING: This will slow down the traffic generator
+        and increase the memory footprint over time, unless results are
+        drained periodically with get_stats_so_far().
         
         @param enabled: On/Off
         @type enabled: bool
         """
         self.pool.results_enabled = enabled
 
+    def set_interval(self, seconds, reporter=None):
+        """
+        Report statistics every N seconds while the results are collected.
+
+        @param seconds: interval length
+        @type seconds: int
+        @param reporter: called with the ResultStats of each interval
+        @type reporter: callable
+        """
+        self.stats = ResultStats(interval=seconds, reporter=reporter)
+
     def set_balancing(self, enabled=True, delay=0.01):
         """
         Balance per URL. Example: the url list contains one very slow url and
@@ -309,7 +360,7 @@ class LoadManager(object):
             self.stop()
             raise Exception('Nonsense in BASIC')
         LOG.debug('Wait for %d requests to finish...' % self.n)
-        for _ in range(self.n):
+        for _ in range(self.n - self.stats.count):
             try:
                 self.stats.add(self.pool.result_queue.get())
             except KeyboardInterrupt:
@@ -329,18 +380,21 @@ class LoadManager(object):
 
 class PALB(object):
 
-    def __init__(self, urls, c=1, n=1):
+    def __init__(self, urls, c=1, n=1, mode='curl'):
         self.c = c
         self.n = n
         self.urls = urls
+        self.mode = mode
 
     def start(self):
         out = sys.stdout
 
-        pool = URLGetterPool(self.c)
+        url_queue = queue.Queue(100)
+        pool = URLGetterPool(url_queue, self.c, urls_len=len(self.urls),
+                             mode=self.mode)
         pool.start()
 
-        producer = URLProducer(pool.url_queue, self.urls, n = self.n)
+        producer = URLProducer(url_queue, self.urls, n = self.n)
 
         print('This is palb, Version', __version__, file=out)
         #print >> out, 'Copyright (c) 2009', __author__
@@ -366,10 +420,10 @@ class PALB(object):
         print(file=out)
         print('Concurrency Level:    %d' % (self.c,), file=out)
         print('Time taken for tests: %.3f seconds' % (stats.total_wall_time,), file=out)
-        print('Complete requests:    %d' % (len(stats.results),), file=out)
+        print('Complete requests:    %d' % (stats.count,), file=out)
         print('Failed requests:      %d' % (stats.failed_requests,), file=out)
         print('Total transferred:    %d bytes' % (stats.total_req_length,), file=out)
-        print('Requests per second:  %.2f [#/sec] (mean)' % (len(stats.results) /
+        print('Requests per second:  %.2f [#/sec] (mean)' % (stats.count /
                                                                     stats.total_wall_time,), file=out)
         print('Time per request:     %.3f [ms] (mean)' % (stats.avg_req_time * 1000,), file=out)
         print('Time per request:     %.3f [ms] (mean,'\
@@ -414,6 +468,9 @@ URL strings (package.module:func). the function gets a list with all remaining c
 line arguments''')
     parser.add_option('-f', '--url-file', dest = 'url_file', default = None,
                       help = '''file with one URL per line''')
+    parser.add_option('-m', '--mode', dest = 'mode', default = 'curl',
+                      help = '''URL getter: curl (one thread per request), curlmulti
+(one event loop thread per 1000 requests), urllib or dns''')
 
     (options, args) = parser.parse_args()
 
@@ -430,5 +487,5 @@ line arguments''')
         urls = args
     else:
         parser.error('need one or more URL(s) or -u|-f argument')
-    palb = PALB(urls, c = options.c, n = options.n)
+    palb = PALB(urls, c = options.c, n = options.n, mode = options.mode)
     palb.start()
@@ -20,29 +20,35 @@ class PyCurlURLGetter(URLGetter):
     fp = open(_null_file, "wb")
     def __init__(self, signup_list, result_queue):
         URLGetter.__init__(self, signup_list, result_queue)
-        self.c =  pycurl.Curl()
-        self.c.setopt(pycurl.WRITEDATA, self.fp)
-        self.c.setopt(pycurl.MAXCONNECTS, 1)
-        self.c.setopt(pycurl.SSL_VERIFYHOST, 0)
-        self.c.setopt(pycurl.SSL_VERIFYPEER, 0)
-        self.c.setopt(pycurl.NOSIGNAL, 1)
         self.headers = []
         self.dns = None
         self.resolver = Resolver(configure=False)
+        self.c = self.new_handle()
+        self.setopt(pycurl.WRITEDATA, self.fp)
+        self.setopt(pycurl.MAXCONNECTS, 1)
+        self.setopt(pycurl.SSL_VERIFYHOST, 0)
+        self.setopt(pycurl.SSL_VERIFYPEER, 0)
+        self.setopt(pycurl.NOSIGNAL, 1)
+
+    def new_handle(self):
+        return pycurl.Curl()
+
+    def setopt(self, option, value):
+        self.c.setopt(option, value)
 
     def set_rate_limit(self, n):
-        self.c.setopt(pycurl.MAX_RECV_SPEED_LARGE, int(n))
+        self.setopt(pycurl.MAX_RECV_SPEED_LARGE, int(n))
 
     def set_headers(self, h):
         self.headers = h
-        self.c.setopt(pycurl.HTTPHEADER, self.headers)
+        self.setopt(pycurl.HTTPHEADER, self.headers)
 
     def set_debug(self, f):
-        self.c.setopt(pycurl.VERBOSE, int(f))
+        self.setopt(pycurl.VERBOSE, int(f))
 
     def set_timeout(self, n):
-        LOG.debug('%s set_timeout %d', self._Thread__name, n)
-        self.c.setopt(pycurl.TIMEOUT, int(n))
+        LOG.debug('%s set_timeout %d', self, n)
+        self.setopt(pycurl.TIMEOUT, int(n))
 
     def set_dns(self, dns):
         self.dns = dns
@@ -50,17 +56,19 @@ class PyCurlURLGetter(URLGetter):
     def set_keepalive(self, f):
         if f:
             self.headers += ['Connection: Keep-Alive']
-            self.c.setopt(pycurl.HTTPHEADER, self.headers)
-            self.c.setopt(pycurl.FORBID_REUSE, 0)
-            self.c.setopt(pycurl.FRESH_CONNECT, 0)
+            self.setopt(pycurl.HTTPHEADER, self.headers)
+            self.setopt(pycurl.FORBID_REUSE, 0)
+            self.setopt(pycurl.FRESH_CONNECT, 0)
         else:
-            self.c.setopt(pycurl.FORBID_REUSE, 1)
-            self.c.setopt(pycurl.FRESH_CONNECT, 1)
+            self.setopt(pycurl.FORBID_REUSE, 1)
+            self.setopt(pycurl.FRESH_CONNECT, 1)
 
     def close(self):
         self.c.close()
 
-    def get_url(self, url):
+    def prepare(self, c, url):
+        """Point the handle c to url, resolving the host name first if a DNS
+        server was set."""
         if self.dns:
             self.resolver.nameservers = [self.dns]
             u = urllib.parse.urlparse(url)
@@ -75,22 +83,29 @@ class PyCurlURLGetter(URLGetter):
                 else:
                     netloc = ip
                 url = urllib.parse.urlunsplit((u[0], netloc, u[2], u[3], u[4]))
-                self.c.setopt(pycurl.HTTPHEADER, self.headers + ['Host: %s' % qname])
+                c.setopt(pycurl.HTTPHEADER, self.headers + ['Host: %s' % qname])
 
         url = str(url)
-        self.c.setopt(pycurl.URL, url)
+        c.setopt(pycurl.URL, url)
+        return url
+
+    def result(self, c):
+        status = c.getinfo(pycurl.RESPONSE_CODE)
+        size = c.getinfo(pycurl.SIZE_DOWNLOAD)
+        t_total = c.getinfo(pycurl.TOTAL_TIME)
+        t_connect = c.getinfo(pycurl.CONNECT_TIME)
+        t_start = c.getinfo(pycurl.STARTTRANSFER_TIME)
+        t_proc = t_total - t_connect
+        return Result(t_total, size, status, detail_time=(t_connect, t_proc, t_start))
+
+    def get_url(self, url):
+        url = self.prepare(self.c, url)
         try:
             self.c.perform()
         except Exception as e:
             # to avoid hogging the CPU in case of repeated errors
             time.sleep(.1)
             LOG.warn("curl barfed on '%s': %s", url, e)
-        status = self.c.getinfo(pycurl.RESPONSE_CODE)
-        size = self.c.getinfo(pycurl.SIZE_DOWNLOAD)
-        t_total = self.c.getinfo(pycurl.TOTAL_TIME)
-        t_connect = self.c.getinfo(pycurl.CONNECT_TIME)
-        t_start = self.c.getinfo(pycurl.STARTTRANSFER_TIME)
-        t_proc = t_total - t_connect
-        return Result(t_total, size, status, detail_time=(t_connect, t_proc, t_start))
+        return self.result(self.c)
 
 url_getter = PyCurlURLGetter
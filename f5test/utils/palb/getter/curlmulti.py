@@ -0,0 +1,151 @@
+'''
+Event-loop getter: a single thread drives thousands of concurrent transfers
+through one pycurl.CurlMulti, using the socket-action interface.
+'''
+import logging
+import selectors
+import time
+
+import pycurl
+
+from .. import core
+from .curl import PyCurlURLGetter
+
+LOG = logging.getLogger(__name__)
+POLL_INTERVAL = 0.1
+IDLE_INTERVAL = 0.01
+
+
+class CurlMultiURLGetter(PyCurlURLGetter):
+    name = 'curlmulti'
+    max_slots = 1000
+
+    def __init__(self, signup_list, result_queue):
+        self.options = {}
+        self.handles = []
+        self.free = []
+        self.active = {}
+        PyCurlURLGetter.__init__(self, signup_list, result_queue)
+        self.free.append(self.c)
+
+        self.selector = selectors.DefaultSelector()
+        self.deadline = None
+        self.multi = pycurl.CurlMulti()
+        self.multi.setopt(pycurl.M_MAXCONNECTS, self.max_slots)
+        self.multi.setopt(pycurl.M_SOCKETFUNCTION, self._on_socket)
+        self.multi.setopt(pycurl.M_TIMERFUNCTION, self._on_timer)
+
+    def new_handle(self):
+        c = pycurl.Curl()
+        for option, value in self.options.items():
+            c.setopt(option, value)
+        self.handles.append(c)
+        return c
+
+    def setopt(self, option, value):
+        self.options[option] = value
+        for c in self.handles:
+            c.setopt(option, value)
+
+    def close(self):
+        for c in list(self.active):
+            self.multi.remove_handle(c)
+        self.active.clear()
+        for c in self.handles:
+            c.close()
+        self.multi.close()
+        self.selector.close()
+
+    def _on_socket(self, event, fd, multi, data):
+        if event == pycurl.POLL_REMOVE:
+            try:
+                self.selector.unregister(fd)
+            except KeyError:
+                pass
+            return
+
+        mask = 0
+        if event & pycurl.POLL_IN:
+            mask |= selectors.EVENT_READ
+        if event & pycurl.POLL_OUT:
+            mask |= selectors.EVENT_WRITE
+        try:
+            self.selector.modify(fd, mask)
+        except KeyError:
+            self.selector.register(fd, mask)
+
+    def _on_timer(self, timeout_ms):
+        if timeout_ms < 0:
+            self.deadline = None
+        else:
+            self.deadline = time.time() + timeout_ms / 1000.0
+
+    def _fill(self, mng):
+        while len(self.active) < self.slots:
+            # Sleeping here would stall all the transfers in flight. URLs over
+            # their share are tried again on the next pass.
+            url = mng.job_request(block=False)
+            if url is None:
+                break
+            c = self.free.pop() if self.free else self.new_handle()
+            self.active[c] = url
+            self.prepare(c, url)
+            self.multi.add_handle(c)
+
+    def _poll(self):
+        timeout = POLL_INTERVAL
+        if self.deadline is not None:
+            timeout = max(0, min(timeout, self.deadline - time.time()))
+
+        for key, mask in self.selector.select(timeout):
+            action = 0
+            if mask & selectors.EVENT_READ:
+                action |= pycurl.CSELECT_IN
+            if mask & selectors.EVENT_WRITE:
+                action |= pycurl.CSELECT_OUT
+            self.multi.socket_action(key.fd, action)
+
+        if self.deadline is not None and time.time() >= self.deadline:
+            self.deadline = None
+            self.multi.socket_action(pycurl.SOCKET_TIMEOUT, 0)
+
+    def _collect(self, mng):
+        while True:
+            queued, ok_list, err_list = self.multi.info_read()
+            for c in ok_list:
+                self._done(c, mng)
+            for c, errno, errmsg in err_list:
+                LOG.warn("curl barfed on '%s': (%d) %s", self.active[c],
+                         errno, errmsg)
+                self._done(c, mng)
+            if not queued:
+                break
+
+    def _done(self, c, mng):
+        url = self.active.pop(c)
+        self.multi.remove_handle(c)
+        result = self.result(c)
+        mng.job_done(url)
+        if self.results_enabled:
+            self.result_queue.put(result)
+        self.free.append(c)
+
+    def run(self):
+        mng = self.manager
+        while core.keep_processing:
+            if not self.done:
+                self._fill(mng)
+            elif not self.active:
+                break
+
+            if self.active:
+                self._poll()
+                self._collect(mng)
+            else:
+                time.sleep(IDLE_INTERVAL)
+
+        self.close()
+        self.signup_list.remove(self)
+        LOG.debug('%s done', self)
+
+url_getter = CurlMultiURLGetter
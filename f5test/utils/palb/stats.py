@@ -1,77 +1,227 @@
-
+import collections
+import logging
 import math
 import time
 
+LOG = logging.getLogger('palb.stats')
+PERCENTILES = (50, 66, 75, 80, 90, 95, 98, 99)
+
+
+class Histogram(object):
+    """A high dynamic range histogram with a fixed memory footprint.
+
+    Values are scaled to integer units and counted in log-linear buckets:
+    every power of two is split in 2^(significant_bits - 1) buckets, so the
+    relative error of any percentile is below 2^-(significant_bits - 1).
+    Count, min, max, mean and standard deviation are exact.
+
+    @param significant_bits: precision of the buckets (default 11 is ~0.1%)
+    @type significant_bits: int
+    @param unit: size of one integer unit (default 1us for seconds)
+    @type unit: float
+    """
+    def __init__(self, significant_bits=11, unit=1e-6):
+        self.significant_bits = significant_bits
+        self.unit = unit
+        self.sub_count = 1 << significant_bits
+        self.half_count = self.sub_count >> 1
+        self.counts = collections.Counter()
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _index(self, n):
+        if n < self.sub_count:
+            return n
+        shift = n.bit_length() - self.significant_bits
+        return shift * self.half_count + (n >> shift)
+
+    def _highest(self, index):
+        if index < self.sub_count:
+            return index
+        shift = (index - self.sub_count) // self.half_count + 1
+        return ((index - shift * self.half_count + 1) << shift) - 1
+
+    def add(self, value):
+        n = max(0, int(round(value / self.unit)))
+        self.counts[self._index(n)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        # Welford's online variance.
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+    def merge(self, other):
+        """Add all values recorded by another histogram with the same
+        precision and unit."""
+        assert (self.significant_bits, self.unit) == \
+            (other.significant_bits, other.unit), 'Incompatible histograms'
+        if not other.count:
+            return self
+        if self.count:
+            n = self.count + other.count
+            delta = other._mean - self._mean
+            self._m2 += other._m2 + delta * delta * self.count * other.count / n
+            self._mean += delta * other.count / n
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        else:
+            self._mean, self._m2 = other._mean, other._m2
+            self.min, self.max = other.min, other.max
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total += other.total
+        return self
+
+    @property
+    def mean(self):
+        return self._mean
+
+    @property
+    def std_deviation(self):
+        if self.count < 2:
+            return 0
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    def percentile(self, p):
+        """The highest value below which p percent of the values fall."""
+        if not self.count:
+            return 0
+        if p >= 100:
+            return self.max
+        rank = p / 100.0 * self.count - 0.001
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                value = self._highest(index) * self.unit
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def median(self):
+        return self.percentile(50)
+
+
 class ResultStats(object):
-    def __init__(self):
-        self.results = []
+    """Streaming statistics over palb Results.
+
+    Nothing is kept per result: latencies go to histograms, statuses and
+    sizes to counters, so memory use doesn't grow with the run length.
+    Snapshots can be merged (e.g. across processes).
+
+    @param interval: seconds between interval reports (0 to disable)
+    @type interval: int
+    @param reporter: called with the stats for each interval; by default a
+                     one line summary is logged
+    @type reporter: callable
+    """
+    def __init__(self, interval=0, reporter=None):
         self.start_time = time.time()
         self.total_wall_time = -1
+        self.times = Histogram()
+        self.detail_times = None
+        self.sizes = Histogram(unit=1)
+        self.statuses = collections.Counter()
+        self.interval = interval
+        self.reporter = reporter or self.log_interval
+        self.current = ResultStats() if interval else None
 
     def stop(self):
         self.total_wall_time = time.time() - self.start_time
 
     def add(self, result):
-        if result is not None:
-            self.results.append(result)
+        if result is None:
+            return
+        self.times.add(result.time)
+        self.sizes.add(result.size)
+        self.statuses[result.status] += 1
+        if result.detail_time is not None:
+            if self.detail_times is None:
+                self.detail_times = [Histogram() for _ in result.detail_time]
+            for histogram, value in zip(self.detail_times, result.detail_time):
+                histogram.add(value)
+
+        if self.current is not None:
+            self.current.add(result)
+            if time.time() - self.current.start_time >= self.interval:
+                self.current.stop()
+                self.reporter(self.current)
+                self.current = ResultStats()
+
+    def merge(self, other):
+        self.times.merge(other.times)
+        self.sizes.merge(other.sizes)
+        self.statuses.update(other.statuses)
+        if other.detail_times is not None:
+            if self.detail_times is None:
+                self.detail_times = [Histogram() for _ in other.detail_times]
+            for histogram, theirs in zip(self.detail_times, other.detail_times):
+                histogram.merge(theirs)
+        self.start_time = min(self.start_time, other.start_time)
+        return self
+
+    def snapshot(self):
+        """A copy of the stats so far, safe to merge or report."""
+        ret = ResultStats()
+        ret.merge(self)
+        ret.start_time = self.start_time
+        ret.total_wall_time = time.time() - self.start_time
+        return ret
+
+    @staticmethod
+    def log_interval(stats):
+        LOG.info('%d requests (%d failed) in %.1fs: %.2f [#/sec], '
+                 'p50 %.1fms, p99 %.1fms, max %.1fms', stats.count,
+                 stats.failed_requests, stats.total_wall_time,
+                 stats.count / max(stats.total_wall_time, 1e-6),
+                 stats.times.percentile(50) * 1000,
+                 stats.times.percentile(99) * 1000,
+                 (stats.times.max or 0) * 1000)
+
+    @property
+    def count(self):
+        return self.times.count
 
     @property
     def failed_requests(self):
-        return sum(1 for r in self.results if r.status != 200)
+        return self.count - self.statuses[200]
 
     @property
     def total_req_time(self):
-        return sum(r.time for r in self.results)
+        return self.times.total
 
     @property
     def avg_req_time(self):
-        if len(self.results) > 0:
-            return self.total_req_time / len(self.results)
-        else:
-            return 0
+        return self.times.mean
 
     @property
     def total_req_length(self):
-        return sum(r.size for r in self.results)
+        return self.sizes.total
 
     @property
     def avg_req_length(self):
-        return self.total_req_length / len(self.results)
+        return self.sizes.mean
 
     def distribution(self):
-        results = sorted(r.time for r in self.results)
-        dist = []
-        n = len(results)
-        for p in (50, 66, 75, 80, 90, 95, 98, 99):
-            i = p/100 * n - 0.001 #return right time if matched
-            if i >= n:
-                i = n-1
-            else:
-                i = int(i)
-            dist.append((p, results[i]))
-        dist.append((100, results[-1]))
+        dist = [(p, self.times.percentile(p)) for p in PERCENTILES]
+        dist.append((100, self.times.max))
         return dist
 
     def connection_times(self):
-        if self.results[0].detail_time is None:
+        if self.detail_times is None:
             return None
-        connect = [r.detail_time[0] for r in self.results]
-        process = [r.detail_time[1] for r in self.results]
-        wait = [r.detail_time[2] for r in self.results]
-        total = [r.time for r in self.results]
 
         results = []
-        for data in (connect, process, wait, total):
-            results.append((min(data), mean(data), std_deviation(data),
-                            median(data), max(data)))
+        for data in self.detail_times + [self.times]:
+            results.append((data.min, data.mean, data.std_deviation,
+                            data.median, data.max))
         return results
-
-square_sum = lambda l: sum(x*x for x in l)
-mean = lambda l: sum(l)/len(l)
-deviations = lambda l, mean: [x-mean for x in l]
-def std_deviation(l):
-    n = len(l)
-    if n == 1:
-        return 0
-    return math.sqrt(square_sum(deviations(l, mean(l)))/(n-1))
-median = lambda l: sorted(l)[int(len(l)//2)]
@@ -0,0 +1,92 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+import unittest
+
+from f5test.utils.palb import core
+
+BODY = b'x' * 100
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            server.running[self.path] = server.running.get(self.path, 0) + 1
+            server.peak[self.path] = max(server.peak.get(self.path, 0),
+                                         server.running[self.path])
+        if self.path == '/slow':
+            time.sleep(0.2)
+        with server.lock:
+            server.running[self.path] -= 1
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        core.keep_processing = True
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.hits = {}
+        self.server.running = {}
+        self.server.peak = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        core.keep_processing = True
+
+    def run_load(self, urls, concurrency, requests, balancing=False):
+        manager = core.LoadManager(urls, concurrency, requests,
+                                   mode='curlmulti')
+        if balancing:
+            manager.set_balancing(delay=0.05)
+        manager.set_timeout(10)
+        now = time.time()
+        manager.start()
+        # get_stats() waits for all the results, lost requests included.
+        waiter = threading.Thread(target=manager.get_stats, daemon=True)
+        waiter.start()
+        waiter.join(30)
+        elapsed = time.time() - now
+        manager.stop()
+        self.assertFalse(waiter.is_alive(), 'Requests were lost')
+        return manager.stats, elapsed
+
+    def test01_concurrent(self):
+        """Test that one getter thread runs many transfers at once"""
+        stats, elapsed = self.run_load([self.base + '/slow'], 20, 40)
+        self.assertEqual(stats.count, 40)
+        self.assertEqual(stats.failed_requests, 0)
+        self.assertEqual(stats.total_req_length, 40 * len(BODY))
+        # 2 rounds of 20, not 40 in a row.
+        self.assertLess(elapsed, 40 * 0.2 / 4)
+
+    def test02_balancing(self):
+        """Test that balancing holds URLs back without stalling transfers"""
+        urls = [self.base + '/slow', self.base + '/fast']
+        stats, elapsed = self.run_load(urls, 10, 100, balancing=True)
+        self.assertEqual(stats.count, 100)
+        self.assertEqual(stats.failed_requests, 0)
+        self.assertEqual(self.server.hits, {'/slow': 50, '/fast': 50})
+        # Half of the slots each.
+        self.assertLessEqual(self.server.peak['/slow'], 5)
+        # The fast ones aren't held up by the slow URL being over its share.
+        self.assertLess(stats.times.percentile(45), 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
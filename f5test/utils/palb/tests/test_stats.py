@@ -0,0 +1,169 @@
+import os
+import random
+import statistics
+import unittest
+from unittest import mock
+
+from f5test.utils.palb.core import Result
+from f5test.utils.palb.stats import Histogram, ResultStats, PERCENTILES
+
+STATS_VALUES = int(os.environ.get('STATS_VALUES', 20000))
+
+
+def latencies(n, seed=0):
+    rng = random.Random(seed)
+    # Mostly a few ms, with a long tail up to seconds.
+    return [rng.lognormvariate(-5, 1.5) for _ in range(n)]
+
+
+def exact_percentile(ordered, p):
+    rank = p / 100.0 * len(ordered) - 0.001
+    for i, value in enumerate(ordered):
+        if i + 1 > rank:
+            return value
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class TestCases(unittest.TestCase):
+
+    def assertAccurate(self, histogram, ordered):
+        error = 2.0 ** -(histogram.significant_bits - 1)
+        for p in PERCENTILES + (0, 1, 10, 99.9, 100):
+            expected = exact_percentile(ordered, p)
+            self.assertAlmostEqual(histogram.percentile(p), expected,
+                                   delta=expected * error + histogram.unit,
+                                   msg='p%s' % p)
+
+    def test01_percentiles(self):
+        """Percentiles are within the histogram's relative error."""
+        values = latencies(STATS_VALUES)
+        h = Histogram()
+        for value in values:
+            h.add(value)
+        self.assertAccurate(h, sorted(values))
+        self.assertEqual(h.median, h.percentile(50))
+        self.assertEqual(h.percentile(100), max(values))
+        self.assertEqual(Histogram().percentile(50), 0)
+
+    def test02_exact(self):
+        """Count, min, max, mean and standard deviation are exact."""
+        values = latencies(STATS_VALUES, seed=1)
+        h = Histogram()
+        for value in values:
+            h.add(value)
+        self.assertEqual(h.count, len(values))
+        self.assertEqual(h.min, min(values))
+        self.assertEqual(h.max, max(values))
+        self.assertAlmostEqual(h.total, sum(values), places=6)
+        self.assertAlmostEqual(h.mean, statistics.mean(values), places=9)
+        self.assertAlmostEqual(h.std_deviation, statistics.stdev(values),
+                               places=9)
+
+    def test03_merge(self):
+        """Merged histograms match one that saw all the values."""
+        values = latencies(STATS_VALUES, seed=2)
+        whole = Histogram()
+        parts = [Histogram() for _ in range(3)]
+        for i, value in enumerate(values):
+            whole.add(value)
+            # Uneven parts, the last one with the slowest values.
+            if value >= 0.1:
+                parts[2].add(value)
+            else:
+                parts[0 if i % 5 else 1].add(value)
+
+        merged = Histogram().merge(Histogram())
+        for part in parts:
+            merged.merge(part)
+        merged.merge(Histogram())
+        self.assertEqual(merged.counts, whole.counts)
+        self.assertEqual((merged.count, merged.min, merged.max),
+                         (whole.count, whole.min, whole.max))
+        self.assertAlmostEqual(merged.mean, whole.mean, places=9)
+        self.assertAlmostEqual(merged.std_deviation, whole.std_deviation,
+                               places=9)
+        for p in PERCENTILES:
+            self.assertEqual(merged.percentile(p), whole.percentile(p))
+        self.assertAccurate(merged, sorted(values))
+
+        self.assertRaises(AssertionError, whole.merge, Histogram(unit=1))
+
+    def test04_interval(self):
+        """Each interval is reported on its own, as it ends."""
+        clock = Clock()
+        reports = []
+        with mock.patch('f5test.utils.palb.stats.time', clock):
+            stats = ResultStats(interval=10, reporter=reports.append)
+            for second in range(35):
+                clock.now += 1
+                stats.add(Result(0.001 * (second + 1), 100,
+                                 500 if second % 10 == 0 else 200))
+                stats.add(None)
+
+        self.assertEqual(len(reports), 3)
+        for i, report in enumerate(reports):
+            self.assertEqual(report.count, 10)
+            self.assertEqual(report.failed_requests, 1)
+            self.assertEqual(report.total_wall_time, 10)
+            self.assertAlmostEqual(report.times.min, 0.001 * (i * 10 + 1))
+            self.assertAlmostEqual(report.times.max, 0.001 * (i * 10 + 10))
+            self.assertIsNone(report.current)
+        # The last 5 results are in the interval still open.
+        self.assertEqual(stats.current.count, 5)
+        self.assertEqual(stats.count, 35)
+        self.assertEqual(stats.failed_requests, 4)
+        self.assertEqual(stats.total_req_length, 3500)
+
+        # The default reporter only logs.
+        with self.assertLogs('palb.stats', 'INFO') as logs:
+            ResultStats.log_interval(reports[0])
+        self.assertIn('10 requests (1 failed) in 10.0s', logs.output[0])
+
+    def test05_snapshot_merge(self):
+        """Snapshots are independent copies that merge like histograms."""
+        values = latencies(STATS_VALUES, seed=3)
+        clock = Clock()
+        with mock.patch('f5test.utils.palb.stats.time', clock):
+            workers = [ResultStats() for _ in range(2)]
+            clock.now -= 5
+            workers.append(ResultStats())
+            clock.now += 20
+            for i, value in enumerate(values):
+                workers[i % 3].add(Result(value, i % 7, 200 if i % 4 else 404,
+                                          detail_time=(value / 2, value)))
+            snapshots = [w.snapshot() for w in workers]
+
+        workers[0].add(Result(60, 1, 200, detail_time=(1, 60)))
+        self.assertNotEqual(snapshots[0].times.max, 60)
+        self.assertEqual(snapshots[2].total_wall_time, 20)
+
+        total = ResultStats()
+        for snapshot in snapshots:
+            total.merge(snapshot)
+        self.assertEqual(total.start_time, 995)
+        self.assertEqual(total.count, len(values))
+        self.assertEqual(total.statuses[404], (len(values) + 3) // 4)
+        self.assertEqual(total.total_req_length,
+                         sum(i % 7 for i in range(len(values))))
+        self.assertAlmostEqual(total.avg_req_time, statistics.mean(values),
+                               places=9)
+        self.assertAccurate(total.times, sorted(values))
+        self.assertAccurate(total.detail_times[0],
+                            sorted(value / 2 for value in values))
+
+        connect, total_row = total.connection_times()[1:]
+        self.assertEqual(connect[0], min(values))
+        self.assertEqual(connect, total_row)
+        self.assertEqual(total.distribution()[-1], (100, max(values)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+import unittest
+
+from f5test.utils.parsers.tmsh import parser, braces_parser, RESULT_CACHE, GlobDict
+
+# Space separated list of SCF files (e.g. bigip.conf) to benchmark with.
+SCF_FILES = os.environ.get('SCF_FILES', '').split()
+SAMPLE = r"""
+ltm pool /Common/pool%(i)d {
+    load-balancing-mode least-connections-member
+    members {
+        /Common/10.0.%(i)d.1:80 {
+            address 10.0.%(i)d.1
+        }
+        /Common/10.0.%(i)d.2:80 {
+            address 10.0.%(i)d.2
+        }
+    }
+    monitor min 1 of { /Common/http /Common/tcp }
+    slow-ramp-time 300
+}
+ltm virtual /Common/vs%(i)d {
+    destination /Common/10.1.%(i)d.1:80
+    ip-protocol tcp
+    pool /Common/pool%(i)d
+    profiles {
+        /Common/http { }
+        /Common/tcp { }
+    }
+    source 0.0.0.0/0
+    vs-index %(i)d
+}
+"""
+
+
+def load_scf():
+    if SCF_FILES:
+        texts = []
+        for filename in SCF_FILES:
+            with open(filename) as f:
+                texts.append(f.read())
+        return texts
+    return [''.join(SAMPLE % dict(i=i) for i in range(200))]
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_braces(self):
+        ret = braces_parser('{\n    a 1\n    b { c d }\n    e\n}')
+        self.assertIsInstance(ret, GlobDict)
+        self.assertEqual(list(ret.keys()), ['a', 'b', 'e'])
+
+    def test02_cached_copy(self):
+        """Test that cached results are equal but not shared"""
+        text = SAMPLE % dict(i=1)
+        a = parser(text)
+        b = parser(text)
+        self.assertEqual(a, b)
+        self.assertIsNot(a, b)
+        expected = b['ltm pool /Common/pool1']['slow-ramp-time']
+        a['ltm pool /Common/pool1']['slow-ramp-time'] = 0
+        self.assertEqual(parser(text)['ltm pool /Common/pool1']['slow-ramp-time'],
+                         expected)
+
+    def test03_concurrent(self):
+        """Test that concurrent parses return the same structures"""
+        texts = [SAMPLE % dict(i=i) for i in range(20)]
+        expected = [parser(x, cache=False) for x in texts]
+        results = {}
+
+        def worker(n):
+            results[n] = [parser(x, cache=False) for x in texts]
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for n in range(8):
+            self.assertEqual(results[n], expected)
+
+    def test04_throughput(self):
+        """Test the parse throughput on large SCF files"""
+        texts = load_scf()
+        size = sum(len(x) for x in texts) / 1024.0 / 1024
+
+        now = time.time()
+        for text in texts:
+            parser(text, cache=False)
+        cold = time.time() - now
+
+        RESULT_CACHE.clear()
+        for text in texts:
+            parser(text)
+        now = time.time()
+        for text in texts:
+            parser(text)
+        warm = time.time() - now
+
+        print(("Parsed %.2fMB: %.2fMB/s uncached, %.2fMB/s cached\n" %
+               (size, size / cold, size / max(warm, 1e-6))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from f5test.utils.parsers.xmlsql import (parse_xmlsql, parse_xmlsql_row_dict,
+                                         XmlsqlStream, iter_xmlsql)
+
+RESULTSET = """<?xml version="1.0"?>
+
+<resultset statement="%s" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+%s</resultset>
+"""
+ROW = """  <row>
+	<field name="id">%d</field>
+	<field name="name">dev&lt;%d&gt;
+second line</field>
+	<field name="parent" xsi:nil="true" />
+	<field name="descr"></field>
+  </row>
+"""
+
+
+def make_output(statement, count):
+    return RESULTSET % (statement, ''.join(ROW % (i, i) for i in range(count)))
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_same_rows(self):
+        """Test that the stream parser yields the same rows as parse_xmlsql"""
+        output = make_output('SELECT * FROM devices', 50)
+        expected = list(parse_xmlsql_row_dict(parse_xmlsql(output)))
+        self.assertEqual(list(iter_xmlsql([output])), expected)
+        self.assertEqual(expected[3], dict(id=3, name='dev<3>\nsecond line',
+                                           parent=None, descr=''))
+
+    def test02_chunks(self):
+        """Test multiple documents fed one character at a time"""
+        output = make_output('SELECT 1', 2) + make_output('SHOW ERRORS', 0) + \
+            make_output("SELECT 'x' AS eos", 0).replace(
+                '</resultset>', '<row><field name="eos">x</field></row>'
+                '</resultset>')
+        stream = XmlsqlStream()
+        events = []
+        for c in output:
+            events += stream.feed(c)
+        self.assertEqual([x[1] if x[0] == 'resultset' else x[1].get('id')
+                          for x in events],
+                         ['SELECT 1', 0, 1, 'SHOW ERRORS', "SELECT 'x' AS eos",
+                          None])
+        self.assertEqual(events[-1][1], dict(eos='x'))
+
+
+if __name__ == '__main__':
+    unittest.main()
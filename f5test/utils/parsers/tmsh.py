@@ -27,9 +27,12 @@ Caveats:
 @author: jono
 '''
 import collections
+import copy
 from fnmatch import fnmatch
+import hashlib
 import json
 import re
+import threading
 
 from pyparsing import (Literal, Word, Group, ZeroOrMore, printables, OneOrMore,
                        Forward, Optional, removeQuotes, Suppress, QuotedString, ParserElement,
@@ -37,7 +40,6 @@ from pyparsing import (Literal, Word, Group, ZeroOrMore, printables, OneOrMore,
                        pythonStyleComment, Combine, FollowedBy, SkipTo, Or,
                        originalTextFor)
 
-from f5test.utils.decorators import synchronized_with
 from f5test.utils.parsers import PYPARSING_LOCK
 from f5test.utils.parsers.tcl import parse as tcl_parse
 #from ..decorators import synchronized_with
@@ -47,6 +49,9 @@ from f5test.utils.parsers.tcl import parse as tcl_parse
 OLD_STYLE_KEYS = False
 BLOB_OPENER = '[BEGIN]'
 BLOB_CLOSER = '[END]'
+RESULT_CACHE_SIZE = 64
+NEEDS_QUOTES = re.compile(r'[\s%]')
+_GRAMMARS = threading.local()
 
 
 class RawString(str):
@@ -112,8 +117,9 @@ class GlobDict(collections.OrderedDict):
         return traverse(self, 0, _maxdepth)
 
 
-@synchronized_with(PYPARSING_LOCK)
-def braces_parser(text, opener=BLOB_OPENER, closer=BLOB_CLOSER):
+def _build_grammar():
+    """Build the braces grammar. Must be called with PYPARSING_LOCK held,
+    because it changes pyparsing's default whitespace chars."""
     cvtTuple = lambda toks: tuple(toks.asList())  # @IgnorePep8
     cvtRaw = lambda toks: RawString(' '.join(map(str, toks.asList())))  # @IgnorePep8
     cvtStr = lambda toks: str(' '.join(map(str, toks.asList())))  # @IgnorePep8
@@ -184,15 +190,83 @@ def braces_parser(text, opener=BLOB_OPENER, closer=BLOB_CLOSER):
 
     objEntry = dictStr.ignore(pythonStyleComment)
     objStr << delimitedList(objEntry, delim=LineEnd())
+    objStr.streamline()
+
+    return objStr
+
+
+def _get_grammar():
+    """Each thread builds the grammar once and then parses without any lock,
+    since pyparsing elements aren't safe to share between threads."""
+    grammars = _GRAMMARS.__dict__
+    grammar = grammars.get(OLD_STYLE_KEYS)
+    if grammar is None:
+        with PYPARSING_LOCK:
+            grammar = grammars[OLD_STYLE_KEYS] = _build_grammar()
+    return grammar
 
-    return objStr.parseString(text)[0]
+
+def braces_parser(text, opener=BLOB_OPENER, closer=BLOB_CLOSER):
+    return _get_grammar().parseString(text)[0]
 
 
 def dumps(obj):
     return TMSHEncoder(indent=4).encode(obj)
 
 
-def parser(text):
+class ResultCache(object):
+    """A thread-safe LRU of parsed results, keyed by the content hash of the
+    input text. Callers get their own copy, so they are free to modify it.
+    """
+    def __init__(self, maxsize=RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha1(text.encode('utf-8', 'replace')).digest(), OLD_STYLE_KEYS
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+RESULT_CACHE = ResultCache()
+
+
+def parser(text, cache=True):
+    if cache:
+        key = RESULT_CACHE.key(text)
+        ret = RESULT_CACHE.get(key)
+        if ret is not None:
+            return ret
+        ret = _parser(text)
+        RESULT_CACHE.set(key, ret)
+        return ret
+    return _parser(text)
+
+
+def _parser(text):
     ret = tcl_parse(text)
     blacklist = ['ltm rule',
                  'gtm rule',
@@ -266,7 +340,7 @@ class TMSHEncoder(json.JSONEncoder):
             """
             def replace(match):
                 return ESCAPE_DCT[match.group(0)]
-            if not isinstance(s, RawString) and re.search('[\s%]', s):
+            if not isinstance(s, RawString) and NEEDS_QUOTES.search(s):
                 return '"' + json.encoder.ESCAPE.sub(replace, s) + '"'
             else:
                 # return json.encoder.ESCAPE.sub(replace, s)
@@ -394,10 +468,15 @@ def _make_iterencode(markers, _default, _encoder, _indent, _floatstr,
             newline_indent = None
             item_separator = _item_separator
         first = True
+        if isinstance(dct, GlobDict):
+            # Read-only, so skip any copy-on-write bookkeeping.
+            items = collections.OrderedDict.items(dct)
+        else:
+            items = dct.items()
         if _sort_keys:
-            items = sorted(list(dct.items()), key=lambda kv: kv[0])
+            items = sorted(list(items), key=lambda kv: kv[0])
         else:
-            items = iter(dct.items())
+            items = iter(items)
         for key, value in items:
             if isinstance(key, str):
                 pass
@@ -1,8 +1,12 @@
 """`mysql -X` XML output parsers"""
 from xml.dom.minidom import parseString
+from xml.etree.ElementTree import XMLPullParser, ParseError
 from ..lists import collapse_lists
 from ...base import Options
 
+XML_DECL = '<?xml'
+XSI_NIL = '{http://www.w3.org/2001/XMLSchema-instance}nil'
+
 class MysqlValueError(ValueError):
     pass
 
@@ -40,6 +44,93 @@ def parse_xmlsql(value):
 
     return colnames, data
 
+def _guess(text):
+    # Try to guess integers. Ugly!
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+class XmlsqlStream(object):
+    """Incremental parser for the output of a mysql -X session.
+
+    The output is a sequence of XML documents, one per result set. Data can
+    be fed in chunks of any size; feed() returns the events parsed so far:
+
+        ('resultset', <statement>) when a result set starts
+        ('row', <Options>) for each complete row
+
+    Rows are dropped from the tree as soon as they're parsed, so memory use
+    doesn't grow with the size of the result set.
+    """
+    def __init__(self):
+        self._parser = None
+        self._resultset = None
+        self._pending = ''
+
+    def feed(self, data):
+        events = []
+        data = self._pending + data
+        # Hold back what could be the start of a split XML declaration.
+        self._pending = ''
+        for i in range(1, len(XML_DECL)):
+            if data.endswith(XML_DECL[:i]):
+                data, self._pending = data[:-i], data[-i:]
+                break
+
+        while data:
+            if data.startswith(XML_DECL):
+                self._close()
+                self._parser = XMLPullParser(('start', 'end'))
+            i = data.find(XML_DECL, 1)
+            if i == -1:
+                chunk, data = data, ''
+            else:
+                chunk, data = data[:i], data[i:]
+            if self._parser is not None:
+                self._parser.feed(chunk)
+                self._read_events(events)
+        return events
+
+    def _read_events(self, events):
+        for event, elem in self._parser.read_events():
+            if elem.tag == 'resultset' and event == 'start':
+                self._resultset = elem
+                events.append(('resultset', elem.get('statement')))
+            elif elem.tag == 'row' and event == 'end':
+                values = Options()
+                for field in elem:
+                    if field.text:
+                        values[field.get('name')] = _guess(field.text)
+                    elif field.get(XSI_NIL):
+                        values[field.get('name')] = None
+                    else:
+                        values[field.get('name')] = ''
+                events.append(('row', values))
+                if self._resultset is not None:
+                    self._resultset.remove(elem)
+
+    def _close(self):
+        if self._parser is not None:
+            try:
+                self._parser.close()
+            except ParseError:
+                pass
+        self._parser = None
+        self._resultset = None
+
+
+def iter_xmlsql(chunks):
+    """Yields the rows (as Options) found in an iterable of mysql -X output
+    chunks, as soon as each row is complete."""
+    stream = XmlsqlStream()
+    for chunk in chunks:
+        for event, value in stream.feed(chunk):
+            if event == 'row':
+                yield value
+
+
 def _dict_per_row(results, colNames):
     """yields a dict of values for each row in colNames"""
     if results and len(results) > 1:
@@ -1,3 +1,3 @@
 """Memcache-based resource pools"""
-from .memcache import MemcachePool
+from .memcache import MemcachePool, ShardedMemcachePool
 from .net import IpPortResourcePool, IpResourcePool
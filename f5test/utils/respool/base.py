@@ -3,9 +3,13 @@ Created on Jan 30, 2018
 
 @author: jono
 '''
+import heapq
 from netaddr import IPAddress
+from .range import IndexedSequence, IndexedRange, IndexedIterable
 from ...base import OptionsStrict
 
+INDEXED_TYPES = (IndexedSequence, IndexedIterable)
+
 
 class PoolExhausted(Exception):
     pass
@@ -150,15 +154,76 @@ class MemberResourceItem(IPAddressPortResourceItem):
                     docker=self.docker, prefix=self.prefix, key=self.key)
 
 
+class FreeIndex(object):
+    """
+    A bitmap of allocated indexes, plus a cursor and a heap of freed indexes
+    so that the lowest free index is found in amortized constant time.
+
+    Every index below the cursor is either allocated or in the freed heap.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def __getitem__(self, i):
+        byte = i >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (i & 7)))
+
+    def __len__(self):
+        return self.count
+
+    def reset(self):
+        self.bits = bytearray()
+        self.cursor = 0
+        self.freed = []
+        self.count = 0
+
+    def next(self):
+        """Returns the lowest free index, without allocating it."""
+        while self.freed:
+            if not self[self.freed[0]]:
+                return self.freed[0]
+            heapq.heappop(self.freed)
+        while self[self.cursor]:
+            self.cursor += 1
+        return self.cursor
+
+    def set(self, i):
+        if self[i]:
+            return
+        byte = i >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytearray(max(byte + 1 - len(self.bits),
+                                           len(self.bits))))
+        self.bits[byte] |= 1 << (i & 7)
+        self.count += 1
+        if self.freed and self.freed[0] == i:
+            heapq.heappop(self.freed)
+        if i == self.cursor:
+            self.cursor += 1
+
+    def clear(self, i):
+        if not self[i]:
+            return
+        self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xff
+        self.count -= 1
+        if i < self.cursor:
+            heapq.heappush(self.freed, i)
+
+
 class ResourcePool(object):
     """
     A very generic resource pool. Pass a name and an iterable of reservable items.
     Call get() to reserve one item.
     Call free(item) to put it back in the pool.
 
+    The iterable is indexed lazily and allocations are tracked in a bitmap of
+    indexes, so get(), get_multi() and free() don't scan the pool.
+
     @param name: Name of the pool
     @type name: str
-    @param iterable: Any finite iterable (set, tuple, list)
+    @param iterable: Any finite iterable (set, tuple, list) or an indexed
+                     sequence from the range module
     @type iterable: iterable
     """
     item_class = NamedResourceItem
@@ -170,7 +235,10 @@ class ResourcePool(object):
         if isinstance(name, tuple):
             name = '.'.join(str(x) for x in name)
         self.name = name
-        self.iterable = [] if iterable is None else list(iterable)
+        if not isinstance(iterable, INDEXED_TYPES):
+            iterable = IndexedIterable([] if iterable is None else iterable)
+        self.iterable = iterable
+        self.allocated = FreeIndex()
         self.items = OptionsStrict()
         self.values = set()
         self.prefix = prefix
@@ -195,73 +263,92 @@ class ResourcePool(object):
         return {k: v for k, v in list(self.items.items()) if k.startswith(self.prefix)
                                                     and isinstance(v, self.item_class)}
 
+    def _index(self, item):
+        try:
+            return self.iterable.index(item.value)
+        except ValueError:
+            return None
+
     def update_with(self, values):
         tmp = dict((x.prefix + x.name, x) for x in values)
         list(map(self.items.pop, set(self.items) - set(tmp)))
         self.items.update(tmp)
         self.values = set(x.key for x in list(self.items.values()))
+        self.allocated.reset()
+        for item in list(self.items.values()):
+            i = self._index(item)
+            if i is not None:
+                self.allocated.set(i)
+
+    def prepare(self, item):
+        """Finishes off an item handed out by get() or get_multi()."""
+        return item
+
+    def _add(self, item):
+        self.items[item.prefix + item.name] = item
+        self.values.add(item.key)
+
+    def _allocate(self, name, prefix, pool=None):
+        if pool is not None:
+            for value in pool:
+                item = self.item_class(value, name)
+                item.prefix = prefix
+                if item.key not in self.values:
+                    self._add(item)
+                    return item
+            raise PoolExhausted(self.name)
+
+        while True:
+            i = self.allocated.next()
+            try:
+                value = self.iterable[i]
+            except IndexError:
+                raise PoolExhausted(self.name)
+            self.allocated.set(i)
+            item = self.item_class(value, name)
+            item.prefix = prefix
+            # The key may be taken by an item that's not from this iterable.
+            if item.key not in self.values:
+                self._add(item)
+                return item
 
     def get(self, name=None, prefix=None, iterable=None):
-        s = self.values
         prefix = self.prefix + prefix if prefix else self.prefix
-        pool = iterable if iterable else iter(self.iterable)
 
         if name:
             key = prefix + name
             if key in self.items:
-                return self.items[prefix + name]
+                return self.items[key]
 
-        for value in pool:
-            item = self.item_class(value, name)
-            item.prefix = prefix
-            key = item.key
-            if key not in s:
-                self.items[prefix + item.name] = item
-                self.values.add(key)
-                return item
-        else:
-            raise PoolExhausted(self.name)
+        pool = iter(iterable) if iterable else None
+        return self._allocate(name, prefix, pool)
 
     def get_multi(self, num, name=None, prefix=None, iterable=None):
-        i = 0
         items = []
-        s = self.values
-        pool = iterable if iterable else iter(self.iterable)
+        pool = iter(iterable) if iterable else None
         prefix = self.prefix + prefix if prefix else self.prefix
 
-        while i < num:
-            found = False
-            if name:
-                namei = name % (i + 1)
-                key = prefix + namei
-                if key in self.items:
-                    items.append(self.items[key])
-                    found = True
-                    i += 1
-
-            if not found:
-                try:
-                    value = next(pool)
-                except StopIteration:
-                    raise PoolExhausted(self.name)
-                item = self.item_class(value, name % (i + 1) if name else name)
-                item.prefix = prefix
-
-                key = item.key
-                if key not in s:
-                    self.items[prefix + item.name] = item
-                    self.values.add(key)
-                    items.append(item)
-                    i += 1
+        for i in range(num):
+            namei = name % (i + 1) if name else name
+            if namei and prefix + namei in self.items:
+                items.append(self.items[prefix + namei])
+            else:
+                items.append(self._allocate(namei, prefix, pool))
         return items
 
+    def _remove(self, name):
+        item = self.items.pop(name)
+        self.values.discard(item.key)
+        i = self._index(item)
+        if i is not None:
+            self.allocated.clear(i)
+        return item
+
     def free(self, item):
         if isinstance(item, dict):
             item = self.item_class.decode(item)
         try:
-            key = item.key
-            self.items.pop(self.prefix + item.name)
-            self.values.remove(key)
+            self._remove(self.prefix + item.name)
             return item
         except KeyError:
             return None
@@ -270,9 +357,7 @@ class ResourcePool(object):
         items = []
         for name in list(self.items.keys()):
             if name.startswith(self.prefix):
-                item = self.items.pop(name)
-                items.append(item)
-                self.values.remove(item.key)
+                items.append(self._remove(name))
         return items
 
 
@@ -291,7 +376,7 @@ class RangeResourcePool(ResourcePool):
         self.start = start
         self.size = size
         self.template = template
-        r = list(range(start, start + self.size))
+        r = IndexedRange(int(start), int(start) + self.size - 1)
         if template:
             r = (template.format(x) for x in range(start, start + self.size))
         super(RangeResourcePool, self).__init__(name, r, prefix=prefix)
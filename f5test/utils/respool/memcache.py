@@ -4,9 +4,17 @@ Created on Jan 31, 2018
 @author: jono
 '''
 
+from array import array
+import random
+import time
 import warnings
 import pylibmc
 
+from .base import PoolExhausted
+
+SHARD_SIZE = 1024
+FOREVER = 0xffffffff
+
 
 class MemcachePool(object):
     '''
@@ -166,5 +174,270 @@ class MemcachePool(object):
         self.mc.delete(pool.name)
 
 
+
+class ShardedMemcachePool(object):
+    '''
+    A memcache representation of an indexed pool (IP, IP/port and range
+    pools) where allocating an item only touches one small key.
+
+    The allocation state of the pool's indexes is split in shards of
+    shard_size slots. Each shard is one memcached key holding a packed array
+    of lease deadlines (4 bytes per slot, 0 or a past deadline meaning free),
+    updated with gets/cas. Workers start looking for free slots in a random
+    shard, so they seldom collide, and get_multi() claims as many slots as it
+    can from a shard with a single cas.
+
+    Items whose lease isn't renewed in time are free again, which takes care
+    of crashed workers. Named items are mapped to their index by one more
+    key, claimed with add so that all workers agree on it.
+
+    @param servers: a list of memcached IP addresses
+    @param pool: the pool whose items are handed out; it needs an indexed
+                 iterable (see the range module)
+    @param timeout: the lease of an item in seconds (default: infinite)
+    @param client: a memcached client (default: a pylibmc.Client)
+    '''
+    shard_key = '{}.shard.{}.{}'
+    name_key = '{}.name.{}.{}'
+    generation_key = '{}.generation'
+
+    def __init__(self, servers, pool, timeout=0, encode=False,
+                 shard_size=SHARD_SIZE, client=None):
+        self.mc = client or pylibmc.Client(servers, binary=True,
+                                           behaviors={"tcp_nodelay": True,
+                                                      "cas": True,
+                                                      "ketama": True})
+        self.pool = pool
+        self.timeout = timeout
+        self.encode = encode
+        self.shard_size = shard_size
+        try:
+            self.size = len(pool.iterable)
+        except TypeError:
+            self.size = sum(1 for _ in pool.iterable)
+        self.shards = -(-self.size // shard_size)
+        self.held = {}
+        self.collisions = 0
+        self._hint = random.randrange(self.shards) if self.shards else 0
+        self.mc.add(self.generation_key.format(pool.name), 0)
+        self.generation = self.mc.get(self.generation_key.format(pool.name)) or 0
+
+    def __getitem__(self, i):
+        item = self._lookup(self.pool.prefix + i)
+        if item is None:
+            raise KeyError(i)
+        return item
+
+    def __getattr__(self, i):
+        try:
+            if i.startswith('__'):
+                return super(ShardedMemcachePool, self).__getattr__(i)
+            return self[i]
+        except KeyError as e:
+            raise AttributeError(e)
+
+    def _shard_key(self, shard):
+        return self.shard_key.format(self.pool.name, self.generation, shard)
+
+    def _name_key(self, name):
+        return self.name_key.format(self.pool.name, self.generation, name)
+
+    def _empty(self, shard):
+        return array('I', bytes(4 * min(self.shard_size,
+                                         self.size - shard * self.shard_size)))
+
+    def _gets(self, shard):
+        key = self._shard_key(shard)
+        while True:
+            value, cas = self.mc.gets(key)
+            if value is not None:
+                table = array('I')
+                table.frombytes(value)
+                return table, cas
+            self.mc.add(key, self._empty(shard).tobytes())
+
+    def _update(self, shard, func):
+        """Apply func to a shard's table until the cas goes through.
+        func changes the table in place and returns a result, or None to
+        leave the shard alone."""
+        key = self._shard_key(shard)
+        while True:
+            table, cas = self._gets(shard)
+            ret = func(table)
+            if ret is None or self.mc.cas(key, table.tobytes(), cas):
+                return ret
+            self.collisions += 1
+            warnings.warn('Collision. Retrying...')
+
+    def _deadline(self, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        return int(time.time() + timeout) if timeout else FOREVER
+
+    def _ttl(self, deadline):
+        if deadline == FOREVER:
+            return 0
+        return max(deadline - int(time.time()), 1)
+
+    def _claim(self, num, deadline):
+        """Returns num free indexes, now leased until deadline."""
+        indexes = []
+
+        def claim(table):
+            now = time.time()
+            claimed = []
+            for i, lease in enumerate(table):
+                if lease < now:
+                    table[i] = deadline
+                    claimed.append(i)
+                    if len(claimed) == num - len(indexes):
+                        break
+            return claimed or None
+
+        for n in range(self.shards):
+            shard = (self._hint + n) % self.shards
+            claimed = self._update(shard, claim)
+            if claimed:
+                self._hint = shard
+                indexes += [shard * self.shard_size + i for i in claimed]
+                if len(indexes) == num:
+                    return indexes
+        self._lease(indexes)
+        raise PoolExhausted(self.pool.name)
+
+    def _lease(self, indexes, deadline=0):
+        """Set the lease deadline of indexes (0 frees them)."""
+        by_shard = {}
+        for index in indexes:
+            by_shard.setdefault(index // self.shard_size, []).append(
+                index % self.shard_size)
+
+        def lease(table):
+            for i in slots:
+                table[i] = deadline
+            return True
+
+        for shard, slots in by_shard.items():
+            self._update(shard, lease)
+
+    def _is_leased(self, index):
+        value = self.mc.get(self._shard_key(index // self.shard_size))
+        if value is None:
+            return False
+        table = array('I')
+        table.frombytes(value)
+        return table[index % self.shard_size] >= time.time()
+
+    def _item(self, index, name, prefix):
+        item = self.pool.item_class(self.pool.iterable[index], name)
+        item.prefix = prefix
+        return self.pool.prepare(item)
+
+    def _lookup(self, key):
+        index = self.mc.get(self._name_key(key))
+        if index is None:
+            return None
+        if not self._is_leased(index):
+            self.mc.delete(self._name_key(key))
+            return None
+        prefix = self.pool.prefix
+        return self._item(index, key[len(prefix):], prefix)
+
+    def _get(self, names, timeout):
+        prefix = self.pool.prefix
+        items = [None] * len(names)
+        while True:
+            missing = []
+            for n, name in enumerate(names):
+                if items[n] is None and name:
+                    items[n] = self._lookup(prefix + name)
+                if items[n] is None:
+                    missing.append(n)
+            if not missing:
+                return items
+
+            deadline = self._deadline(timeout)
+            indexes = self._claim(len(missing), deadline)
+            lost = []
+            for n, index in zip(missing, indexes):
+                name = names[n]
+                if name and not self.mc.add(self._name_key(prefix + name),
+                                            index, self._ttl(deadline)):
+                    # Another worker just got an item by that name.
+                    lost.append(index)
+                    continue
+                items[n] = self._item(index, name, prefix)
+                self.held[items[n].key] = (index, name)
+            self._lease(lost)
+
+    def get(self, name=None, timeout=None, encode=None):
+        item = self._get([name], timeout)[0]
+        if encode is None:
+            encode = self.encode
+        return item if not encode else item.encode()
+
+    def get_multi(self, num, name=None, timeout=None, encode=None):
+        names = [name % (i + 1) if name else name for i in range(num)]
+        items = self._get(names, timeout)
+        if encode is None:
+            encode = self.encode
+        return items if not encode else [x.encode() for x in items]
+
+    def gete(self, *args, **kwargs):
+        return self.get(*args, encode=True, **kwargs)
+
+    def get_multie(self, *args, **kwargs):
+        return self.get_multi(*args, encode=True, **kwargs)
+
+    def renew(self, items=None, timeout=None):
+        """Extend the lease of items (by default, all the ones held)."""
+        if items is None:
+            items = list(self.held.values())
+        else:
+            items = [self.held[x.key] for x in items]
+        deadline = self._deadline(timeout)
+        self._lease([index for index, _ in items], deadline)
+        for index, name in items:
+            if name:
+                self.mc.set(self._name_key(self.pool.prefix + name), index,
+                            self._ttl(deadline))
+
+    def free(self, item):
+        if isinstance(item, dict):
+            item = self.pool.item_class.decode(item)
+        index, name = self.held.pop(item.key, (None, item.name))
+        if index is None:
+            try:
+                index = self.pool.iterable.index(item.value)
+            except ValueError:
+                return None
+        if name:
+            self.mc.delete(self._name_key(self.pool.prefix + name))
+        self._lease([index])
+        return item
+
+    def free_all(self):
+        """Free all the items this client holds."""
+        items = []
+        for key, (index, name) in list(self.held.items()):
+            if name:
+                self.mc.delete(self._name_key(self.pool.prefix + name))
+            items.append(self._item(index, name, self.pool.prefix))
+        self._lease([index for index, _ in self.held.values()])
+        self.held.clear()
+        return items
+
+    def sync(self):
+        pass
+
+    def flush(self):
+        """This will delete the pool & its items!
+        Do this only when you're sure that no other clients are using this pool."""
+        self.mc.delete_multi([self._shard_key(x) for x in range(self.shards)])
+        key = self.generation_key.format(self.pool.name)
+        self.mc.incr(key)
+        self.generation = self.mc.get(key)
+        self.held.clear()
+
+
 if __name__ == '__main__':
     print('Cool!')
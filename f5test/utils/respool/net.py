@@ -10,7 +10,7 @@ import itertools
 from netaddr import IPAddress
 from .base import PoolExhausted, ResourcePool, RangeResourcePool, IPAddressResourceItem, IPAddressPortResourceItem, \
     MemberResourceItem
-from .range import PortRange, IPRange
+from .range import PortRange, IndexedProduct, IndexedIPRange, IndexedPortRange
 
 MINPORT = 20000
 MAXPORT = 65534
@@ -49,7 +49,8 @@ class IpPortResourcePool(IpResourcePool):
         if not isinstance(port_range, (tuple, list)):
             port_range = (port_range,)
         self.size = size
-        iterable = itertools.product(IPRange(*ip_range), PortRange(*port_range))
+        iterable = IndexedProduct(IndexedIPRange(*ip_range),
+                                  IndexedPortRange(*port_range))
         ResourcePool.__init__(self, name, iterable, prefix)
 
     def get(self, name=None):
@@ -75,30 +76,30 @@ class MemberResourcePool(IpResourcePool):
         dockers = ['localhost'] if dockers is None else dockers
         self.dockers = itertools.cycle(dockers)
         self.size = size
-        iterable = itertools.product(IPRange(*ip_range), PortRange(*port_range))
+        iterable = IndexedProduct(IndexedIPRange(*ip_range),
+                                  IndexedPortRange(*port_range))
         ResourcePool.__init__(self, name, iterable, prefix)
         self.tokens = dict(name=self.name, prefix=self.prefix)
 
+    def prepare(self, item):
+        item.set_remote_dir(self.remote_dir, **self.tokens)
+        item.set_local_dir(self.local_dir, **self.tokens)
+        item.docker = next(self.dockers)
+        return item
+
     def get(self, name=None, prefix=None, tokens=None):
         if tokens is not None:
             self.tokens.update(tokens)
 
         item = super(MemberResourcePool, self).get(name, prefix=prefix)
-        item.set_remote_dir(self.remote_dir, **self.tokens)
-        item.set_local_dir(self.local_dir, **self.tokens)
-        item.docker = next(self.dockers)
-        return item
+        return self.prepare(item)
 
     def get_multi(self, num, name=None, prefix=None, tokens=None):
         if tokens is not None:
             self.tokens.update(tokens)
 
         items = super(MemberResourcePool, self).get_multi(num, name, prefix=prefix)
-        for item in items:
-            item.set_remote_dir(self.remote_dir, **self.tokens)
-            item.set_local_dir(self.local_dir, **self.tokens)
-            item.docker = next(self.dockers)
-        return items
+        return [self.prepare(x) for x in items]
 
 
 class LazyMemberResourcePool(MemberResourcePool):
@@ -132,10 +133,7 @@ class LazyMemberResourcePool(MemberResourcePool):
                                                        iterable=iterable)
         else:
             raise ValueError('ip_pool is required and has to be a list or tuple')
-        item.set_remote_dir(self.remote_dir, **self.tokens)
-        item.set_local_dir(self.local_dir, **self.tokens)
-        item.docker = next(self.dockers)
-        return item
+        return self.prepare(item)
 
     def get_multi(self, num, name=None, prefix=None, tokens=None, ip_pool=None):
         if tokens is not None:
@@ -150,11 +148,7 @@ class LazyMemberResourcePool(MemberResourcePool):
         else:
             raise ValueError('ip_pool is required and has to be a list or tuple')
 
-        for item in items:
-            item.set_remote_dir(self.remote_dir, **self.tokens)
-            item.set_local_dir(self.local_dir, **self.tokens)
-            item.docker = next(self.dockers)
-        return items
+        return [self.prepare(x) for x in items]
 
 
 if __name__ == '__main__':
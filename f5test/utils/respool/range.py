@@ -3,8 +3,7 @@ Created on Jan 31, 2018
 
 @author: jono
 '''
-import itertools
-from netaddr import IPNetwork, IPAddress
+from netaddr import IPNetwork, IPAddress, AddrFormatError
 from ...base import OptionsStrict
 
 MINPORT = 20000
@@ -74,7 +73,177 @@ class IPRange(Range):
     next = __next__
 
 
-class IPPortRange(Range):
+class IndexedSequence(object):
+    """Base of the read-only sequences below: slices are lazy views and
+    membership is tested with index().
+    """
+    def __len__(self):
+        raise NotImplementedError
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return IndexedView(self, range(len(self))[i])
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.item(i)
+
+    def __iter__(self):
+        return (self.item(i) for i in range(len(self)))
+
+    def __contains__(self, value):
+        try:
+            self.index(value)
+        except ValueError:
+            return False
+        return True
+
+    def __repr__(self):
+        return '<%s of %d>' % (self.__class__.__name__, len(self))
+
+    def item(self, i):
+        """Builds the i-th value, 0 <= i < len(self)."""
+        raise NotImplementedError
+
+    def index(self, value):
+        raise NotImplementedError
+
+
+class IndexedView(IndexedSequence):
+    """A slice of an indexed sequence. Only the indexes are kept, as a range.
+    """
+    def __init__(self, sequence, indexes):
+        self.sequence = sequence
+        self.indexes = indexes
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return IndexedView(self.sequence, self.indexes[i])
+        return self.sequence.item(self.indexes[i])
+
+    def __iter__(self):
+        return (self.sequence.item(i) for i in self.indexes)
+
+    def item(self, i):
+        return self.sequence.item(self.indexes[i])
+
+    def index(self, value):
+        return self.indexes.index(self.sequence.index(value))
+
+
+class IndexedRange(IndexedSequence):
+    """A read-only view of the integer range [start, stop] with constant-time
+    len(), indexing and index(). Values are built by factory on access.
+    """
+    def __init__(self, start, stop=None, factory=int):
+        if stop is None:
+            stop = start
+        assert stop >= start - 1
+        self.start = start
+        self.stop = stop
+        self.factory = factory
+
+    def __len__(self):
+        return self.stop - self.start + 1
+
+    def __iter__(self):
+        return (self.factory(x) for x in range(self.start, self.stop + 1))
+
+    def item(self, i):
+        return self.factory(self.start + i)
+
+    def to_int(self, value):
+        return int(value)
+
+    def index(self, value):
+        try:
+            i = self.to_int(value) - self.start
+        except (TypeError, ValueError):
+            raise ValueError(value)
+        if not 0 <= i < len(self):
+            raise ValueError(value)
+        return i
+
+
+class IndexedIPRange(IndexedRange):
+    """Same as IndexedRange, but for IPRange() arguments."""
+
+    def __init__(self, start, stop=None):
+        r = IPRange(start, stop)
+        self.version = r.current.version
+        super(IndexedIPRange, self).__init__(int(r.current), int(r.stop),
+                                             self.to_ip)
+
+    def to_ip(self, value):
+        return IPAddress(value, self.version)
+
+    def to_int(self, value):
+        try:
+            ip = IPAddress(value)
+        except AddrFormatError:
+            raise ValueError(value)
+        if ip.version != self.version:
+            raise ValueError(value)
+        return int(ip)
+
+
+class IndexedPortRange(IndexedRange):
+    """Same as IndexedRange, but for PortRange() arguments."""
+
+    def __init__(self, start, stop=None):
+        r = PortRange(start, stop)
+        super(IndexedPortRange, self).__init__(r.start, r.stop)
+
+
+class IndexedProduct(IndexedSequence):
+    """A read-only view of itertools.product() over indexed sequences, with
+    constant-time len(), indexing and index(). Nothing is expanded up front,
+    not even while iterating.
+    """
+    def __init__(self, *sequences):
+        self.sequences = sequences
+
+    def __len__(self):
+        ret = 1
+        for seq in self.sequences:
+            ret *= len(seq)
+        return ret
+
+    def __iter__(self):
+        def product(sequences):
+            if not sequences:
+                yield ()
+                return
+            for x in sequences[0]:
+                for rest in product(sequences[1:]):
+                    yield (x,) + rest
+        return product(self.sequences)
+
+    def item(self, i):
+        ret = []
+        for seq in reversed(self.sequences):
+            i, j = divmod(i, len(seq))
+            ret.append(seq[j])
+        return tuple(reversed(ret))
+
+    def index(self, value):
+        if not isinstance(value, (tuple, list)) or \
+           len(value) != len(self.sequences):
+            raise ValueError(value)
+        ret = 0
+        for seq, x in zip(self.sequences, value):
+            ret = ret * len(seq) + seq.index(x)
+        return ret
+
+
+class IndexedIPPortRange(IndexedProduct):
+    """Same as IndexedProduct, but for IPPortRange() arguments. Items are
+    OptionsStrict(ip=..., port=...), built on access.
+    """
     def __init__(self, ip_range, port_range=None):
         if port_range is None:
             port_range = (MINPORT, MAXPORT)
@@ -82,10 +251,77 @@ class IPPortRange(Range):
             ip_range = (ip_range,)
         if not isinstance(port_range, (tuple, list)):
             port_range = (port_range,)
-        #self.current = itertools.product(IPRange(*ip_range), PortRange(*port_range))
-        self.current = (OptionsStrict(ip=x[0], port=x[1])
-                        for x in itertools.product(IPRange(*ip_range),
-                                                   PortRange(*port_range)))
+        super(IndexedIPPortRange, self).__init__(IndexedIPRange(*ip_range),
+                                                 IndexedPortRange(*port_range))
+
+    def __iter__(self):
+        return (OptionsStrict(ip=x[0], port=x[1])
+                for x in super(IndexedIPPortRange, self).__iter__())
+
+    def item(self, i):
+        ip, port = super(IndexedIPPortRange, self).item(i)
+        return OptionsStrict(ip=ip, port=port)
+
+    def index(self, value):
+        if isinstance(value, dict):
+            try:
+                value = (value['ip'], value['port'])
+            except KeyError:
+                raise ValueError(value)
+        return super(IndexedIPPortRange, self).index(value)
+
+
+class IndexedIterable(object):
+    """Indexes any finite iterable lazily: items are pulled from it only as
+    far as the highest index requested so far.
+    """
+    def __init__(self, iterable):
+        self._iter = iter(iterable)
+        self._items = []
+        self._index = {}
+
+    def _pull(self, i):
+        while len(self._items) <= i:
+            try:
+                value = next(self._iter)
+            except StopIteration:
+                return False
+            try:
+                self._index.setdefault(value, len(self._items))
+            except TypeError:
+                pass
+            self._items.append(value)
+        return True
+
+    def __getitem__(self, i):
+        if i < 0 or not self._pull(i):
+            raise IndexError(i)
+        return self._items[i]
+
+    def __iter__(self):
+        i = 0
+        while self._pull(i):
+            yield self._items[i]
+            i += 1
+
+    def index(self, value):
+        try:
+            if value in self._index:
+                return self._index[value]
+        except TypeError:
+            return self._items.index(value)
+        i = len(self._items)
+        while self._pull(i):
+            if self._items[i] == value:
+                return i
+            i += 1
+        raise ValueError(value)
+
+
+class IPPortRange(Range):
+    def __init__(self, ip_range, port_range=None):
+        # The product is walked lazily, without expanding the IP range first.
+        self.current = iter(IndexedIPPortRange(ip_range, port_range))
 
     def __iter__(self):
         return self
@@ -95,6 +331,24 @@ class IPPortRange(Range):
     next = __next__
 
 
+INDEXED = {Range: IndexedRange,
+           PortRange: IndexedPortRange,
+           IPRange: IndexedIPRange,
+           IPPortRange: IndexedIPPortRange}
+
+
+def get_indexed(klass, *args, **kwargs):
+    """Returns the indexed equivalent of klass(*args, **kwargs), where klass
+    is one of the iterator ranges above. The items of other iterables are
+    collected in a list.
+    """
+    if klass in INDEXED:
+        return INDEXED[klass](*args, **kwargs)
+    if issubclass(klass, (IndexedSequence, IndexedIterable)):
+        return klass(*args, **kwargs)
+    return list(klass(*args, **kwargs))
+
+
 if __name__ == '__main__':
     print('IP range:')
     rp = IPRange('1.1.1.1', '1.1.1.3')
@@ -0,0 +1,58 @@
+import time
+import unittest
+
+from f5test.utils.respool.base import PoolExhausted, ResourcePool, RangeResourcePool
+from f5test.utils.respool.net import IpPortResourcePool, MemberResourcePool
+from netaddr import IPAddress
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_lowest_free(self):
+        p = ResourcePool('pool1', [1, 99, 3, 2])
+        a, b, c = p.get_multi(3)
+        self.assertEqual([a.value, b.value, c.value], [1, 99, 3])
+        p.free(b)
+        self.assertEqual(p.get().value, 99)
+        self.assertEqual(p.get().value, 2)
+        self.assertRaises(PoolExhausted, p.get)
+
+    def test02_named(self):
+        p = RangeResourcePool('pool1', 1, 10, template='item_{}')
+        i = p.get('item1')
+        self.assertIs(p.get('item1'), i)
+        p.get_multi(2, 'num_%d')
+        self.assertEqual(p.num_2.value, 'item_3')
+        self.assertEqual(p.get_multi(3, 'num_%d')[2].value, 'item_4')
+
+    def test03_update_with(self):
+        """Test that items allocated elsewhere are skipped"""
+        p1 = IpPortResourcePool('pool1', '1.1.1.10', 80, prefix='m1')
+        p2 = IpPortResourcePool('pool1', '1.1.1.10', 80, prefix='m2')
+        items = p1.get_multi(3)
+        p2.update_with(p1.items.values())
+        self.assertEqual(p2.get().value, (IPAddress('1.1.1.10'), 83))
+        p1.free(items[0])
+        p2.update_with(p1.items.values())
+        self.assertEqual(p2.get().value, (IPAddress('1.1.1.10'), 80))
+
+    def test04_member(self):
+        p = MemberResourcePool('pool1', '1.1.1.10', dockers=['docker-1', 'docker-2'])
+        i = p.get_multi(2, 'bip%d')
+        self.assertEqual(i[0].local_dir, '/tmp/pool-1.1.1.10-20000')
+        self.assertEqual(i[1].docker, 'docker-2')
+
+    def test05_scale(self):
+        """Test the time it takes to get and free 100k items"""
+        p = IpPortResourcePool('pool1', '10.0.0.0/8')
+        now = time.time()
+        items = p.get_multi(100000)
+        for item in items[::2]:
+            p.free(item)
+        items = p.get_multi(50000)
+        print("100k items in %.2fs\n" % (time.time() - now))
+        self.assertEqual(items[-1].value, p.iterable[99998])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import time
+import unittest
+
+from f5test.utils.respool.range import (IPRange, IPPortRange, PortRange,
+                                        IndexedIPPortRange, IndexedIPRange,
+                                        IndexedPortRange, IndexedRange,
+                                        get_indexed)
+from netaddr import IPAddress
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_same_items(self):
+        """Test that indexed ranges hold the same items as the iterators"""
+        self.assertEqual(list(IndexedIPRange('10.0.0.250', '10.0.1.5')),
+                         list(IPRange('10.0.0.250', '10.0.1.5')))
+        self.assertEqual(list(IndexedIPRange('10.0.0.0/29')),
+                         list(IPRange('10.0.0.0/29')))
+        self.assertEqual(list(IndexedPortRange(65530)), list(PortRange(65530)))
+        self.assertEqual(list(IndexedIPPortRange(('1.1.1.1', '1.1.1.2'),
+                                                 (80, 82))),
+                         list(IPPortRange(('1.1.1.1', '1.1.1.2'), (80, 82))))
+        self.assertEqual(list(IndexedRange(5)), [5])
+
+    def test02_sequence(self):
+        """Test len, indexing, slicing and membership"""
+        r = IndexedIPPortRange('10.0.0.0/16', (1000, 1999))
+        self.assertEqual(len(r), 65535 * 1000)
+        self.assertEqual(r[1001], dict(ip=IPAddress('10.0.0.1'), port=1001))
+        self.assertEqual(r[-1].ip, IPAddress('10.0.255.254'))
+        self.assertRaises(IndexError, r.__getitem__, len(r))
+        self.assertIn(dict(ip=IPAddress('10.0.3.4'), port=1500), r)
+        self.assertIn((IPAddress('10.0.3.4'), 1500), r)
+        self.assertNotIn(dict(ip=IPAddress('10.1.0.0'), port=1500), r)
+        self.assertNotIn(dict(ip='10.0.0.1', port=80), r)
+        self.assertNotIn('junk', r)
+
+        s = r[1000:5000:2]
+        self.assertEqual(len(s), 2000)
+        self.assertEqual(s[0], r[1000])
+        self.assertEqual(s[-1], r[4998])
+        self.assertEqual(list(s[10:13]), [r[1020], r[1022], r[1024]])
+        self.assertEqual(s.index(r[1002]), 1)
+        self.assertNotIn(r[1001], s)
+
+        ips = IndexedIPRange('10.0.0.1', '10.0.0.9')
+        self.assertIn('10.0.0.9', ips)
+        self.assertNotIn('::1', ips)
+        self.assertNotIn('10.0.0.10', ips)
+        self.assertEqual(list(ips[::-4]), [IPAddress('10.0.0.9'),
+                                           IPAddress('10.0.0.5'),
+                                           IPAddress('10.0.0.1')])
+
+    def test03_get_indexed(self):
+        """Test that declaring a huge range doesn't expand it"""
+        start = time.time()
+        r = get_indexed(IPPortRange, '10.0.0.0/8', (1000, 1999))
+        self.assertIsInstance(r, IndexedIPPortRange)
+        self.assertEqual(r[-1].port, 1999)
+        self.assertLess(time.time() - start, 1)
+
+        self.assertIsInstance(get_indexed(PortRange, 80, 90), IndexedPortRange)
+        self.assertEqual(get_indexed(tuple, 'ab'), ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
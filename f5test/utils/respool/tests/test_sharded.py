@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+import unittest
+
+from f5test.utils.respool.base import PoolExhausted
+from f5test.utils.respool.net import IpPortResourcePool, IpResourcePool
+from f5test.utils.respool.memcache import MemcachePool, ShardedMemcachePool
+from netaddr import IPAddress
+
+POOL = 'testenv.vlan1.sharded'
+# The contention benchmark runs against these memcached servers.
+MEMCACHED_SERVERS = os.environ.get('MEMCACHED_SERVERS')
+POOL_WORKERS = int(os.environ.get('POOL_WORKERS', 8))
+POOL_OPS = int(os.environ.get('POOL_OPS', 100))
+
+
+class FakeMemcache(object):
+    """An in-process memcached with the pylibmc calls the pools use. Counts
+    the keys read or written by each call."""
+
+    def __init__(self):
+        self.data = {}
+        self.touched = []
+        self.lock = threading.Lock()
+        self.version = 0
+
+    def _touch(self, *keys):
+        self.touched.extend(keys)
+
+    def get(self, key):
+        self._touch(key)
+        entry = self.data.get(key)
+        return entry and entry[0]
+
+    def gets(self, key):
+        self._touch(key)
+        return self.data.get(key, (None, None))
+
+    def add(self, key, value, time=0):
+        self._touch(key)
+        with self.lock:
+            if key in self.data:
+                return False
+            self.version += 1
+            self.data[key] = (value, self.version)
+            return True
+
+    def set(self, key, value, time=0):
+        self._touch(key)
+        with self.lock:
+            self.version += 1
+            self.data[key] = (value, self.version)
+        return True
+
+    def cas(self, key, value, cas, time=0):
+        self._touch(key)
+        with self.lock:
+            if self.data.get(key, (None, None))[1] != cas:
+                return False
+            self.version += 1
+            self.data[key] = (value, self.version)
+            return True
+
+    def incr(self, key):
+        with self.lock:
+            value = self.data[key][0] + 1
+            self.version += 1
+            self.data[key] = (value, self.version)
+            return value
+
+    def delete(self, key):
+        self._touch(key)
+        self.data.pop(key, None)
+
+    def delete_multi(self, keys):
+        for key in keys:
+            self.delete(key)
+
+
+def make_pool(mc, prefix='machine1', timeout=0, size=None):
+    if size:
+        p = IpResourcePool(POOL, '10.0.0.1', size, prefix=prefix)
+    else:
+        p = IpPortResourcePool(POOL, '1.1.1.10', prefix=prefix)
+    return ShardedMemcachePool(None, p, timeout=timeout, client=mc)
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_named_get(self):
+        """Test that all the workers agree on named items"""
+        mc = FakeMemcache()
+        pool1, pool2 = make_pool(mc), make_pool(mc)
+        i = pool1.get('bip1')
+        self.assertEqual(pool2.get('bip1').value, i.value)
+        self.assertEqual(pool2.bip1.value, i.value)
+        self.assertNotEqual(pool2.get().value, i.value)
+
+        # Another prefix is another namespace.
+        self.assertNotEqual(make_pool(mc, 'machine2').get('bip1').value,
+                            i.value)
+
+        items = pool1.get_multi(3, name='vip_%d')
+        self.assertEqual(len(set(x.value for x in items)), 3)
+        self.assertEqual(pool2.vip_2.value, items[1].value)
+
+    def test02_free(self):
+        """Test freeing and exhausting a pool"""
+        mc = FakeMemcache()
+        pool = make_pool(mc, size=10)
+        items = pool.get_multi(10)
+        self.assertEqual(sorted(x.value for x in items),
+                         [IPAddress('10.0.0.1') + i for i in range(10)])
+        self.assertRaises(PoolExhausted, pool.get)
+        pool.free(items[3])
+        self.assertEqual(pool.get('x').value, items[3].value)
+        self.assertEqual(len(pool.free_all()), 10)
+        self.assertEqual(len(make_pool(mc, size=10).get_multi(10)), 10)
+
+    def test03_lease(self):
+        """Test that items whose lease ran out are handed out again"""
+        mc = FakeMemcache()
+        crashed = make_pool(mc, size=2, timeout=1)
+        crashed.get('bip1')
+        crashed.get()
+        pool = make_pool(mc, size=2, timeout=1)
+        self.assertRaises(PoolExhausted, pool.get)
+        time.sleep(1.1)
+        self.assertRaises(AttributeError, getattr, pool, 'bip1')
+        self.assertEqual(len(pool.get_multi(2)), 2)
+
+    def test04_one_key(self):
+        """Test that getting an item only touches one shard key"""
+        mc = FakeMemcache()
+        pool = make_pool(mc)
+        self.assertEqual(pool.shards, 45)
+        pool.get()
+        del mc.touched[:]
+        for _ in range(10):
+            pool.get()
+        self.assertEqual(len(set(mc.touched)), 1)
+        self.assertEqual(len(mc.touched), 20)
+
+    def test05_concurrent(self):
+        """Test that concurrent workers never get the same item"""
+        mc = FakeMemcache()
+        got = []
+
+        def worker():
+            pool = make_pool(mc, size=200)
+            pool._hint = 0
+            for _ in range(25):
+                got.append(pool.get().value)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(set(got)), 200)
+
+    @unittest.skipUnless(MEMCACHED_SERVERS, 'MEMCACHED_SERVERS not set')
+    def test99_contention(self):
+        """Benchmark get/free by concurrent workers, old and sharded pools"""
+        servers = MEMCACHED_SERVERS.split(',')
+
+        def run(make):
+            errors = []
+
+            def worker(n):
+                try:
+                    pool = make('bench%d' % n)
+                    for _ in range(POOL_OPS):
+                        pool.free(pool.get())
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=worker, args=(n,))
+                       for n in range(POOL_WORKERS)]
+            start = time.time()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(errors, [])
+            return time.time() - start
+
+        def old(prefix):
+            p = IpPortResourcePool(POOL + '.old', '1.1.1.10', prefix=prefix)
+            return MemcachePool(servers, p, timeout=60)
+
+        def sharded(prefix):
+            p = IpPortResourcePool(POOL + '.new', '1.1.1.10', prefix=prefix)
+            return ShardedMemcachePool(servers, p, timeout=60)
+
+        t_old, t_sharded = run(old), run(sharded)
+        print('%d workers x %d get/free: MemcachePool %.2fs, '
+              'ShardedMemcachePool %.2fs' % (POOL_WORKERS, POOL_OPS, t_old,
+                                              t_sharded))
+
+
+if __name__ == '__main__':
+    unittest.main()
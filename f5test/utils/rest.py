@@ -6,6 +6,7 @@ Created on Feb 5, 2016
 import logging
 
 from f5test.commands.rest.base import IcontrolRestCommand
+from f5test.interfaces.rest.driver import PAGE_SIZE
 
 LOG = logging.getLogger(__name__)
 
@@ -13,30 +14,37 @@ filter_search_for_item = None
 class FilterSearchForItem(IcontrolRestCommand):
     """
     Searches a URI using its built-in filter functionality for items that match
-    the filter criteria.
+    the filter criteria. Results are read a page at a time, so the search
+    stops at the first page when only the top result is wanted.
     @return: single item AttrDict or list of items [AttrDict] from response
     """
-    template = "{base_uri}?$filter={search_key}%20eq%20'{search_value}'"
+    template = "{search_key} eq '{search_value}'"
 
-    def __init__(self, base_uri, search_key, search_value, return_top_result=True, expand=True, *args, **kwargs):
+    def __init__(self, base_uri, search_key, search_value, return_top_result=True, expand=True,
+                 page_size=PAGE_SIZE, *args, **kwargs):
         super(FilterSearchForItem, self).__init__(*args, **kwargs)
         self.base_uri = base_uri
         self.search_key = search_key
         self.search_value = search_value
         self.return_top_result = return_top_result
         self.expand = expand
+        self.page_size = page_size
 
     def setup(self):
-        uri = self.template.format(base_uri=self.base_uri, search_key=self.search_key, search_value=self.search_value)
+        params = {'$filter': self.template.format(search_key=self.search_key,
+                                                  search_value=self.search_value)}
         LOG.info("Searching {0} for key {1} with value {2}".format(self.base_uri, self.search_key, self.search_value))
         if self.expand:
-            uri += '&expandAllWithKeys=true'
-        resp = self.api.get(uri)
-        items = resp.get('items')
-        if items and self.return_top_result:
-            return items[0]
-        else:
-            return items
+            params['expandAllWithKeys'] = 'true'
+        items = self.api.iterate(self.base_uri, params_dict=params,
+                                 page_size=self.page_size,
+                                 prefetch=0 if self.return_top_result else 1)
+        if self.return_top_result:
+            for item in items:
+                items.close()
+                return item
+            return []
+        return list(items)
 
 simple_rest_request = None
 class SimpleRestRequest(IcontrolRestCommand):
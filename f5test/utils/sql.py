@@ -0,0 +1,199 @@
+'''
+Created on Oct 18, 2026
+
+Background writer for DB-API connections (mysql.connector, sqlite3, etc.).
+'''
+from concurrent.futures import Future
+import logging
+import queue
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 5
+MAX_QUEUE = 10000
+RETRIES = 3
+RETRY_DELAY = 1
+
+
+class BatchWriter(object):
+    """Owns a DB connection and writes from a single background thread.
+
+    Rows queued with insert() are batched into multi-row INSERTs, written in
+    a single transaction when BATCH_SIZE rows are queued, FLUSH_INTERVAL
+    seconds have passed, before any execute() and at close(). Transient
+    errors are retried on a fresh connection. A batch that fails for any
+    other reason is written again row by row, so only the bad rows are lost.
+
+    @param connect: returns a new DB-API connection
+    @type connect: callable
+    @param transient: exceptions worth retrying on
+    @type transient: tuple
+    @param paramstyle: placeholder for query parameters ('%s' or '?')
+    @type paramstyle: str
+    @param maxsize: queued rows after which insert() blocks
+    @type maxsize: int
+    """
+    def __init__(self, connect, transient=(), paramstyle='%s',
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 maxsize=MAX_QUEUE, retries=RETRIES, retry_delay=RETRY_DELAY):
+        self.connect = connect
+        self.transient = tuple(transient)
+        self.paramstyle = paramstyle
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.cnx = None
+        self.stats = dict(rows=0, batches=0, retries=0, dropped=0)
+        self._queue = queue.Queue(maxsize)
+        self._pending = []
+        self._thread = threading.Thread(target=self._run, name='sql-writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def insert(self, table, columns, values):
+        """Queue one row for insertion. Returns immediately unless the queue
+        is full."""
+        self._queue.put((table, tuple(columns), tuple(values)))
+
+    def submit(self, query, params=()):
+        """Queue a statement after all the rows queued so far. Returns a
+        Future for the cursor's lastrowid."""
+        future = Future()
+        self._queue.put((query, params, future))
+        return future
+
+    def execute(self, query, params=()):
+        """Run a statement and wait for its lastrowid."""
+        return self.submit(query, params).result()
+
+    def flush(self):
+        """Wait until all rows queued so far are written."""
+        self.submit(None).result()
+
+    def close(self):
+        """Write everything that's queued and close the connection."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.time())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush()
+                deadline = None
+                continue
+
+            if item is None:
+                self._flush()
+                break
+            elif len(item) == 3 and isinstance(item[2], Future):
+                query, params, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    self._flush()
+                    future.set_result(self._write([(query, params)]) if query
+                                      else None)
+                except Exception as e:
+                    future.set_exception(e)
+                deadline = None
+            else:
+                self._pending.append(item)
+                if len(self._pending) >= self.batch_size:
+                    self._flush()
+                    deadline = None
+                elif deadline is None:
+                    deadline = time.time() + self.flush_interval
+
+        self._close_db()
+
+    def _statements(self, rows):
+        """Turn consecutive rows for the same table and columns into
+        multi-row INSERTs."""
+        ret = []
+        group = []
+        for row in rows + [None]:
+            if group and (row is None or row[:2] != group[0][:2]):
+                table, columns = group[0][:2]
+                one = '(%s)' % ', '.join([self.paramstyle] * len(columns))
+                query = "INSERT INTO %s (%s) VALUES %s" % (
+                    table, ', '.join(columns), ', '.join([one] * len(group)))
+                params = tuple(x for row_ in group for x in row_[2])
+                ret.append((query, params))
+                group = []
+            if row is not None:
+                group.append(row)
+        return ret
+
+    def _flush(self):
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        try:
+            self._write(self._statements(rows))
+        except self.transient as e:
+            LOG.warning('DB error: %s. Dropped %d rows.', e, len(rows))
+            self.stats['dropped'] += len(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                LOG.warning('DB error: %s. Dropped 1 row.', e)
+                self.stats['dropped'] += 1
+                return
+            # Most likely one bad row. Don't let it take the others along.
+            LOG.debug('DB error: %s. Writing %d rows one by one...', e,
+                      len(rows))
+            for row in rows:
+                self._pending = [row]
+                self._flush()
+        else:
+            self.stats['rows'] += len(rows)
+            self.stats['batches'] += 1
+
+    def _write(self, statements):
+        """Run statements in one transaction. Returns the last row id."""
+        attempt = 0
+        while True:
+            try:
+                if self.cnx is None:
+                    self.cnx = self.connect()
+                cursor = self.cnx.cursor()
+                try:
+                    for query, params in statements:
+                        cursor.execute(query, params)
+                    self.cnx.commit()
+                    return cursor.lastrowid
+                except:
+                    self._rollback()
+                    raise
+                finally:
+                    cursor.close()
+            except self.transient as e:
+                self._close_db()
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                self.stats['retries'] += 1
+                LOG.warning('DB error: %s. Retry %d/%d...', e, attempt,
+                            self.retries)
+                time.sleep(self.retry_delay * attempt)
+
+    def _rollback(self):
+        try:
+            self.cnx.rollback()
+        except Exception:
+            pass
+
+    def _close_db(self):
+        if self.cnx is not None:
+            try:
+                self.cnx.close()
+            except Exception:
+                pass
+            self.cnx = None
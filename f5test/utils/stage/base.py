@@ -33,6 +33,8 @@ class StageError(Exception):
 class Stage(object):
     name = None
     parallelizable = True
+    # Cross-device stages wait for all the stages before them.
+    barrier = False
 
 #     def run(self):
 #         raise NotImplementedError('oops!')
@@ -22,6 +22,7 @@ class ScaleCheckStage(Stage, ScaleCheck):
     4) And 'bigstart restart' if BIG-IP is in a state other than 'Active' 
     """
     name = 'check'
+    barrier = True
 
     def __init__(self, device, specs, *args, **kwargs):
         configifc = ConfigInterface()
@@ -21,6 +21,7 @@ class ConfigVCMPStage(Stage, VcmpPlacer):
     Its functionally is similar to the f5.configurator CLI utility.
     """
     name = 'config_vcmp'
+    barrier = True
 
     def __init__(self, device, specs, *args, **kwargs):
         configifc = ConfigInterface()
@@ -31,6 +31,7 @@ class EMDiscocveryStage(Stage, Macro):
     The stage where the EM Under Test discovers all target devices.
     """
     name = 'emdiscovery'
+    barrier = True
     parallelizable = False
 
     def __init__(self, device, specs, *args, **kwargs):
@@ -132,6 +133,7 @@ class EMInstallSoftwareStage(Stage, EMInstallSoftware):
     The convention is to use the 'x-em' alias for the 3rd party EM.
     """
     name = 'eminstall'
+    barrier = True
 
     def __init__(self, device, specs, *args, **kwargs):
         configifc = ConfigInterface()
@@ -25,6 +25,7 @@ class HAPromoteStage(Stage, Macro):
     Swap default device in an HA setup, and promote secondary on active/standby
     """
     name = 'ha_promote'
+    barrier = True
 
     def __init__(self, device, specs=None, *args, **kwargs):
         # This stage only promotes one item at a time. If the user configures
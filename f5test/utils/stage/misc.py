@@ -11,6 +11,7 @@ import f5test.commands.shell as SCMD
 import f5test.commands.rest as RCMD
 
 import f5test.commands.icontrol as ICMD
+from ...interfaces.facts import FACTS
 from ...interfaces.ssh import SSHInterface
 from f5test.interfaces.rest.emapi import EmapiInterface
 from f5test.interfaces.rest.core import AUTH
@@ -147,6 +148,7 @@ class RebootStage(Stage, Macro):
         super(RebootStage, self).setup()
         LOG.info('Reboot stage for: %s', self.device)
         SCMD.ssh.reboot(device=self.device)
+        FACTS.invalidate(self.device)
 
         if self.specs.mcpd and to_bool(self.specs.mcpd):
             self._wait_after_reboot(self.device)
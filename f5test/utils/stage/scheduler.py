@@ -0,0 +1,217 @@
+'''
+Created on Oct 18, 2026
+
+Run stages as a dependency graph on a rolling pool of worker threads.
+
+Each (stage, device) pair is a job. A job waits only for the earlier jobs on
+its own device, so a slow install on one device doesn't hold up the others.
+Stages that work across devices (HA, discovery, etc.) are barriers: they wait
+for everything before them and everything after them waits for them.
+'''
+from ...macros.base import MacroThread
+from queue import Queue
+import logging
+import sys
+import time
+
+LOG = logging.getLogger(__name__)
+MAX_WORKERS = 20
+
+
+class StageJob(object):
+    """One stage on one device (or on no device at all).
+
+    @param stage: the stage name as defined in the config
+    @type stage: str
+    @param factory: creates the Stage instance when the job starts
+    @type factory: callable
+    @param device: the device (None for device-less stages)
+    @type device: DeviceAccess
+    @param limit: how many jobs of this stage may run at the same time
+    @type limit: int
+    """
+    def __init__(self, stage, factory, device=None, limit=None,
+                 barrier=False):
+        self.stage = stage
+        self.factory = factory
+        self.device = device
+        self.limit = limit
+        self.barrier = barrier
+        self.deps = set()
+        self.start = None
+        self.end = None
+        self.failed = False
+
+    def __repr__(self):
+        return "<StageJob: %s>" % self.name
+
+    @property
+    def name(self):
+        if self.device:
+            return '%s :: %s' % (self.stage, self.device.alias)
+        return self.stage
+
+    @property
+    def duration(self):
+        if self.start is None or self.end is None:
+            return 0
+        return self.end - self.start
+
+    def is_ready(self):
+        return all(x.end is not None for x in self.deps)
+
+
+class StageThread(MacroThread):
+    """Creates the job's stage and runs it. Errors raised by either are put
+    on the queue."""
+
+    def __init__(self, job, done, *args, **kwargs):
+        self.job = job
+        self.done = done
+        super(StageThread, self).__init__(None, *args, **kwargs)
+
+    def run(self):
+        try:
+            try:
+                self.macro = self.job.factory()
+            except:
+                self.queue.put({self: sys.exc_info()})
+            else:
+                super(StageThread, self).run()
+        finally:
+            self.job.end = time.time()
+            self.done.put(self)
+
+
+class StageScheduler(object):
+    """Builds the job graph group by group, then runs it.
+
+    @param max_workers: maximum number of jobs running at any time
+    @type max_workers: int
+    @param stop_on_error: don't start any new jobs after a failure
+    @type stop_on_error: bool
+    """
+    def __init__(self, max_workers=MAX_WORKERS, stop_on_error=True):
+        self.max_workers = max_workers
+        self.stop_on_error = stop_on_error
+        self.jobs = []
+        self.by_stage = {}
+        self._last_by_device = {}
+        self._since_barrier = []
+        self._barrier = []
+        self.errors = []
+        self.elapsed = 0
+
+    def add_group(self, jobs, depends=None):
+        """Add a group of jobs that used to run side by side.
+
+        @param jobs: the jobs in this group
+        @type jobs: list of StageJob
+        @param depends: extra stage names each job (by stage) depends on
+        @type depends: dict
+        """
+        depends = depends or {}
+        for job in jobs:
+            if job.barrier or job.device is None:
+                job.barrier = True
+                job.deps.update(self._since_barrier)
+            else:
+                job.deps.update(self._last_by_device.get(job.device.alias, []))
+            job.deps.update(self._barrier)
+            for name in depends.get(job.stage) or []:
+                if name not in self.by_stage:
+                    LOG.warning("Stage '%s' depends on '%s' which doesn't "
+                                "run before it.", job.stage, name)
+                    continue
+                job.deps.update(self.by_stage[name])
+
+        for job in jobs:
+            self.jobs.append(job)
+            self.by_stage.setdefault(job.stage, []).append(job)
+
+        if any(x.barrier for x in jobs):
+            self._barrier = list(jobs)
+            self._since_barrier = []
+            self._last_by_device = {}
+        else:
+            self._since_barrier += jobs
+            by_device = {}
+            for job in jobs:
+                by_device.setdefault(job.device.alias, []).append(job)
+            self._last_by_device.update(by_device)
+
+    def run(self):
+        done = Queue()
+        errors = Queue()
+        pending = list(self.jobs)
+        running = {}
+        failed = False
+        start = time.time()
+
+        while pending or running:
+            if not (failed and self.stop_on_error):
+                for job in list(pending):
+                    if len(running) >= self.max_workers:
+                        break
+                    if not job.is_ready():
+                        continue
+                    if job.limit and \
+                       sum(1 for x in running if x.stage == job.stage) >= job.limit:
+                        continue
+                    pending.remove(job)
+                    LOG.info("Processing stage: %s", job.name)
+                    job.start = time.time()
+                    t = StageThread(job, done, errors, name=job.name)
+                    running[job] = t
+                    t.start()
+
+            if not running:
+                break
+
+            t = done.get()
+            del running[t.job]
+            LOG.debug('%s finished in %.1fs', t.job.name, t.job.duration)
+            while not errors.empty():
+                failed = True
+                thread, exc_info = errors.get(block=False).popitem()
+                thread.job.failed = True
+                self.errors.append((thread, exc_info))
+
+        self.elapsed = time.time() - start
+        for job in pending:
+            LOG.warning('Skipped stage: %s', job.name)
+        return self.errors
+
+    def critical_path(self):
+        """The chain of dependent jobs that took the longest to finish."""
+        longest = {}
+        for job in self.jobs:
+            if job.start is None:
+                continue
+            prev = max((longest[x] for x in job.deps if x in longest),
+                       key=lambda x: x[0], default=(0, []))
+            longest[job] = (prev[0] + job.duration, prev[1] + [job])
+        if not longest:
+            return 0, []
+        return max(longest.values(), key=lambda x: x[0])
+
+    def report(self):
+        stages = []
+        for name, jobs in self.by_stage.items():
+            jobs = [x for x in jobs if x.start is not None]
+            if not jobs:
+                continue
+            span = max(x.end for x in jobs) - min(x.start for x in jobs)
+            slowest = max(jobs, key=lambda x: x.duration)
+            stages.append((min(x.start for x in jobs), name, len(jobs), span,
+                           slowest))
+
+        LOG.info('Stages finished in %.1fs:', self.elapsed)
+        for _, name, count, span, slowest in sorted(stages):
+            LOG.info('  %-30s %3d job(s) in %7.1fs (slowest: %s %.1fs)', name,
+                     count, span, slowest.name, slowest.duration)
+        total, path = self.critical_path()
+        if path:
+            LOG.info('Critical path (%.1fs): %s', total,
+                     ' -> '.join('%s (%.1fs)' % (x.name, x.duration)
+                                 for x in path))
@@ -0,0 +1,127 @@
+import threading
+import time
+import unittest
+
+from f5test.base import Options
+from f5test.utils.stage.scheduler import StageScheduler, StageJob
+
+
+class Recorder(object):
+    """Keeps track of the stages running at any time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peak = {}
+        self.order = []
+
+    def stage(self, name, delay=0.02, error=None):
+        recorder = self
+
+        class Stage(object):
+
+            def run(self):
+                with recorder.lock:
+                    recorder.running[name] = recorder.running.get(name, 0) + 1
+                    recorder.peak[name] = max(recorder.peak.get(name, 0),
+                                              recorder.running[name])
+                time.sleep(delay)
+                with recorder.lock:
+                    recorder.running[name] -= 1
+                    recorder.order.append(name)
+                if error:
+                    raise error
+
+        return Stage
+
+
+def device(alias):
+    return Options(alias=alias)
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_graph(self):
+        """Test that jobs wait for their device and for barriers only"""
+        scheduler = StageScheduler()
+        d1, d2 = device('d1'), device('d2')
+        install = [StageJob('install', None, d1), StageJob('install', None, d2)]
+        config = [StageJob('config', None, d1), StageJob('config', None, d2)]
+        ha = StageJob('ha', None)
+        check = StageJob('check', None, d1)
+        for group in (install, config, [ha], [check]):
+            scheduler.add_group(group)
+
+        self.assertEqual(config[0].deps, set([install[0]]))
+        self.assertTrue(ha.barrier)
+        self.assertEqual(ha.deps, set(install + config))
+        self.assertEqual(check.deps, set([ha]))
+
+        self.assertFalse(config[0].is_ready())
+        install[0].end = time.time()
+        self.assertTrue(config[0].is_ready())
+        self.assertFalse(config[1].is_ready())
+
+    def test02_run(self):
+        """Test the order in which jobs run and the per-stage limits"""
+        recorder = Recorder()
+        scheduler = StageScheduler(max_workers=10)
+        devices = [device('d%d' % i) for i in range(4)]
+        scheduler.add_group([StageJob('install', recorder.stage('install'), x,
+                                      limit=2) for x in devices])
+        scheduler.add_group([StageJob('config', recorder.stage('config'), x)
+                             for x in devices])
+        scheduler.add_group([StageJob('ha', recorder.stage('ha'))])
+
+        self.assertEqual(scheduler.run(), [])
+        self.assertEqual(recorder.peak['install'], 2)
+        self.assertEqual(recorder.order[-1], 'ha')
+        install = scheduler.by_stage['install']
+        config = scheduler.by_stage['config']
+        for i in range(4):
+            self.assertGreaterEqual(config[i].start, install[i].end)
+        # No waves: d0 is configured while d3 is still installing.
+        self.assertLess(config[0].start, install[3].end)
+
+    def test03_errors(self):
+        """Test that failing stages and stage constructors are errors"""
+        def broken():
+            raise ValueError('bad parameters')
+
+        recorder = Recorder()
+        scheduler = StageScheduler()
+        first = [StageJob('install', broken, device('d1')),
+                 StageJob('install', recorder.stage('install', 0.1,
+                                                    KeyError('x')),
+                          device('d2'))]
+        scheduler.add_group(first)
+        scheduler.add_group([StageJob('ha', recorder.stage('ha'))])
+
+        errors = scheduler.run()
+        self.assertEqual(sorted(exc_info[0].__name__ for _, exc_info in errors),
+                         ['KeyError', 'ValueError'])
+        self.assertTrue(all(x.failed and x.end for x in first))
+        self.assertEqual(recorder.order, ['install'])
+        self.assertIsNone(scheduler.by_stage['ha'][0].start)
+
+    def test04_critical_path(self):
+        """Test that the critical path follows the slowest chain"""
+        scheduler = StageScheduler()
+        d1, d2 = device('d1'), device('d2')
+        install = [StageJob('install', None, d1), StageJob('install', None, d2)]
+        config = [StageJob('config', None, d1), StageJob('config', None, d2)]
+        ha = StageJob('ha', None)
+        for group in (install, config, [ha]):
+            scheduler.add_group(group)
+        self.assertEqual(scheduler.critical_path(), (0, []))
+
+        for job, start, end in ((install[0], 0, 10), (install[1], 0, 5),
+                                (config[0], 10, 11), (config[1], 5, 12),
+                                (ha, 12, 14)):
+            job.start, job.end = start, end
+        self.assertEqual(scheduler.critical_path(),
+                         (14, [install[1], config[1], ha]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,15 +5,16 @@ Created on Feb 9, 2012
 '''
 
 from f5test.interfaces.config import (expand_devices, ConfigInterface)
-from f5test.macros.base import Macro, MacroThread
+from f5test.macros.base import Macro
 from f5test.utils.stage.base import Stage, StageError
+from f5test.utils.stage.scheduler import StageScheduler, StageJob, MAX_WORKERS
 from f5test.utils.convert import to_bool
+from functools import partial
 import inspect
 import os
 import random
 
 from f5test.base import Options
-from queue import Queue
 import traceback
 import logging
 
@@ -42,6 +43,8 @@ GROUP_KEY = 'group'
 TYPE_KEY = 'type'
 PARAMETERS_KEY = 'parameters'
 QUICK_KEY = '_quick'
+BARRIER_KEY = 'barrier'
+DEPENDS_KEY = 'depends'
 MAX_THREADS = 10
 
 
@@ -76,7 +79,16 @@ def carry_flag(d, flag=None):
             carry_flag(v, flag)
 
 
-def process_stages(stages, section, context, stop_on_error=True):
+def process_stages(stages, section, context, stop_on_error=True,
+                   max_workers=MAX_WORKERS):
+    """Run the enabled stages in a config section.
+
+    Stages are run in priority order, but each device moves on to its next
+    stage as soon as its previous one is done. Cross-device stages (and
+    stages with 'barrier: true') wait for all stages before them. A stage
+    may also list other stages it needs to wait for under 'depends'. The
+    'threads' key caps how many devices run the same stage at once.
+    """
     if not stages:
         LOG.debug('No stages found.')
         return
@@ -120,15 +132,16 @@ def process_stages(stages, section, context, stop_on_error=True):
         sg_dict[key].append((name, specs))
 
     LOG.debug("sg_list: %s", sg_list)
+    scheduler = StageScheduler(max_workers=max_workers,
+                               stop_on_error=stop_on_error)
     for stages in sg_list:
-        q = Queue()
-        pool = []
+        jobs = []
+        depends = {}
         for stage in stages:
             description, specs = stage
             if not specs or not to_bool(specs.get(ENABLE_KEY)):
                 continue
 
-            LOG.info("Processing stage: %s", description)
             # items() reverts <Options> to a simple <dict>
             specs = Options(specs)
             if not stages_map.get(specs[TYPE_KEY]):
@@ -139,48 +152,39 @@ def process_stages(stages, section, context, stop_on_error=True):
             parameters = specs.get(PARAMETERS_KEY) or Options()
             parameters._context = context
 
+            barrier = specs.get(BARRIER_KEY, stage_class.barrier)
+            if specs.get(DEPENDS_KEY):
+                depends[description] = specs[DEPENDS_KEY]
+            if stage_class.parallelizable and specs.get('parallelizable', True):
+                limit = specs.get('threads', MAX_THREADS)
+            else:
+                limit = 1
+
             devices = expand_devices(specs)
             if devices is None:
-                stage_class(parameters).run()
+                factory = partial(stage_class, parameters)
+                jobs.append(StageJob(description, factory, barrier=True))
             elif devices == []:
                 LOG.error("Stage %s requires devices but found none" % description)
             else:
-                if not devices:
-                    LOG.warning('No devices found for stage %s', description)
-
                 if specs.get('shuffle', False):
                     random.shuffle(devices)
 
                 for device in devices:
-                    stage = stage_class(device, parameters)
-                    name = '%s :: %s' % (description, device.alias) if device else description
-                    t = MacroThread(stage, q, name=name)
-                    t.start()
-                    pool.append(t)
-                    if not stage_class.parallelizable or not specs.get('parallelizable', True):
-                        t.join()
-
-                    # Cap the number parallel threads
-                    if len(pool) >= specs.get('threads', MAX_THREADS):
-                        list(map(lambda x: x.join(), pool))
-                        pool[:] = []
-
-        LOG.debug('Waiting for threads...')
-        for t in pool:
-            t.join()
-
-        if not q.empty():
-            stages = []
-            while not q.empty():
-                ret = q.get(block=False)
-                thread, exc_info = ret.popitem()
-                stages.append((thread, exc_info))
-                LOG.error('Exception while "%s"', thread.getName())
-                for line in traceback.format_exception(*exc_info):
-                    LOG.error(line.strip())
-
-            if stop_on_error:
-                raise StageError(stages)
+                    factory = partial(stage_class, device, parameters)
+                    jobs.append(StageJob(description, factory, device, limit,
+                                         barrier))
+        scheduler.add_group(jobs, depends)
+
+    errors = scheduler.run()
+    scheduler.report()
+    for thread, exc_info in errors:
+        LOG.error('Exception while "%s"', thread.getName())
+        for line in traceback.format_exception(*exc_info):
+            LOG.error(line.strip())
+
+    if errors and stop_on_error:
+        raise StageError(errors)
 
 
 class SanityCheck(Macro):
@@ -0,0 +1,139 @@
+import time
+import unittest
+
+from f5test.base import Options
+from f5test.commands.base import CachedCommand
+from f5test.utils import cache
+from f5test.utils.cache import LruCache, MemcacheCache, TieredCache, MISSING
+
+
+class FakeMemcache(dict):
+    """The bits of pylibmc.Client used by MemcacheCache."""
+
+    def get(self, key, default=None):
+        return super(FakeMemcache, self).get(key, default)
+
+    def set(self, key, value, time=0):
+        self[key] = value
+
+    def add(self, key, value):
+        return self.setdefault(key, value) is value
+
+    def incr(self, key):
+        self[key] += 1
+
+    def delete(self, key):
+        self.pop(key, None)
+
+
+def make_shared():
+    shared = MemcacheCache.__new__(MemcacheCache)
+    shared.mc = FakeMemcache()
+    shared.prefix = 'test_'
+    shared.ttl = 60
+    shared.stats = cache.CacheStats()
+    return shared
+
+
+class Platform(CachedCommand):
+    calls = 0
+
+    def __init__(self, address, *args, **kwargs):
+        super(Platform, self).__init__(*args, **kwargs)
+        self.ifc = Options(address=address)
+
+    def __repr__(self):
+        return 'Platform(%s)' % self.ifc.address
+
+    def prep(self):
+        pass
+
+    def setup(self):
+        Platform.calls += 1
+        return False
+
+
+class TestCases(unittest.TestCase):
+
+    def tearDown(self):
+        cache.set_cache(None)
+
+    def test01_lru(self):
+        """Test eviction, expiration and the hit rate"""
+        lru = LruCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        self.assertEqual(lru.get('a'), 1)
+        lru.set('c', 3)
+        self.assertIs(lru.get('b'), MISSING)
+        self.assertEqual((lru.get('a'), lru.get('c')), (1, 3))
+
+        lru.set('d', 4, ttl=0.05)
+        time.sleep(0.1)
+        self.assertIs(lru.get('d'), MISSING)
+        self.assertEqual(lru.stats['evictions'], 2)
+        self.assertEqual(lru.stats['expired'], 1)
+        self.assertEqual(lru.stats.hit_rate, 0.6)
+
+    def test02_invalidate(self):
+        """Test that invalidating a device drops its entries in all tiers"""
+        local, shared = LruCache(), make_shared()
+        tiered = TieredCache(local, shared)
+        tiered.set('a', 1, tag='10.0.0.1')
+        tiered.set('b', 2, tag='10.0.0.2')
+        local.clear()
+        self.assertEqual(tiered.get('a', tag='10.0.0.1'), 1)
+        self.assertEqual(len(local), 1)
+
+        tiered.invalidate('10.0.0.1')
+        self.assertIs(tiered.get('a', tag='10.0.0.1'), MISSING)
+        self.assertEqual(tiered.get('b', tag='10.0.0.2'), 2)
+
+        # Another worker sharing the same memcached sees it too.
+        other = TieredCache(LruCache(), shared)
+        self.assertIs(other.get('a', tag='10.0.0.1'), MISSING)
+        self.assertEqual(other.get('b', tag='10.0.0.2'), 2)
+
+    def test03_ttl(self):
+        """Test that entries from the shared tier keep their own TTL locally"""
+        local, shared = LruCache(ttl=3600), make_shared()
+        tiered = TieredCache(local, shared)
+        tiered.set('a', 1, ttl=0.1, tag='10.0.0.1')
+        tiered.set('b', 2, ttl=0, tag='10.0.0.1')
+        local.clear()
+        self.assertEqual(tiered.get('a', tag='10.0.0.1'), 1)
+        self.assertEqual(tiered.get('b', tag='10.0.0.1'), 2)
+        # Kept locally for LOCAL_TTL at most.
+        self.assertLessEqual(local._data['b'][1], time.time() + cache.LOCAL_TTL)
+
+        # Even if memcached hasn't dropped it yet (it counts whole seconds).
+        time.sleep(0.15)
+        self.assertIs(tiered.get('a', tag='10.0.0.1'), MISSING)
+        self.assertEqual(len(local), 1)
+
+        # Invalidated by another worker: stale here for local_ttl at most.
+        tiered = TieredCache(LruCache(), shared, local_ttl=0.1)
+        self.assertEqual(tiered.get('b', tag='10.0.0.1'), 2)
+        TieredCache(LruCache(), shared).invalidate('10.0.0.1')
+        self.assertEqual(tiered.get('b', tag='10.0.0.1'), 2)
+        time.sleep(0.15)
+        self.assertIs(tiered.get('b', tag='10.0.0.1'), MISSING)
+
+    def test04_command(self):
+        """Test that falsy results are cached too, per device"""
+        cache.set_cache(LruCache())
+        Platform.calls = 0
+        for _ in range(3):
+            self.assertIs(Platform('10.0.0.1').run(), False)
+        Platform('10.0.0.2').run()
+        self.assertEqual(Platform.calls, 2)
+
+        cache.invalidate('10.0.0.1')
+        Platform('10.0.0.1').run()
+        Platform('10.0.0.2').run()
+        Platform('10.0.0.2', _no_cache=True).run()
+        self.assertEqual(Platform.calls, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
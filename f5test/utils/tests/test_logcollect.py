@@ -0,0 +1,103 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from f5test.interfaces.ssh.driver import SSHResult
+from f5test.utils.logcollect import LogCollector
+
+
+class LocalChannel(object):
+    """Runs the command in a local shell instead of over SSH."""
+    def settimeout(self, timeout):
+        pass
+
+    def exec_command(self, command):
+        self.process = subprocess.Popen(['bash', '-c', command],
+                                        stdout=subprocess.PIPE)
+
+    def makefile(self, mode):
+        return self.process.stdout
+
+    def close(self):
+        self.process.stdout.close()
+        self.process.wait()
+
+
+class LocalApi(object):
+
+    def run(self, command):
+        p = subprocess.run(['bash', '-c', command], stdout=subprocess.PIPE,
+                           universal_newlines=True)
+        return SSHResult(p.returncode, p.stdout, '', command)
+
+    def get_transport(self):
+        return self
+
+    def open_session(self):
+        return LocalChannel()
+
+
+class LocalInterface(object):
+    address = 'localhost'
+    port = 22
+    timeout = 10
+    api = LocalApi()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.remote = tempfile.mkdtemp()
+        self.local = tempfile.mkdtemp()
+        self.files = [(os.path.join(self.remote, 'ltm'), 2),
+                      (os.path.join(self.remote, 'restjavad*.log'), 2)]
+        self.log('ltm', 'a\nb\nc\n')
+        self.log('restjavad.0.log', 'x\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.remote)
+        shutil.rmtree(self.local)
+
+    def log(self, name, data):
+        with open(os.path.join(self.remote, name), 'a') as f:
+            f.write(data)
+
+    def collect(self, collector):
+        ret = collector.submit(LocalInterface(), self.local, self.files).result()
+        files = {}
+        for name, path in ret:
+            with open(path) as f:
+                files[name] = f.read()
+        return files
+
+    def test01_incremental(self):
+        collector = LogCollector(max_bytes=8)
+        self.assertEqual(self.collect(collector),
+                         {'ltm': 'b\nc\n', 'restjavad.0.log': 'x\n'})
+        self.assertEqual(self.collect(collector), {})
+
+        self.log('ltm', 'd\n')
+        self.log('restjavad.1.log', 'new\n')
+        self.assertEqual(self.collect(collector),
+                         {'ltm': 'd\n', 'restjavad.1.log': 'new\n'})
+
+        # Big appends are capped, rotated files start over.
+        self.log('ltm', '0123456789\n')
+        os.rename(os.path.join(self.remote, 'restjavad.0.log'),
+                  os.path.join(self.remote, 'old'))
+        self.log('restjavad.0.log', 'y\n')
+        self.assertEqual(self.collect(collector),
+                         {'ltm': '3456789\n', 'restjavad.0.log': 'y\n'})
+        collector.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
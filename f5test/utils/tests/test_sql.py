@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from f5test.utils.sql import BatchWriter
+
+SCHEMA = "CREATE TABLE tests (id INTEGER PRIMARY KEY, run_id INTEGER, " \
+         "name TEXT NOT NULL, status TEXT, traceback TEXT)"
+
+
+class FlakyConnection(object):
+    """Fails every other commit."""
+    commits = 0
+
+    def __init__(self, cnx):
+        self.cnx = cnx
+
+    def __getattr__(self, name):
+        return getattr(self.cnx, name)
+
+    def commit(self):
+        FlakyConnection.commits += 1
+        if FlakyConnection.commits % 2:
+            raise sqlite3.OperationalError('database is locked')
+        self.cnx.commit()
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        with sqlite3.connect(self.filename) as cnx:
+            cnx.execute(SCHEMA)
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def rows(self):
+        with sqlite3.connect(self.filename) as cnx:
+            return cnx.execute("SELECT run_id, name, status, traceback "
+                               "FROM tests ORDER BY id").fetchall()
+
+    def writer(self, **kwargs):
+        kwargs.setdefault('connect', lambda: sqlite3.connect(self.filename))
+        return BatchWriter(paramstyle='?',
+                           transient=(sqlite3.OperationalError,), **kwargs)
+
+    def test01_batches(self):
+        w = self.writer(batch_size=10, flush_interval=60)
+        for i in range(25):
+            if i % 5:
+                w.insert('tests', ('run_id', 'name', 'status'), (1, 't%d' % i, 'PASS'))
+            else:
+                w.insert('tests', ('run_id', 'name', 'status', 'traceback'),
+                         (1, 't%d' % i, 'FAIL', 'tb'))
+        w.flush()
+        self.assertEqual(len(self.rows()), 25)
+        self.assertEqual(self.rows()[5], (1, 't5', 'FAIL', 'tb'))
+        self.assertEqual(w.stats['batches'], 3)
+
+        # Statements run after the rows queued before them.
+        w.insert('tests', ('run_id', 'name', 'status'), (2, 'x', 'PASS'))
+        w.execute("UPDATE tests SET status=? WHERE run_id=?", ('SKIP', 2))
+        w.close()
+        self.assertEqual(self.rows()[-1], (2, 'x', 'SKIP', None))
+
+    def test02_interval(self):
+        w = self.writer(batch_size=100, flush_interval=0.1)
+        w.insert('tests', ('run_id', 'name'), (1, 'a'))
+        w._thread.join(0.5)
+        self.assertEqual(len(self.rows()), 1)
+        w.close()
+
+    def test03_retry(self):
+        connect = lambda: FlakyConnection(sqlite3.connect(self.filename))
+        w = self.writer(connect=connect, retry_delay=0)
+        for i in range(10):
+            w.insert('tests', ('run_id', 'name'), (1, 't%d' % i))
+        w.close()
+        self.assertEqual(len(self.rows()), 10)
+        self.assertEqual(w.stats['retries'], 1)
+        self.assertEqual(w.stats['dropped'], 0)
+
+    def test04_bad_row(self):
+        w = self.writer(batch_size=10, flush_interval=60)
+        for i in range(10):
+            w.insert('tests', ('run_id', 'name'), (1, None if i == 3 else 't%d' % i))
+        w.close()
+        self.assertEqual([x[1] for x in self.rows()],
+                         ['t%d' % i for i in range(10) if i != 3])
+        self.assertEqual((w.stats['rows'], w.stats['dropped']), (9, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import timeit
+import unittest
+
+from f5test.utils.version import (Version, Product, VersionSwitch, versioned,
+                                  parse_version)
+
+# Iterations of each micro-benchmark.
+VERSION_LOOPS = int(os.environ.get('VERSION_LOOPS', 20000))
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_compare(self):
+        """Test comparisons against versions and strings"""
+        self.assertTrue(Version('BigIP').is_none)
+        self.assertFalse(Version('10.1.1') < '9.4.8')
+        self.assertTrue(Version('iWorkflow 2.2') < 'iWorkflow 2.2.0 0.0.10541')
+        self.assertFalse(Version('12.2') > '12.2.0 1.0.10')
+        self.assertFalse(Version('9.4.8 1.0') < Version('9.4.8'))
+        self.assertTrue(Version('BIGIP 13.1.1-1001.0') > Version('BiGiP  9.4.8'))
+        self.assertTrue(Version('9.4.8 1.0') < '9.4.8 3.0')
+        self.assertFalse(Version('11.0.0 6900.0') <= '10.2.1 397.0.1')
+        self.assertTrue(Version('bigip 11.5') == 'bigip 11.5.0 0.0')
+        self.assertTrue(Version('bigip 11.5') < 'bigip 11.5.0.1')
+
+        # Different products don't compare.
+        for op in ('__eq__', '__ne__', '__lt__', '__gt__'):
+            self.assertFalse(getattr(Version('bigip 9.3.1'), op)('em 1.8'))
+
+    def test02_api(self):
+        """Test the attributes, abs() and hashing"""
+        v = Version('BigIP 12.3.4.1 0.0.1 HF4')
+        self.assertEqual(v.build, '0.0.1')
+        self.assertEqual(v.version, '12.3.4.1')
+        self.assertEqual(str(v), 'BIG-IP 12.3.4.1 0.0.1')
+        self.assertTrue(v.product.is_bigip)
+        self.assertEqual(v.product, 'BIG-IP')
+        self.assertEqual(abs(v), 'bigip 12.3.4.1')
+        self.assertEqual(v.build, '0.0.1')
+        self.assertEqual(Version('11.5', product='em'), 'em 11.5')
+        self.assertEqual(Version(v), v)
+        self.assertEqual(len({Version('bigip 11.5'), Version('bigip 11.5.0'),
+                              Version('em 11.5')}), 2)
+        self.assertIs(parse_version('bigip 11.5'), parse_version('bigip 11.5'))
+        self.assertEqual(Product('Enterprise Manager'), 'em')
+
+    def test03_switch(self):
+        """Test that the first matching range wins and results are cached"""
+        switch = VersionSwitch(default='none')
+        switch.register('new', 'bigip 12.0', 'bigiq')
+        switch.register('mid', ('bigip 11.0', 'bigip 12.0'), ('em 2.0', None))
+        switch.register('old', (None, 'bigip 11.0'))
+        self.assertEqual([switch.resolve(x) for x in
+                          ('bigip 10.2.4', 'bigip 11.0', 'bigip 11.6.5.3',
+                           'bigip 12', 'bigiq 5.4', 'em 3.0', 'em 1.8',
+                           'iworkflow 2.0')],
+                         ['old', 'mid', 'mid', 'new', 'new', 'mid', 'none',
+                          'none'])
+        self.assertIs(switch.resolve(Version('bigip 12.1')), 'new')
+        self.assertIn(Version('bigip 12.1').key, switch._resolved)
+
+        class Stamp(object):
+
+            @versioned
+            def compile(self, v, arg):
+                return 'bigpipe', arg
+
+            @compile.when('bigip 11.0')
+            def compile(self, v, arg):
+                return 'tmsh %s' % v.version, arg
+
+        self.assertEqual(Stamp().compile(Version('bigip 10.2'), 1),
+                         ('bigpipe', 1))
+        self.assertEqual(Stamp().compile(Version('bigip 11.5'), 2),
+                         ('tmsh 11.5', 2))
+
+    def test99_benchmark(self):
+        """Benchmark version gates"""
+        v = Version('bigip 15.1.0 0.0.31')
+        other = Version('bigip 11.5.0')
+        switch = VersionSwitch()
+        switch.register('tmsh', 'bigip 11.0.0', 'em 2.0.0', 'bigiq')
+        cases = [('construct', lambda: Version('bigip 15.1.0 0.0.31')),
+                 ('version < str', lambda: v < 'bigip 11.5.0'),
+                 ('version < version', lambda: v < other),
+                 ('product == str', lambda: v.product == 'bigip'),
+                 ('switch', lambda: switch.resolve(v))]
+        for name, func in cases:
+            t = timeit.timeit(func, number=VERSION_LOOPS)
+            print('%-20s %8.0f ns/op' % (name, t * 1e9 / VERSION_LOOPS))
+
+
+if __name__ == '__main__':
+    unittest.main()
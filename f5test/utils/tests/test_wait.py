@@ -0,0 +1,54 @@
+import itertools
+import threading
+import time
+import unittest
+
+from f5test.utils.wait import (wait, notify, STATS, StopWait, WaitTimedOut,
+                               ExponentialBackoff, FastStartBackoff,
+                               JitteredBackoff)
+
+
+def take(backoff, count, interval=5):
+    return list(itertools.islice(backoff.delays(interval), count))
+
+
+class TestCases(unittest.TestCase):
+
+    def test01_backoff(self):
+        self.assertEqual(take(ExponentialBackoff(0.5), 6),
+                         [0.5, 1, 2, 4, 5, 5])
+        self.assertEqual(take(FastStartBackoff(0.1, 2), 4), [0.1, 0.1, 5, 5])
+        for delay, cap in zip(take(JitteredBackoff(1), 5), [1, 2, 4, 5, 5]):
+            self.assertTrue(cap / 2.0 <= delay <= cap)
+
+    def test02_notify(self):
+        """Test that notify() cuts the delay short"""
+        ready = []
+        timer = threading.Timer(0.2, lambda: ready.append(notify('test02')))
+        timer.start()
+        start = time.time()
+        wait(lambda: ready, interval=10, timeout=30, wakeup='test02')
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(ready, [1])
+
+    def test03_stats(self):
+        STATS.clear()
+        wait(lambda: True, timeout=10)
+        with self.assertRaises(WaitTimedOut):
+            wait(lambda: 1 / 0, timeout=0.3, interval=0.1, backoff='exponential')
+
+        def stop():
+            raise StopWait()
+        with self.assertRaises(StopWait):
+            wait(stop, timeout=10)
+
+        stats = STATS.get_stats()
+        self.assertEqual(len(stats), 3)
+        for site in stats:
+            self.assertIn(__file__.rstrip('c'), site)
+        self.assertEqual(sum(x.count for x in stats.values()), 3)
+        self.assertEqual(sum(x.timeouts for x in stats.values()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 #!/bin/env python
 import re
 import functools
-from itertools import zip_longest, chain
+
+# Distinct version and product strings are parsed once and kept here.
+CACHE_SIZE = 4096
 
 
 class InvalidVersionString(Exception):
@@ -18,6 +20,65 @@ def py2x_cmp(a, b):
     return (a > b) - (a < b)
 
 
+PRODUCTS = [(re.compile(regex, re.IGNORECASE), name) for regex, name in (
+    ("(?:EM|Enterprise Manager)", 'em'),
+    ("BIG-?IP", 'bigip'),
+    ("BIG-?IQ", 'bigiq'),
+    ("(?:WANJET|WJ)", 'wanjet'),
+    ("ARX", 'arx'),
+    ("BIG-IP_SAM", 'sam'),
+    ("NSX", 'nsx'),
+    ("APIC", 'apic'),
+    ("iWorkflow", 'iworkflow'))]
+VERSION_RE = re.compile(r"(?=\d)([\d\.\s\-]+)")
+SEPARATOR_RE = re.compile(r'[\s\-]+')
+NONDIGIT_RE = re.compile(r'[\D]+')
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse_product(product_string):
+    """Returns the normalized product name found in a string, or ''."""
+    for regex, name in PRODUCTS:
+        if regex.search(product_string):
+            return name
+    return ''
+
+
+def _strip(digits):
+    """Drops trailing zeros so that 11.5 and 11.5.0 compare equal."""
+    end = len(digits)
+    while end and not digits[end - 1]:
+        end -= 1
+    return digits[:end]
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse_version(version_string):
+    """Parses a version string once.
+
+    >>> parse_version('BIG-IP 11.5.1 build 8.0.175')
+    ((11, 5, 1), (8, 0, 175), ('bigip', (11, 5, 1), (8, 0, 175)))
+
+    @return: the version digits, the build digits and the key, an immutable
+             tuple that compares the same way as Version objects do within a
+             product
+    @rtype: tuple
+    """
+    mo = VERSION_RE.search(version_string)
+    if mo is None:
+        version_digits = build_digits = (0,) * 3
+    else:
+        ret = SEPARATOR_RE.split(mo.group(0), 1)
+        version_digits = tuple(int(x) for x in NONDIGIT_RE.split(ret[0]) if x)
+        if len(ret) > 1:
+            build_digits = tuple(int(x) for x in NONDIGIT_RE.split(ret[1]) if x)
+        else:
+            build_digits = (0,) * 3
+    return (version_digits, build_digits,
+            (parse_product(version_string), _strip(version_digits),
+             _strip(build_digits)))
+
+
 class Product(object):
     """Normalized product."""
     EM = 'em'
@@ -42,26 +103,10 @@ class Product(object):
         >>> Product('BIGIP')
         bigip
         """
-        if re.search("(?:EM|Enterprise Manager)", str(product_string), re.IGNORECASE):
-            self.product = Product.EM
-        elif re.search("BIG-?IP", str(product_string), re.IGNORECASE):
-            self.product = Product.BIGIP
-        elif re.search("BIG-?IQ", str(product_string), re.IGNORECASE):
-            self.product = Product.BIGIQ
-        elif re.search("(?:WANJET|WJ)", str(product_string), re.IGNORECASE):
-            self.product = Product.WANJET
-        elif re.search("ARX", str(product_string), re.IGNORECASE):
-            self.product = Product.ARX
-        elif re.search("BIG-IP_SAM", str(product_string), re.IGNORECASE):
-            self.product = Product.SAM
-        elif re.search("NSX", str(product_string), re.IGNORECASE):
-            self.product = Product.NSX
-        elif re.search("APIC", str(product_string), re.IGNORECASE):
-            self.product = Product.APIC
-        elif re.search("iWorkflow", str(product_string), re.IGNORECASE):
-            self.product = Product.IWORKFLOW
+        if isinstance(product_string, Product):
+            self.product = product_string.product
         else:
-            self.product = ''
+            self.product = parse_product(str(product_string))
 
     @property
     def is_bigip(self):
@@ -110,10 +155,9 @@ class Product(object):
             return str(self).upper()
 
     def __eq__(self, other):
-        if not isinstance(other, Product):
-            other = Product(other)
-
-        return self.product == other.product
+        if isinstance(other, Product):
+            return self.product == other.product
+        return self.product == parse_product(str(other))
 
     def __repr__(self):
         return self.product
@@ -155,35 +199,25 @@ class Version(object):
     etc..
     """
     def __init__(self, version=None, product=None):
-        self.version_digits = []
-        self.build_digits = []
-
         if isinstance(version, Version):
-            self.version_digits[:] = version.version_digits[:]
-            self.build_digits[:] = version.build_digits[:]
+            self.version_digits = version.version_digits
+            self.build_digits = version.build_digits
             self.product = version.product
+            self.key = version.key
         else:
-            mo = re.search("(?=\d)([\d\.\s\-]+)", str(version), re.IGNORECASE)
-
-            if mo is None:
-                self.version_digits[:] = (0,) * 3
-                self.build_digits[:] = (0,) * 3
-            else:
-                ret = re.split('[\s\-]+', mo.group(0), 1)
-                self.version_digits[:] = [int(x) for x in re.split('[\D]+', ret[0]) if x]
-                if len(ret) > 1:
-                    self.build_digits[:] = [int(x) for x in re.split('[\D]+', ret[1]) if x]
-                else:
-                    self.build_digits[:] = (0,) * 3
-
+            version = str(version)
+            self.version_digits, self.build_digits, self.key = \
+                parse_version(version)
             if product:
                 self.product = Product(product)
+                self.key = (self.product.product,) + self.key[1:]
             else:
                 self.product = Product(version)
 
     def __abs__(self):
         tmp = Version(self)
-        tmp.build_digits[:] = (0,) * 3
+        tmp.build_digits = (0,) * 3
+        tmp.key = self.key[:2] + ((),)
         return tmp
 
     def __eq__(self, other):
@@ -233,26 +267,21 @@ class Version(object):
 
     def _cmp(self, other):
         """Easy comparison with like-objects or other strings"""
+        if isinstance(other, Version):
+            other = other.key
+        else:
+            other = parse_version(str(other))[2]
+        key = self.key
 
-        if not isinstance(other, Version):
-            other = Version(other)
-
-        if (self.product is None and other.product is not None) or \
-           (self.product is not None and other.product is None):
-            raise IllegalComparison("Product is missing from one of the versions.")
-
-        if self.product != other.product:
+        if key[0] != other[0]:
             return None
-
-        pairs = chain(
-            zip_longest(self.version_digits, other.version_digits, fillvalue=0),
-            zip_longest(self.build_digits, other.build_digits, fillvalue=0),
-        )
-        return functools.reduce(lambda s, x: s or py2x_cmp(*x), pairs, 0)
+        if key == other:
+            return 0
+        return -1 if key < other else 1
 
     @property
     def is_none(self):
-        return not any(self.version_digits + self.build_digits)
+        return not (self.key[1] or self.key[2])
 
     @property
     def version(self):
@@ -294,7 +323,113 @@ class Version(object):
         total += int(self.product) * 10 ** (i + 1)
         return total
 
-    __hash__ = __int__
+    def __hash__(self):
+        return hash(self.key)
+
+def parse_range(spec):
+    """Parses a version range for VersionSwitch.
+
+    A range is either a version string, which matches that version and newer
+    ones of the same product (so a bare product name matches all of its
+    versions), or a (low, high) tuple, which matches low <= version < high.
+    The low end of a tuple may be None.
+
+    @return: the product, the low and the high keys (or None)
+    @rtype: tuple
+    """
+    if isinstance(spec, tuple):
+        low, high = spec
+    else:
+        low, high = spec, None
+    low = Version(low) if low is not None else None
+    high = Version(high) if high is not None else None
+    product = (low if low is not None else high).key[0]
+    if high is not None and high.key[0] != product:
+        raise InvalidVersionString('Range spans products: %s' % (spec,))
+    return (product, low.key if low is not None else None,
+            high.key if high is not None else None)
+
+
+class VersionSwitch(object):
+    """Maps version ranges to values (e.g. implementations, or the properties
+    a version doesn't support). The first matching case wins, like in an
+    if/elif chain. What a version resolves to is computed once and cached.
+
+    >>> SYNTAX = VersionSwitch(default='bigpipe')
+    >>> SYNTAX.register('tmsh', 'bigip 11.0.0', 'em 2.0.0', 'bigiq')
+    >>> SYNTAX.resolve(Version('bigip 10.2.4')), SYNTAX.resolve('bigiq 4.6')
+    ('bigpipe', 'tmsh')
+
+    @param default: the value of versions that match no case
+    """
+    def __init__(self, default=None):
+        self.default = default
+        self.cases = []
+        self._resolved = {}
+
+    def register(self, value, *ranges):
+        """Adds a case matching any of the ranges (see parse_range)."""
+        self.cases.append((tuple(parse_range(x) for x in ranges), value))
+        self._resolved.clear()
+
+    def match(self, key, ranges):
+        for product, low, high in ranges:
+            if key[0] == product and (low is None or key >= low) and \
+               (high is None or key < high):
+                return True
+        return False
+
+    def resolve(self, version):
+        key = version.key if isinstance(version, Version) else \
+            parse_version(str(version))[2]
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+        value = self.default
+        for ranges, candidate in self.cases:
+            if self.match(key, ranges):
+                value = candidate
+                break
+        self._resolved[key] = value
+        return value
+
+
+class versioned(object):
+    """A method with one implementation per version range, picked by its first
+    argument, the version (see VersionSwitch). The decorated function is the
+    default implementation:
+
+    class Stamp(object):
+
+        @versioned
+        def compile(self, version):
+            ...
+
+        @compile.when('bigip 11.0.0', ('em 2.0.0', 'em 3.0.0'))
+        def compile(self, version):
+            ...
+
+    Subclasses that need other cases must define their own versioned method;
+    adding cases to an inherited one changes the base class too.
+    """
+    def __init__(self, func):
+        self.switch = VersionSwitch(default=func)
+        functools.update_wrapper(self, func)
+
+    def when(self, *ranges):
+        def decorator(func):
+            self.switch.register(func, *ranges)
+            return self
+        return decorator
+
+    def __get__(self, obj, klass=None):
+        if obj is None:
+            return self
+        return functools.partial(self, obj)
+
+    def __call__(self, obj, version, *args, **kwargs):
+        return self.switch.resolve(version)(obj, version, *args, **kwargs)
 
 
 if __name__ == '__main__':
@@ -311,4 +446,10 @@ if __name__ == '__main__':
     assert not Version("BIGIP 12.1.2.1") > 'BIGIP 13.0.0'
     assert Version('BigIP 12.3.4.1 0.0.1 HF4').build == '0.0.1'
     assert Version('BigIP 12.3.4.1').version == '12.3.4.1'
+    switch = VersionSwitch()
+    switch.register('new', 'bigip 11.6')
+    switch.register('old', (None, 'bigip 11.6'))
+    assert switch.resolve('bigip 11.5.4') == 'old'
+    assert switch.resolve('bigip 12.1') == 'new'
+    assert switch.resolve('bigiq 5.0') is None
     print('Cool!')
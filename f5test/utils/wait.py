@@ -4,12 +4,19 @@ Created on Aug 10, 2011
 @author: jono
 '''
 
+from collections import defaultdict
+import random
 import sys
+import threading
 import time
 import traceback
 import logging
 
+from ..base import Options
+
 LOG = logging.getLogger(__name__)
+# Frames from these modules are skipped when looking for a wait's call site.
+INTERNAL_MODULES = set([__name__, 'f5test.commands.base'])
 
 
 class WaitTimedOut(Exception):
@@ -20,17 +27,175 @@ class StopWait(StopIteration):
     pass
 
 
+class Backoff(object):
+    """Sleeps for the wait's interval between attempts."""
+
+    def delays(self, interval):
+        while True:
+            yield interval
+
+
+class ExponentialBackoff(Backoff):
+    """Starts with a short delay and grows it up to the wait's interval.
+
+    @param initial: the first delay
+    @type initial: float
+    @param factor: how much the delay grows after each attempt
+    @type factor: float
+    """
+    def __init__(self, initial=0.5, factor=2):
+        self.initial = initial
+        self.factor = factor
+
+    def delays(self, interval):
+        delay = min(self.initial, interval)
+        while True:
+            yield delay
+            delay = min(delay * self.factor, interval)
+
+
+class JitteredBackoff(ExponentialBackoff):
+    """Exponential backoff with half of each delay randomized, so waits on
+    the same resource don't poll in lockstep."""
+
+    def delays(self, interval):
+        for delay in super(JitteredBackoff, self).delays(interval):
+            yield delay / 2.0 + random.uniform(0, delay / 2.0)
+
+
+class FastStartBackoff(Backoff):
+    """Polls quickly a few times, then falls back to the wait's interval.
+    Good for things that are usually ready right away.
+
+    @param fast: the delay for the first attempts
+    @type fast: float
+    @param count: how many attempts use the short delay
+    @type count: int
+    """
+    def __init__(self, fast=0.5, count=5):
+        self.fast = fast
+        self.count = count
+
+    def delays(self, interval):
+        for _ in range(self.count):
+            yield min(self.fast, interval)
+        while True:
+            yield interval
+
+
+BACKOFFS = dict(fixed=Backoff, exponential=ExponentialBackoff,
+                jittered=JitteredBackoff, fast=FastStartBackoff)
+
+
+class FormattedException(object):
+    """Formats an exception only if it's actually logged. Source lines are
+    read at that point too, and no frames are kept alive meanwhile."""
+    __slots__ = ('exc',)
+
+    def __init__(self, exc_info):
+        self.exc = traceback.TracebackException(*exc_info, lookup_lines=False)
+
+    def __str__(self):
+        return ''.join(self.exc.format())
+
+
+class WaitStats(object):
+    """How long the waits from each call site took, against their timeouts.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites = {}
+
+    def record(self, site, elapsed, timeout, attempts, timed_out):
+        with self._lock:
+            stats = self._sites.get(site)
+            if stats is None:
+                stats = self._sites[site] = Options(count=0, timeouts=0,
+                                                    attempts=0, total=0,
+                                                    max=0, timeout=0)
+            stats.count += 1
+            stats.timeouts += int(timed_out)
+            stats.attempts += attempts
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.timeout = max(stats.timeout, timeout)
+
+    def get_stats(self):
+        """Per call site: number of waits, timeouts and attempts, total and
+        longest time spent waiting, the largest timeout and how much of it
+        the longest wait used."""
+        with self._lock:
+            ret = dict((k, Options(v)) for k, v in self._sites.items())
+        for stats in ret.values():
+            stats.usage = stats.max / stats.timeout if stats.timeout else 0
+        return ret
+
+    def report(self, top=20):
+        stats = sorted(self.get_stats().items(), key=lambda x: x[1].total,
+                       reverse=True)
+        for site, x in stats[:top]:
+            LOG.info('%s: %d wait(s), %d timed out, %.1fs total, %.1fs max '
+                     '(%d%% of %ds), %.1f attempts/wait', site, x.count,
+                     x.timeouts, x.total, x.max, x.usage * 100, x.timeout,
+                     x.attempts / float(x.count))
+
+    def clear(self):
+        with self._lock:
+            self._sites.clear()
+
+
+STATS = WaitStats()
+_channels = defaultdict(set)
+_channels_lock = threading.Lock()
+
+
+def notify(channel):
+    """Wake up all the waits listening on a channel, so they poll right away.
+
+    @return: how many waits were woken up
+    """
+    with _channels_lock:
+        waits = list(_channels.get(channel, ()))
+    for w in waits:
+        w.notify()
+    return len(waits)
+
+
+def _call_site():
+    f = sys._getframe(1)
+    while f is not None and f.f_globals.get('__name__') in INTERNAL_MODULES:
+        f = f.f_back
+    if f is None:
+        return None
+    return '%s:%d' % (f.f_code.co_filename, f.f_lineno)
+
+
 class Wait(object):
+    """Calls function() until its result meets the criteria (and stays that
+    way for stabilize seconds) or the timeout expires.
+
+    @param interval: seconds between attempts (the longest, with backoff)
+    @type interval: float
+    @param backoff: a Backoff instance or one of BACKOFFS' names
+    @type backoff: Backoff or str
+    @param wakeup: a channel name; notify(wakeup) cuts the current delay short
+    @type wakeup: str
+    """
     timeout_message = "Criteria not met after {0} seconds."
     progress_message = None
 
     def __init__(self, timeout=180, interval=5, stabilize=0, negated=False,
-                 timeout_message=None, progress_message=None):
+                 timeout_message=None, progress_message=None, backoff=None,
+                 wakeup=None):
         self.timeout = timeout
         self.interval = interval
         self.stabilize = stabilize
         self.negated = negated
+        self.backoff = BACKOFFS[backoff]() if isinstance(backoff, str) \
+            else backoff or Backoff()
+        self.wakeup = wakeup
         self._result = None
+        self._event = threading.Event()
 
         if timeout_message:
             self.timeout_message = timeout_message
@@ -41,62 +206,91 @@ class Wait(object):
     def function(self, *args, **kwargs):
         self._result = True
 
+    def notify(self):
+        """Cut the current delay short and restart the backoff."""
+        self._event.set()
+
     def run(self, *args, **kwargs):
-        last_success = None
-        stable = 0
-        end = time.time() + self.timeout
-        last_time = time.time()
-
-        while time.time() < end:
-            success = False
-            last_exc = None
-            try:
-                self.function(*args, **kwargs)
-                success = self.test_result()
-                #if not success:
-                #    LOG.warning('Unexpected result: %s', result)
-            except:
-                err = sys.exc_info()
-                last_exc = err[0]
-                tb = ''.join(traceback.format_exception(*err))
-                success = self.test_error(*err)
-                LOG.debug("Exception occurred in wait():\n%s", tb)
-                #if not success:
-                #    LOG.warning('Unexpected error: %s', tb)
-            finally:
-                self.cleanup()
-                if success:
-                    self.criteria_met()
-                else:
-                    stable = 0
-                    self.criteria_not_met()
-                    try:
-                        self.progress()
-                    except Exception as e:
-                        LOG.warning("Exception occurred in progress(): %s", e)
-
-                if success:
-                    if stable == 0 or last_success == success:
-                        self.criteria_met_stable()
-                        stable += time.time() - last_time
+        if self.wakeup is not None:
+            with _channels_lock:
+                _channels[self.wakeup].add(self)
+        start = time.time()
+        attempts = 0
+        timed_out = False
+        try:
+            last_success = None
+            stable = 0
+            end = start + self.timeout
+            last_time = start
+            delays = self.backoff.delays(self.interval)
+
+            while time.time() < end:
+                success = False
+                last_exc = None
+                attempts += 1
+                try:
+                    self.function(*args, **kwargs)
+                    success = self.test_result()
+                    #if not success:
+                    #    LOG.warning('Unexpected result: %s', result)
+                except:
+                    err = sys.exc_info()
+                    last_exc = err[1]
+                    success = self.test_error(*err)
+                    LOG.debug("Exception occurred in wait():\n%s",
+                              FormattedException(err))
+                    del err
+                    #if not success:
+                    #    LOG.warning('Unexpected error: %s', tb)
+                finally:
+                    self.cleanup()
+                    if success:
+                        self.criteria_met()
                     else:
-                        self.criteria_met_not_stable()
                         stable = 0
-
-                    if stable >= self.stabilize:
-                        break
-
-                if last_exc and last_exc is StopWait:
-                    raise
-
-                last_success = success
-                last_time = time.time()
-                time.sleep(self.interval)
-        else:
-            self.fail()
-            raise WaitTimedOut(self.timeout_message.format(self.timeout, self._result))
-
-        return self._result
+                        self.criteria_not_met()
+                        try:
+                            self.progress()
+                        except Exception as e:
+                            LOG.warning("Exception occurred in progress(): %s", e)
+
+                    if success:
+                        if stable == 0 or last_success == success:
+                            self.criteria_met_stable()
+                            stable += time.time() - last_time
+                        else:
+                            self.criteria_met_not_stable()
+                            stable = 0
+
+                        if stable >= self.stabilize:
+                            break
+
+                    if isinstance(last_exc, StopWait):
+                        raise last_exc
+
+                    last_success = success
+                    last_time = time.time()
+                    # Don't sleep past the deadline.
+                    delay = min(next(delays), max(end - last_time, 0))
+                    if self._event.wait(delay):
+                        self._event.clear()
+                        delays = self.backoff.delays(self.interval)
+            else:
+                self.fail()
+                timed_out = True
+                raise WaitTimedOut(self.timeout_message.format(self.timeout, self._result))
+
+            return self._result
+        finally:
+            if self.wakeup is not None:
+                with _channels_lock:
+                    _channels[self.wakeup].discard(self)
+                    if not _channels[self.wakeup]:
+                        del _channels[self.wakeup]
+            site = _call_site()
+            if site:
+                STATS.record(site, time.time() - start, self.timeout,
+                             attempts, timed_out)
 
     def test_result(self):
         result = self._result
@@ -7,11 +7,11 @@
 """
 
 import os
-import yaml
 
 import gevent.monkey; gevent.monkey.patch_all()
 import bottle
 from f5test.base import AttrDict
+from f5test.interfaces.config import ConfigLoader
 from f5test.web.tasks import MyAsyncResult
 from f5test.web.validators import validators
 import logging
@@ -35,7 +35,8 @@ LOG = logging.getLogger(__name__)
 
 
 def read_config(config, filename):
-    config.update(yaml.load(open(filename).read()))
+    # Cached until web.yaml (or a file it includes) changes.
+    config.update(ConfigLoader(filename).load_cached())
     # Replacing iRack reservation lookup with a round-robin.
     config.filename = os.path.abspath(filename)
     config.dir = os.path.dirname(config.filename)